@@ -1,12 +1,23 @@
 import streamlit as st
 
+# Standard library only: pandas/plotly are imported by the warm-up thread, not here
+from analytics import warmup
+
 st.set_page_config(page_title="E-commerce Dashboard", page_icon="🛒", layout="wide")
 
+# --- Warm the data caches in the background (already running under `streamlit run app.py`) ---
+warm = warmup.start()
+
 # --- Title section ---
 st.title("🛒 E-commerce Performance Dashboard")
 st.subheader("Analyze revenue trends and customer reviews across platforms")
 st.write("Select a section below to explore:")
 
+if warm['state'] == 'warming':
+    st.caption("⏳ Preparing the data in the background…")
+elif warm['state'] == 'failed':
+    st.caption(f"⚠️ Data warm-up failed ({warm['error']}); pages will load their data on first visit.")
+
 # --- Navigation buttons ---
 col1, col2, col3, col4, col5 = st.columns([1, 2, 2, 2, 1])
 
@@ -0,0 +1,2 @@
+# analytics/__init__.py
+# Shared data layer for the dashboard pages (ingestion, aggregation, caching).
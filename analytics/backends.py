@@ -0,0 +1,604 @@
+# analytics/backends.py
+# Pluggable query backends that produce the aggregated inputs of both pages.
+#
+# Every section on the revenue page is computed from the daily revenue cube and
+# every section on the review page from the per-(agent, location) accumulators
+# and delivery-time sketches (see analytics.revenue / analytics.reviews /
+# analytics.sketches). A backend's job is to return those shapes for a filter
+# selection, including the review drill-down filters (analytics.bitmaps):
+#
+#   pandas  (default) in-process cube/stats built from the Arrow cache, filtered
+#           with pandas; date ranges read from the month partitions.
+#   sqlite  a local database file Sales/.cache/dashboard.sqlite built from the
+#           CSVs; filters become WHERE predicates and the GROUP BY runs in SQLite,
+#           so only the aggregated rows reach Python.
+#   duckdb  same queries against read-only DuckDB files, one per table and
+#           data version, e.g. Sales/.cache/dashboard.revenue.<version>.duckdb
+#           (needs the optional `duckdb` package).
+#   service forwards every query to the local data service (analytics.service),
+#           one process that holds the data for all dashboard workers.
+#
+# Choose one with DASHBOARD_QUERY_BACKEND. The SQL tables are reloaded from the
+# CSV in chunks whenever its data version changes, so neither the build nor the
+# queries hold the raw dataset in memory, and every session and server process
+# reads the same file.
+import functools
+import glob
+import hashlib
+import http.client
+import importlib.util
+import json
+import os
+import threading
+import urllib.parse
+
+import pandas as pd
+
+from analytics import bitmaps, cube, incremental, ingest, sketches, streaming
+
+DEFAULT_BACKEND = os.environ.get("DASHBOARD_QUERY_BACKEND", "pandas")
+LOAD_CHUNKSIZE = 250_000
+
+REVENUE_TABLE = 'revenue'
+REVIEWS_TABLE = 'reviews'
+
+
+def csv_columns(path):
+    """Column names of the CSV at `path` (header only)."""
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+# -------------------------
+# pandas (in-process)
+# -------------------------
+@functools.lru_cache(maxsize=2)
+def _revenue_cube(path, version):
+    # `version` is part of the key: a new data version loads a new cube.
+    return incremental.load_revenue_cube(path)
+
+
+@functools.lru_cache(maxsize=2)
+def _review_stats(path, version, streamed):
+    return incremental.load_review_stats(path, streamed=streamed)
+
+
+@functools.lru_cache(maxsize=2)
+def _review_sketch(path, version, streamed):
+    return incremental.load_review_sketch(path, streamed=streamed)
+
+
+@functools.lru_cache(maxsize=2)
+def _review_rows(path, version):
+    # Typed rows and their per-value bitmaps, for the drill-down filters
+    rows = ingest.load_reviews(path)
+    return rows, bitmaps.build_index(rows)
+
+
+@functools.lru_cache(maxsize=2)
+def _streamed_rows(path, version):
+    # Files too large to load: typed rows in a memory-mapped Arrow file, same bitmaps
+    return bitmaps.streamed_rows(path, version)
+
+
+def _review_filters(agents, locations, extra):
+    return dict(extra or {}, **{'Agent Name': agents, 'Location': locations})
+
+
+STATS_COLUMNS = streaming.STATS_KEYS + streaming.MEASURES + streaming.FLAGS
+SKETCH_COLUMNS = streaming.STATS_KEYS + [sketches.VALUE_COL]
+
+
+class PandasBackend:
+    name = 'pandas'
+
+    def _selected(self, path, version, filters, fold, combine, columns):
+        """fold() of the rows matching `filters`, found with the bitmaps (batch by batch for a streamed file)."""
+        if streaming.use_streaming(path):
+            acc = bitmaps.fold_rows(*_streamed_rows(path, version), filters, fold, combine, columns)
+            return fold(pd.DataFrame({c: pd.Series(dtype=object) for c in columns})) if acc is None else acc
+        rows, index = _review_rows(path, version)
+        return fold(rows[columns].take(index.rows(filters)))
+
+    def revenue_cube(self, path, version, platforms=None, start=None, end=None):
+        """Daily revenue cube for the selection; no platforms / dates means no filter."""
+        if start is None:
+            base = _revenue_cube(path, version)
+        else:
+            base = incremental.load_revenue_range(path, start, end)
+        return cube.filter_cube(base, platforms)
+
+    def revenue_platforms(self, path, version):
+        return sorted(_revenue_cube(path, version)['Platform'].dropna().unique())
+
+    def revenue_dates(self, path, version):
+        """(first, last) order day, or None if the data has no order dates."""
+        daily = _revenue_cube(path, version)
+        if 'Order Date' not in daily.columns or daily['Order Date'].isna().all():
+            return None
+        return daily['Order Date'].min(), daily['Order Date'].max()
+
+    def review_stats(self, path, version, agents=None, locations=None, extra=None):
+        """Review accumulators for the selected agents/locations (None means all).
+
+        `extra` holds drill-down filters {column: labels}; only those need the row bitmaps.
+        """
+        if extra:
+            stats = self._selected(path, version, _review_filters(agents, locations, extra),
+                                   streaming.fold_chunk, streaming.combine, STATS_COLUMNS)
+            stats['count'] = stats['count'].astype('int64')
+            return stats.sort_index()
+        stats = _review_stats(path, version, streaming.use_streaming(path))
+        if agents is not None:
+            stats = stats[stats.index.get_level_values('Agent Name').isin(agents)]
+        if locations is not None:
+            stats = stats[stats.index.get_level_values('Location').isin(locations)]
+        return stats
+
+    def review_options(self, path, version, level):
+        if level in streaming.STATS_KEYS:
+            return streaming.options(_review_stats(path, version, streaming.use_streaming(path)), level)
+        if streaming.use_streaming(path):
+            return _streamed_rows(path, version)[1].options(level)
+        return _review_rows(path, version)[1].options(level)
+
+    def review_sketch(self, path, version, agents=None, locations=None, extra=None):
+        """Delivery-time histograms for the selected agents/locations (None means all)."""
+        if extra:
+            return self._selected(path, version, _review_filters(agents, locations, extra),
+                                  sketches.fold_chunk, sketches.combine, SKETCH_COLUMNS).sort_index()
+        return sketches.filter_sketch(_review_sketch(path, version, streaming.use_streaming(path)),
+                                      agents, locations)
+
+    def review_breakdown(self, path, version, column, agents=None, locations=None, extra=None):
+        """Review accumulators per (Agent Name, `column` label) for the selection."""
+        stats = self._selected(path, version, _review_filters(agents, locations, extra),
+                               bitmaps.breakdown_fold(column), streaming.combine, STATS_COLUMNS + [column])
+        stats['count'] = stats['count'].astype('int64')
+        return stats.sort_index()
+
+
+# -------------------------
+# SQL (embedded database file)
+# -------------------------
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _in(column, values, params, cast=str):
+    if not values:
+        return '0 = 1'
+    params.extend(cast(v) for v in values)
+    return f"{_quote(column)} IN ({', '.join('?' * len(values))})"
+
+
+def _review_where(agents, locations, extra, params):
+    """WHERE predicates of a review selection; flags are stored as 0/1."""
+    where = []
+    for column, values in _review_filters(agents, locations, extra).items():
+        if values is not None:
+            flag = ingest.REVIEW_SCHEMA.get(column) == 'bool'
+            where.append(_in(column, values, params, cast=bitmaps.flag_value if flag else str))
+    return where
+
+
+def _table_version(version, schema):
+    # A schema change (e.g. a column's storage kind) also needs a reload
+    return f"{version}:{hashlib.blake2b(json.dumps(schema, sort_keys=True).encode(), digest_size=4).hexdigest()}"
+
+
+class SQLBackend:
+    """Shared query logic; subclasses supply the connection and bulk insert."""
+
+    name = None
+    suffix = None
+    text_type = 'TEXT'
+    date_type = 'DATE'
+
+    def __init__(self, db_path=None):
+        if not self.available():
+            raise ImportError(f"The {self.name} query backend needs the `{self.name}` package")
+        self.db_path = db_path
+        self._local = threading.local()
+        self._build_lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        return True
+
+    # --- connection and loading ---
+    def _open(self, db_path):
+        raise NotImplementedError
+
+    def _insert(self, con, table, frame):
+        raise NotImplementedError
+
+    def _fetch(self, con, sql, params):
+        raise NotImplementedError
+
+    def database_path(self, path):
+        return self.db_path or os.path.join(os.path.dirname(ingest.cache_path(path, '')), 'dashboard' + self.suffix)
+
+    def _connection(self, path):
+        db_path = self.database_path(path)
+        connections = self._local.__dict__.setdefault('connections', {})
+        if db_path not in connections:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            con = self._open(db_path)
+            con.execute('CREATE TABLE IF NOT EXISTS _dashboard_meta '
+                        '(dataset VARCHAR PRIMARY KEY, version VARCHAR, integral VARCHAR)')
+            connections[db_path] = con
+        return connections[db_path]
+
+    def _column_type(self, kind, values):
+        if kind == 'datetime':
+            return self.date_type
+        if values.dtype.kind in 'iub':
+            return 'BIGINT'
+        if values.dtype.kind == 'f':
+            return 'DOUBLE'
+        return self.text_type
+
+    def _to_rows(self, chunk, schema):
+        frame = ingest.apply_schema(chunk, schema)
+        for col, kind in schema.items():
+            if col not in frame.columns:
+                continue
+            if kind == 'datetime':
+                frame[col] = frame[col].dt.strftime('%Y-%m-%d')  # day precision, NaT -> NULL
+            elif kind == 'category':
+                frame[col] = frame[col].astype(object)
+        return frame
+
+    def _load(self, con, table, path, schema):
+        """Replace `table` with the CSV's rows, one chunk in memory at a time.
+
+        Returns the 'number' columns whose values were all integers, so query
+        results can be given the same integer dtype the pandas loader uses.
+        """
+        dtype = {c: str for c, kind in schema.items() if kind in ('category', 'string')}
+        integral = {c for c, kind in schema.items() if kind == 'number'}
+        con.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+        created = False
+        for chunk in pd.read_csv(path, dtype=dtype, chunksize=LOAD_CHUNKSIZE):
+            frame = self._to_rows(chunk, schema)
+            if not created:
+                types = {c: self._column_type(schema.get(c), frame[c]) for c in frame.columns}
+                # Numbers are stored as DOUBLE: a later chunk may hold decimals.
+                types.update({c: 'DOUBLE' for c in integral if c in types})
+                con.execute(f"CREATE TABLE {_quote(table)} ("
+                            + ', '.join(f'{_quote(c)} {t}' for c, t in types.items()) + ')')
+                created = True
+            integral = {c for c in integral if c in frame.columns and frame[c].dtype.kind in 'iu'}
+            self._insert(con, table, frame)
+        if not created:
+            columns = csv_columns(path)
+            con.execute(f"CREATE TABLE {_quote(table)} ("
+                        + ', '.join(f'{_quote(c)} {self.text_type}' for c in columns) + ')')
+        return sorted(integral)
+
+    def _index(self, con, table, columns):
+        pass
+
+    def _ensure(self, path, version, table, schema, index_columns):
+        """Connection whose `table` holds the CSV at data version `version`."""
+        con = self._connection(path)
+        version = _table_version(version, schema)
+        meta_sql = 'SELECT version, integral FROM _dashboard_meta WHERE dataset = ?'
+        row = self._fetch(con, meta_sql, [table])
+        if len(row) and row['version'].iloc[0] == version:
+            return con, json.loads(row['integral'].iloc[0])
+        with self._build_lock:
+            row = self._fetch(con, meta_sql, [table])  # another session may have just built it
+            if len(row) and row['version'].iloc[0] == version:
+                return con, json.loads(row['integral'].iloc[0])
+            con.execute('BEGIN TRANSACTION')
+            try:
+                integral = self._load(con, table, path, schema)
+                self._index(con, table, [c for c in index_columns if c in csv_columns(path)])
+                con.execute('DELETE FROM _dashboard_meta WHERE dataset = ?', [table])
+                con.execute('INSERT INTO _dashboard_meta VALUES (?, ?, ?)', [table, version, json.dumps(integral)])
+                con.execute('COMMIT')
+            except BaseException:
+                con.execute('ROLLBACK')
+                raise
+        return con, integral
+
+    def _columns(self, con, table):
+        return list(self._fetch(con, f'SELECT * FROM {_quote(table)} LIMIT 0', []).columns)
+
+    # --- revenue ---
+    def _revenue(self, path, version):
+        return self._ensure(path, version, REVENUE_TABLE, ingest.REVENUE_SCHEMA,
+                            ['Platform', 'Order Date'])
+
+    def revenue_cube(self, path, version, platforms=None, start=None, end=None):
+        con, integral = self._revenue(path, version)
+        columns = self._columns(con, REVENUE_TABLE)
+        keys = [c for c in cube.CUBE_KEYS if c in columns]
+        value = f'SUM({_quote(cube.VALUE_COL)})' if cube.VALUE_COL in columns else '0'
+        params, where = [], []
+        if platforms and 'Platform' in columns:
+            where.append(_in('Platform', platforms, params))
+        if start is not None and 'Order Date' in columns:
+            where.append(f"{_quote('Order Date')} BETWEEN ? AND ?")
+            params += [pd.Timestamp(start).strftime('%Y-%m-%d'), pd.Timestamp(end).strftime('%Y-%m-%d')]
+        sql = (f"SELECT {''.join(_quote(k) + ', ' for k in keys)}COUNT(*) AS {_quote('Orders')}, "
+               f"{value} AS {_quote('Revenue')} FROM {_quote(REVENUE_TABLE)}"
+               + (f" WHERE {' AND '.join(where)}" if where else '')
+               + (f" GROUP BY {', '.join(_quote(k) for k in keys)}" if keys else ''))
+        result = self._fetch(con, sql, params)
+
+        for key in ('Platform', 'Product Category'):
+            if key in result.columns:
+                result[key] = result[key].astype('category')
+        if 'Order Date' in result.columns:
+            result['Order Date'] = pd.to_datetime(result['Order Date'])
+        result['Orders'] = result['Orders'].astype('int64')
+        revenue_is_int = cube.VALUE_COL not in columns or cube.VALUE_COL in integral
+        result['Revenue'] = result['Revenue'].fillna(0).astype('int64' if revenue_is_int else 'float64')
+        return result
+
+    def revenue_platforms(self, path, version):
+        con, _ = self._revenue(path, version)
+        if 'Platform' not in self._columns(con, REVENUE_TABLE):
+            return []
+        rows = self._fetch(con, f"SELECT DISTINCT {_quote('Platform')} AS p FROM {_quote(REVENUE_TABLE)} "
+                                f"WHERE {_quote('Platform')} IS NOT NULL", [])
+        return sorted(rows['p'])
+
+    def revenue_dates(self, path, version):
+        con, _ = self._revenue(path, version)
+        if 'Order Date' not in self._columns(con, REVENUE_TABLE):
+            return None
+        col = _quote('Order Date')
+        rows = self._fetch(con, f"SELECT MIN({col}) AS first, MAX({col}) AS last FROM {_quote(REVENUE_TABLE)}", [])
+        if rows['first'].isna().all():
+            return None
+        return pd.Timestamp(rows['first'].iloc[0]), pd.Timestamp(rows['last'].iloc[0])
+
+    # --- reviews ---
+    def _reviews(self, path, version):
+        return self._ensure(path, version, REVIEWS_TABLE, ingest.REVIEW_SCHEMA, streaming.STATS_KEYS)
+
+    def _accumulators(self, con, keys, where, params):
+        sums = []
+        for col in streaming.MEASURES:
+            sums += [f"SUM(CAST({_quote(col)} AS DOUBLE)) AS {_quote(col + ' sum')}",
+                     f"SUM(CAST({_quote(col)} AS DOUBLE) * {_quote(col)}) AS {_quote(col + ' sumsq')}"]
+        for col in streaming.FLAGS:
+            sums.append(f"SUM(CAST({_quote(col)} AS DOUBLE)) AS {_quote(col + ' sum')}")
+        key_list = ', '.join(_quote(k) for k in keys)
+        sql = (f"SELECT {key_list}, COUNT(*) AS {_quote('count')}, {', '.join(sums)} FROM {_quote(REVIEWS_TABLE)}"
+               + (f" WHERE {' AND '.join(where)}" if where else '')
+               + f" GROUP BY {key_list} ORDER BY {key_list}")
+        result = self._fetch(con, sql, params)
+        result['count'] = result['count'].astype('int64')
+        for key in keys:
+            if ingest.REVIEW_SCHEMA.get(key) == 'bool':
+                result[key] = bitmaps.FLAG_LABELS[result[key].astype('int64').to_numpy()]
+            result[key] = result[key].astype(object)
+        return result.set_index(keys)[streaming.stat_columns()].astype(
+            {c: 'float64' for c in streaming.stat_columns() if c != 'count'})
+
+    def review_stats(self, path, version, agents=None, locations=None, extra=None):
+        con, _ = self._reviews(path, version)
+        params = []
+        where = _review_where(agents, locations, extra, params)
+        return self._accumulators(con, streaming.STATS_KEYS, where, params)
+
+    def review_breakdown(self, path, version, column, agents=None, locations=None, extra=None):
+        con, _ = self._reviews(path, version)
+        params = []
+        where = _review_where(agents, locations, extra, params)
+        return self._accumulators(con, ['Agent Name', column], where, params)
+
+    def review_sketch(self, path, version, agents=None, locations=None, extra=None):
+        # The database counts rows per distinct delivery time; binning those few rows stays in pandas
+        con, _ = self._reviews(path, version)
+        params = []
+        where = [f"{_quote(sketches.VALUE_COL)} IS NOT NULL"] + _review_where(agents, locations, extra, params)
+        keys = ', '.join(_quote(k) for k in streaming.STATS_KEYS + [sketches.VALUE_COL])
+        result = self._fetch(con, f"SELECT {keys}, COUNT(*) AS {_quote('count')} FROM {_quote(REVIEWS_TABLE)} "
+                                  f"WHERE {' AND '.join(where)} GROUP BY {keys}", params)
+        return sketches.fold_chunk(result, weights=result['count'])
+
+    def review_options(self, path, version, level):
+        con, _ = self._reviews(path, version)
+        rows = self._fetch(con, f"SELECT DISTINCT {_quote(level)} AS v FROM {_quote(REVIEWS_TABLE)} "
+                                f"WHERE {_quote(level)} IS NOT NULL", [])
+        if ingest.REVIEW_SCHEMA.get(level) == 'bool':
+            return sorted(bitmaps.FLAG_LABELS[rows['v'].astype('int64').to_numpy()])
+        return sorted(rows['v'])
+
+
+class SQLiteBackend(SQLBackend):
+    name = 'sqlite'
+    suffix = '.sqlite'
+    date_type = 'TEXT'  # ISO dates compare correctly as text
+
+    def _open(self, db_path):
+        import sqlite3
+
+        # Autocommit mode; _ensure() opens its own transaction around a rebuild.
+        con = sqlite3.connect(db_path, isolation_level=None, timeout=60)
+        con.execute('PRAGMA journal_mode=WAL')  # readers in other processes are not blocked by a rebuild
+        return con
+
+    def _insert(self, con, table, frame):
+        placeholders = ', '.join('?' * len(frame.columns))
+        rows = frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+        con.executemany(f'INSERT INTO {_quote(table)} VALUES ({placeholders})', rows)
+
+    def _fetch(self, con, sql, params):
+        return pd.read_sql_query(sql, con, params=params)
+
+    def _index(self, con, table, columns):
+        for col in columns:
+            con.execute(f'CREATE INDEX {_quote(f"{table}_{col}")} ON {_quote(table)} ({_quote(col)})')
+
+
+class DuckDBBackend(SQLBackend):
+    """DuckDB locks a file it writes against every other process, readers included.
+
+    So each table is built once per data version into a private file, renamed
+    into place, and from then on only opened read-only, which any number of
+    server processes can do at the same time. Concurrent first builds in
+    several processes each write their own file; the renames leave one.
+    """
+
+    name = 'duckdb'
+    suffix = '.duckdb'
+    text_type = 'VARCHAR'
+
+    @staticmethod
+    def available():
+        return importlib.util.find_spec('duckdb') is not None
+
+    def _open(self, db_path, read_only=False):
+        import duckdb
+
+        return duckdb.connect(db_path, read_only=read_only)
+
+    def table_path(self, path, table, version):
+        """Database file of `table` at its (schema-qualified) data version."""
+        stem = os.path.splitext(self.database_path(path))[0]
+        digest = hashlib.blake2b(version.encode(), digest_size=8).hexdigest()
+        return f"{stem}.{table}.{digest}{self.suffix}"
+
+    def _build(self, db_path, path, table, schema, index_columns):
+        tmp_path = f"{db_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        con = self._open(tmp_path)
+        try:
+            con.execute('CREATE TABLE _dashboard_meta (dataset VARCHAR PRIMARY KEY, integral VARCHAR)')
+            integral = self._load(con, table, path, schema)
+            self._index(con, table, [c for c in index_columns if c in csv_columns(path)])
+            con.execute('INSERT INTO _dashboard_meta VALUES (?, ?)', [table, json.dumps(integral)])
+        finally:
+            con.close()
+        os.replace(tmp_path, db_path)
+        # Earlier versions of the table; processes still reading one keep their open file
+        stem = os.path.splitext(self.database_path(path))[0]
+        for old in glob.glob(f"{glob.escape(stem)}.{table}.*{self.suffix}"):
+            if old != db_path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def _ensure(self, path, version, table, schema, index_columns):
+        db_path = self.table_path(path, table, _table_version(version, schema))
+        connections = self._local.__dict__.setdefault('tables', {})
+        if table in connections and connections[table][0] == db_path:
+            return connections[table][1:]
+        if not os.path.exists(db_path):
+            with self._build_lock:
+                if not os.path.exists(db_path):  # another session may have just built it
+                    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                    self._build(db_path, path, table, schema, index_columns)
+        con = self._open(db_path, read_only=True)
+        integral = json.loads(self._fetch(con, 'SELECT integral FROM _dashboard_meta', [])['integral'].iloc[0])
+        if table in connections:
+            connections[table][1].close()
+        connections[table] = (db_path, con, integral)
+        return con, integral
+
+    def _insert(self, con, table, frame):
+        con.register('_dashboard_chunk', frame)
+        try:
+            con.execute(f'INSERT INTO {_quote(table)} SELECT * FROM _dashboard_chunk')
+        finally:
+            con.unregister('_dashboard_chunk')
+
+    def _fetch(self, con, sql, params):
+        return con.execute(sql, params).fetchdf()
+
+
+# -------------------------
+# Local data service (another process)
+# -------------------------
+class ServiceBackend:
+    """Client of analytics.service; receives aggregated tables only."""
+
+    name = 'service'
+
+    def __init__(self, url=None):
+        from analytics import service
+
+        self._service = service
+        parsed = urllib.parse.urlsplit(url or service.DEFAULT_URL)
+        self.host, self.port = parsed.hostname, parsed.port or service.DEFAULT_PORT
+        self._local = threading.local()
+
+    @staticmethod
+    def available():
+        return True
+
+    def _connection(self):
+        con = getattr(self._local, 'connection', None)
+        if con is None:
+            con = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=300)
+        return con
+
+    def _query(self, method, *args):
+        # Only the dataset's name travels: the service reads its own snapshot of it.
+        body = json.dumps({'method': method, 'dataset': self._service.METHODS[method],
+                           'args': self._service.encode_args(args)}).encode()
+        for attempt in (0, 1):
+            con = self._connection()
+            try:
+                con.request('POST', '/query', body, {'Content-Type': self._service.JSON_TYPE})
+                response = con.getresponse()
+                payload = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The service closed an idle keep-alive connection (or restarted): reconnect once.
+                con.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            error = json.loads(payload)
+            raise (FileNotFoundError if response.status == 404 else RuntimeError)(
+                f"data service: {error['type']}: {error['error']}")
+        if response.getheader('Content-Type') == self._service.ARROW_TYPE:
+            return self._service.decode_table(payload)
+        return json.loads(payload)
+
+    # `path` and `version` are the worker's view of the dataset; the service answers from its own.
+    def revenue_cube(self, path, version, platforms=None, start=None, end=None):
+        return self._query('revenue_cube', platforms, start, end)
+
+    def revenue_platforms(self, path, version):
+        return self._query('revenue_platforms')
+
+    def revenue_dates(self, path, version):
+        dates = self._query('revenue_dates')
+        return None if dates is None else tuple(pd.Timestamp(d) for d in dates)
+
+    def review_stats(self, path, version, agents=None, locations=None, extra=None):
+        return self._query('review_stats', agents, locations, extra)
+
+    def review_options(self, path, version, level):
+        return self._query('review_options', level)
+
+    def review_sketch(self, path, version, agents=None, locations=None, extra=None):
+        return self._query('review_sketch', agents, locations, extra)
+
+    def review_breakdown(self, path, version, column, agents=None, locations=None, extra=None):
+        return self._query('review_breakdown', column, agents, locations, extra)
+
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'sqlite': SQLiteBackend,
+    'duckdb': DuckDBBackend,
+    'service': ServiceBackend,
+}
+
+
+def get_backend(name=None):
+    """Backend instance by name (default: DASHBOARD_QUERY_BACKEND, else pandas)."""
+    name = (name or DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown query backend {name!r}; choose one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,193 @@
+# analytics/bitmaps.py
+# Per-value bitmap indexes over the review rows, for the drill-down filters.
+#
+# For every indexed column and every value in it, the index keeps one bit per
+# review row (numpy packbits, 1 bit per row: ~125 KB per value for a million
+# reviews), built once per data version when the rows are loaded. A filter
+# selection is then
+#
+#   OR of the selected values' bitmaps    within a column
+#   AND across the filtered columns       between columns
+#
+# on packed bytes (8 rows per byte operation), and only the matching rows are
+# gathered and folded into the usual accumulators (analytics.streaming), so
+# every section of the review page works unchanged on the drilled-down rows.
+#
+# Files too large to load (streaming.use_streaming) get the same index: one
+# chunked pass over the CSV per data version writes their typed rows to an
+# Arrow file in the cache folder (Sales/.cache/Reviews.rows.<version>.arrow),
+# the bitmaps are built from that memory-mapped file, and a selection folds the
+# matching rows one record batch at a time.
+#
+# Filter values are the labels the sidebar shows: category values as they
+# appear in the CSV and "Yes"/"No" for the Discount Applied flag.
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from analytics import ingest, streaming
+
+# Review attributes offered as extra filters and drill-down dimensions
+DRILL_DOWN = ['Order Type', 'Customer Feedback Type', 'Price Range', 'Discount Applied']
+INDEXED = streaming.STATS_KEYS + DRILL_DOWN
+FLAG_LABELS = np.array(['No', 'Yes'], dtype=object)
+
+
+def labels(values):
+    """Filter labels of a column: flags as "Yes"/"No", everything else unchanged."""
+    if values.dtype.kind == 'b':
+        return pd.Series(pd.Categorical.from_codes(values.to_numpy().astype('int8'), FLAG_LABELS),
+                         index=values.index, name=values.name)
+    return values
+
+
+def flag_value(label):
+    """Stored value of a flag label ("Yes" -> 1)."""
+    return int(str(label) == FLAG_LABELS[1])
+
+
+def restricting(filters, options):
+    """The entries of `filters` that leave out at least one of their column's `options`."""
+    return {col: list(values) for col, values in filters.items()
+            if values is not None and set(values) != set(options.get(col, ()))}
+
+
+class BitmapIndex:
+    """Packed per-value bitmaps of the indexed columns of `n_rows` rows (read-only once built)."""
+
+    def __init__(self, n_rows, bitmaps):
+        self.n_rows = n_rows
+        self.bitmaps = bitmaps  # column -> {label: packed uint8 array}
+
+    @property
+    def nbytes(self):
+        return sum(bits.nbytes for values in self.bitmaps.values() for bits in values.values())
+
+    def options(self, column):
+        return sorted(self.bitmaps[column])
+
+    def mask(self, filters):
+        """Packed bitmap of the rows matching every {column: selected labels} (None means any)."""
+        acc = np.packbits(np.ones(self.n_rows, dtype=bool))
+        for column, values in filters.items():
+            if values is None:
+                continue
+            selected = np.zeros_like(acc)
+            for value in values:
+                bits = self.bitmaps[column].get(value)
+                if bits is not None:
+                    np.bitwise_or(selected, bits, out=selected)
+            np.bitwise_and(acc, selected, out=acc)
+        return acc
+
+    def rows(self, filters):
+        """Positions of the matching rows, ascending."""
+        return np.flatnonzero(np.unpackbits(self.mask(filters), count=self.n_rows))
+
+
+def _bits_setter(n_rows):
+    # Packed bitmaps filled one batch at a time; every batch but the last is a
+    # multiple of 8 rows, so each starts on a byte boundary.
+    bitmaps = {}
+
+    def add(column, values, offset):
+        codes, uniques = pd.factorize(labels(values))
+        column_bits = bitmaps.setdefault(column, {})
+        for i, value in enumerate(uniques):
+            bits = column_bits.get(value)
+            if bits is None:
+                bits = column_bits[value] = np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+            packed = np.packbits(codes == i)
+            bits[offset // 8:offset // 8 + len(packed)] = packed
+    return bitmaps, add
+
+
+def build_index(df, columns=INDEXED):
+    """BitmapIndex over the `columns` of the typed review rows in `df`."""
+    bitmaps = {}
+    for column in columns:
+        if column not in df.columns:
+            continue
+        values = labels(df[column])
+        codes, uniques = pd.factorize(values)
+        # Missing values get no bitmap: they only pass when the column is unfiltered
+        bitmaps[column] = {uniques[i]: np.packbits(codes == i) for i in range(len(uniques))}
+    return BitmapIndex(len(df), bitmaps)
+
+
+def chunk_mask(chunk, filters):
+    """Boolean row mask of a typed chunk, for data that is streamed instead of indexed."""
+    mask = np.ones(len(chunk), dtype=bool)
+    for column, values in filters.items():
+        if values is not None:
+            mask &= labels(chunk[column]).isin(values).to_numpy()
+    return mask
+
+
+def breakdown_fold(column):
+    """Fold function for accumulators per (Agent Name, `column` label)."""
+    def fold(chunk):
+        return streaming.fold_chunk(chunk.assign(**{column: labels(chunk[column])}), keys=['Agent Name', column])
+    return fold
+
+
+# -------------------------
+# Streamed files
+# -------------------------
+# Arrow types of the row file: one schema for every chunk, whatever the
+# per-chunk categories or downcast numbers were
+ROW_TYPES = {'category': pa.string(), 'bool': pa.bool_(), 'float32': pa.float32()}
+
+
+def _write_rows(path, rows_path, chunksize):
+    header = pd.read_csv(path, nrows=0).columns
+    schema = {c: kind for c, kind in ingest.REVIEW_SCHEMA.items() if c in header}
+    arrow_schema = pa.schema([(c, ROW_TYPES.get(kind, pa.float64())) for c, kind in schema.items()])
+    dtype = {c: 'category' for c, kind in schema.items() if kind in ('category', 'bool')}
+    tmp_path = f"{rows_path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, arrow_schema) as writer:
+        for chunk in pd.read_csv(path, usecols=list(schema), dtype=dtype, chunksize=chunksize - chunksize % 8):
+            chunk = ingest.apply_schema(chunk, schema)
+            chunk = chunk.astype({c: object for c, kind in schema.items() if kind == 'category'})
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=arrow_schema, preserve_index=False))
+    os.replace(tmp_path, rows_path)
+
+
+def streamed_rows(path, version, chunksize=streaming.DEFAULT_CHUNKSIZE):
+    """(Arrow table of the typed rows, BitmapIndex) of the CSV at `path`, without loading it.
+
+    The row file is written on first use per data version (older versions' files
+    are removed) and memory-mapped; the index is built one record batch at a time.
+    """
+    rows_path = ingest.cache_path(path, f'.rows.{version}.arrow')
+    with ingest.cache_lock(path):
+        if not os.path.exists(rows_path):
+            _write_rows(path, rows_path, chunksize)
+            for old in glob.glob(glob.escape(ingest.cache_path(path, '.rows.')) + '*.arrow'):
+                if old != rows_path:
+                    os.remove(old)
+    table = pa.ipc.open_file(pa.memory_map(rows_path, 'r')).read_all()
+    indexed = [c for c in INDEXED if c in table.column_names]
+    bitmaps, add = _bits_setter(table.num_rows)
+    offset = 0
+    for batch in table.select(indexed).to_batches():
+        chunk = batch.to_pandas()
+        for column in indexed:
+            add(column, chunk[column], offset)
+        offset += batch.num_rows
+    return table, BitmapIndex(table.num_rows, bitmaps)
+
+
+def fold_rows(table, index, filters, fold, combine, columns):
+    """Fold the rows of `table` matching `filters`, one record batch at a time (None if none match)."""
+    rows = index.rows(filters)
+    acc, offset = None, 0
+    for batch in table.select(columns).to_batches():
+        lo, hi = np.searchsorted(rows, [offset, offset + batch.num_rows])
+        if hi > lo:
+            acc = combine(acc, fold(batch.take(pa.array(rows[lo:hi] - offset)).to_pandas()))
+        offset += batch.num_rows
+    return acc
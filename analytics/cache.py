@@ -0,0 +1,135 @@
+# analytics/cache.py
+# Process-wide LRU cache for filtered views and the aggregates derived from them.
+#
+# Entries are keyed by data version + section name + the normalized (sorted)
+# filter selection, so toggling back to a previous selection is a lookup rather
+# than a fresh mask over the data. The cache lives at module level, which makes
+# it shared by every Streamlit session in the server process. Cached values are
+# shared too: callers must treat them as read-only.
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_BUDGET_MB = float(os.environ.get("DASHBOARD_FILTER_CACHE_MB", "256"))
+
+
+def normalize_filters(filters):
+    """Turn {name: selection} into a hashable, order-independent tuple."""
+    items = []
+    for name, values in sorted((filters or {}).items()):
+        if values is None:
+            items.append((name, None))
+        elif isinstance(values, (list, tuple, set, frozenset)):
+            items.append((name, tuple(sorted(str(v) for v in values))))
+        else:
+            items.append((name, str(values)))
+    return tuple(items)
+
+
+def make_key(version, name, filters=None):
+    return (version, name, normalize_filters(filters))
+
+
+def estimate_bytes(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(getattr(obj, 'nbytes', None), int):
+        return obj.nbytes  # numpy arrays, figures.Chart
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(estimate_bytes(v) for v in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_bytes(v) for v in obj.values())
+    return sys.getsizeof(obj)
+
+
+class FilterCache:
+    """Thread-safe LRU cache bounded by an approximate memory budget."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = int(DEFAULT_BUDGET_MB * 2**20 if max_bytes is None else max_bytes)
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        nbytes = estimate_bytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if nbytes > self.max_bytes:
+                # Larger than the whole budget: hand it back without caching.
+                return value
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        # Two sessions missing on the same key may both compute; the second put
+        # just replaces the first, which is cheaper than holding the lock while
+        # computing.
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = self.put(key, compute())
+        return value
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            while self.bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """The process-wide cache used by the dashboard pages."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = FilterCache()
+        return _shared
@@ -0,0 +1,161 @@
+# analytics/combined.py
+# Revenue x reviews: the join behind the Combined Analysis page.
+#
+# Revenue.csv names the platform in `Platform`, Reviews.csv in `Agent Name`, and
+# only the reviews have a `Location`. The KeyIndex, built once per pair of data
+# versions from the two aggregated inputs the other pages already use (revenue
+# cube, review accumulators), holds
+#
+#   platforms  dimension table: Platform ID, Platform (display name), Key
+#              (the normalized name both files are matched on)
+#   locations  dimension table: Location ID, Location
+#   revenue    orders and revenue per Platform ID (numpy arrays)
+#   pairs      review accumulators per (Platform ID, Location ID) pair
+#
+# so a filter selection is answered by masking integer id arrays and gathering
+# the platform revenue with a take: no merged frame of orders and reviews is
+# ever built, and every result has one row per platform or pair.
+#
+# Revenue has no location, so revenue per order is a platform figure; the pair
+# rows carry their platform's value next to the location's review metrics.
+import numpy as np
+import pandas as pd
+
+from analytics import streaming
+
+# Review metrics of the joined tables: column -> (accumulator, scale)
+METRICS = {
+    'Avg Service Rating': ('Customer Service Rating sum', 1),
+    'Avg Delivery Time (min)': ('Delivery Time (min) sum', 1),
+    'Product Availability (%)': ('Product Availability sum', 100),
+    'Order Accuracy (%)': ('Order Accuracy sum', 100),
+}
+
+
+def normalize(name):
+    """Matching key of a platform/location name: trimmed, single-spaced, case-folded."""
+    return ' '.join(str(name).split()).casefold()
+
+
+def _dimension(names, column):
+    # One row per normalized key; the first spelling seen is the display name
+    names = [n for n in names if not pd.isna(n)]
+    keys = pd.Series([normalize(n) for n in names], dtype=object)
+    first = ~keys.duplicated().to_numpy()
+    table = pd.DataFrame({column: pd.Series(names, dtype=object)[first].to_numpy(),
+                          'Key': keys[first].to_numpy()})
+    table = table.sort_values('Key', ignore_index=True)
+    table.insert(0, f'{column} ID', np.arange(len(table), dtype='int32'))
+    return table
+
+
+def _ids(dimension, names):
+    """Integer ids of `names` in `dimension` (-1 for unknown names)."""
+    lookup = pd.Series(dimension.iloc[:, 0].to_numpy(), index=dimension['Key'].to_numpy())
+    keys = [normalize(n) for n in names]
+    return lookup.reindex(keys).fillna(-1).to_numpy(dtype='int32')
+
+
+class KeyIndex:
+    """Dimension tables and integer-keyed aggregates of both datasets (read-only once built)."""
+
+    def __init__(self, platforms, locations, revenue, pairs):
+        self.platforms = platforms
+        self.locations = locations
+        self.revenue = revenue  # {'Orders': array, 'Revenue': array}, indexed by Platform ID
+        self.pairs = pairs      # {'platform', 'location', <accumulator>: array}, one entry per pair
+
+    @property
+    def nbytes(self):
+        arrays = list(self.revenue.values()) + list(self.pairs.values())
+        frames = (self.platforms, self.locations)
+        return sum(a.nbytes for a in arrays) + sum(int(f.memory_usage(deep=True).sum()) for f in frames)
+
+    def platform_ids(self, names):
+        return _ids(self.platforms, names)
+
+    def location_ids(self, names):
+        return _ids(self.locations, names)
+
+
+def build_index(revenue_cube, review_stats):
+    """KeyIndex from the (unfiltered) revenue cube and review accumulators."""
+    by_platform = revenue_cube.groupby('Platform', observed=True)[['Orders', 'Revenue']].sum()
+    agents = review_stats.index.get_level_values('Agent Name')
+    locs = review_stats.index.get_level_values('Location')
+    platforms = _dimension(list(by_platform.index) + sorted(set(agents.dropna())), 'Platform')
+    locations = _dimension(sorted(set(locs.dropna())), 'Location')
+
+    revenue = {col: np.zeros(len(platforms), dtype='float64') for col in ('Orders', 'Revenue')}
+    ids = _ids(platforms, by_platform.index)
+    for col in revenue:
+        np.add.at(revenue[col], ids, by_platform[col].to_numpy(dtype='float64'))
+
+    pairs = {'platform': _ids(platforms, agents), 'location': _ids(locations, locs)}
+    known = (pairs['platform'] >= 0) & (pairs['location'] >= 0)
+    pairs = {key: ids[known] for key, ids in pairs.items()}
+    for col in streaming.stat_columns():
+        pairs[col] = review_stats[col].to_numpy(dtype='float64')[known]
+    return KeyIndex(platforms, locations, revenue, pairs)
+
+
+# -------------------------
+# Joined tables
+# -------------------------
+def _metrics(table, sums):
+    for column, (accumulator, scale) in METRICS.items():
+        table[column] = sums[accumulator] / sums['count'] * scale
+    return table
+
+
+def join(index, platforms=None, locations=None):
+    """Per-(platform, location) review metrics with the platform's revenue per order."""
+    mask = np.ones(len(index.pairs['platform']), dtype=bool)
+    if platforms is not None:
+        mask &= np.isin(index.pairs['platform'], index.platform_ids(platforms))
+    if locations is not None:
+        mask &= np.isin(index.pairs['location'], index.location_ids(locations))
+    pairs = {key: values[mask] for key, values in index.pairs.items()}
+    platform_id = pairs['platform']
+    orders = index.revenue['Orders'].take(platform_id)
+    table = pd.DataFrame({
+        'Platform': index.platforms['Platform'].to_numpy().take(platform_id),
+        'Location': index.locations['Location'].to_numpy().take(pairs['location']),
+        'Reviews': pairs['count'].astype('int64'),
+        'Revenue per Order (INR)': np.divide(index.revenue['Revenue'].take(platform_id), orders,
+                                             out=np.full(len(orders), np.nan), where=orders > 0),
+    })
+    return _metrics(table, pairs).sort_values(['Platform', 'Location'], ignore_index=True)
+
+
+def platform_summary(index, platforms=None, locations=None):
+    """Per selected platform: orders, revenue, revenue per order and review metrics over the selected locations."""
+    ids = (index.platforms['Platform ID'].to_numpy() if platforms is None
+           else np.unique(index.platform_ids(platforms)))
+    ids = ids[ids >= 0]
+    mask = np.isin(index.pairs['platform'], ids)
+    if locations is not None:
+        mask &= np.isin(index.pairs['location'], index.location_ids(locations))
+    # Sum the pair accumulators per platform: one bincount per accumulator
+    sums = {col: np.bincount(index.pairs['platform'][mask], weights=index.pairs[col][mask],
+                             minlength=len(index.platforms)).take(ids)
+            for col in streaming.stat_columns()}
+    orders, revenue = index.revenue['Orders'].take(ids), index.revenue['Revenue'].take(ids)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = pd.DataFrame({
+            'Platform': index.platforms['Platform'].to_numpy().take(ids),
+            'Orders': orders.astype('int64'),
+            'Revenue (INR)': revenue,
+            'Revenue per Order (INR)': np.where(orders > 0, revenue / orders, np.nan),
+            'Reviews': sums['count'].astype('int64'),
+        })
+        return _metrics(table, sums)
+
+
+def correlations(joined):
+    """Pearson correlation of revenue per order with each review metric, across the joined pairs."""
+    values = joined[['Revenue per Order (INR)', *METRICS]].dropna()
+    if len(values) < 3 or values['Revenue per Order (INR)'].nunique() < 2:
+        return pd.DataFrame(columns=['Metric', 'Correlation with Revenue per Order'])
+    corr = values.corr()['Revenue per Order (INR)'].drop('Revenue per Order (INR)')
+    return corr.rename_axis('Metric').reset_index(name='Correlation with Revenue per Order')
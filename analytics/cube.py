@@ -0,0 +1,59 @@
+# analytics/cube.py
+# Pre-aggregated revenue cube: one row per (Platform, Product Category, order day)
+# holding the order count and revenue sum. Built once per data version; every KPI
+# and chart on the revenue page is then a roll-up over groups instead of orders.
+import pandas as pd
+
+CUBE_KEYS = ['Platform', 'Product Category', 'Order Date']
+VALUE_COL = 'Order Value (INR)'
+
+
+def build_revenue_cube(df):
+    keys = [c for c in CUBE_KEYS if c in df.columns]
+    frame = df[keys].copy()
+    if 'Order Date' in frame.columns:
+        frame['Order Date'] = frame['Order Date'].dt.floor('D')
+    frame['Orders'] = 1
+    if VALUE_COL in df.columns:
+        values = df[VALUE_COL]
+        frame['Revenue'] = values.astype('int64' if values.dtype.kind in 'iu' else 'float64')
+    else:
+        frame['Revenue'] = 0
+    if not keys:
+        return pd.DataFrame({'Orders': [len(df)], 'Revenue': [frame['Revenue'].sum()]})
+    # dropna=False keeps rows with a missing key so grand totals match the raw data.
+    return (frame.groupby(keys, observed=True, dropna=False, sort=False)[['Orders', 'Revenue']]
+            .sum().reset_index())
+
+
+def merge_cubes(left, right):
+    """Fold `right` into `left` (e.g. the cube of a newly appended batch)."""
+    keys = [c for c in CUBE_KEYS if c in left.columns]
+    merged = pd.concat([left, right], ignore_index=True)
+    if not keys:
+        return merged.sum().to_frame().T
+    merged = (merged.groupby(keys, observed=True, dropna=False, sort=False)[['Orders', 'Revenue']]
+              .sum().reset_index())
+    for key in ('Platform', 'Product Category'):
+        if key in merged.columns:
+            merged[key] = merged[key].astype('category')
+    return merged
+
+
+def filter_cube(cube, platforms=None):
+    """Restrict the cube to the selected platforms (no selection means everything)."""
+    if platforms and 'Platform' in cube.columns:
+        return cube[cube['Platform'].isin(platforms)]
+    return cube
+
+
+def kpis(cube):
+    """(total revenue, average order value, total orders) for a (filtered) cube."""
+    orders = int(cube['Orders'].sum())
+    revenue = cube['Revenue'].sum()
+    return revenue, (revenue / orders if orders else float('nan')), orders
+
+
+def rollup(cube, by):
+    """Orders and Revenue summed over the cube groups, grouped by `by`."""
+    return cube.groupby(by, observed=True)[['Orders', 'Revenue']].sum()
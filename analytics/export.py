@@ -0,0 +1,274 @@
+# analytics/export.py
+# Streaming CSV / Parquet export of the pages' aggregates and filtered rows.
+#
+# Every export is a lazy sequence of DataFrame chunks encoded on the fly:
+#
+#   frames()         the chunks of one table: an aggregate (computed by the
+#                    page's own code in analytics.views, through the shared
+#                    filter cache, then sliced) or the filtered raw rows, read
+#                    CHUNK_ROWS at a time from the memory-mapped Arrow cache
+#                    (or the CSV when streamed)
+#   csv_stream()     header once, then one CSV block per chunk
+#   parquet_stream() one row group per chunk, handed out as soon as written
+#
+# so exporting millions of filtered rows never holds more than one chunk.
+# routes() mounts GET /export/<dataset>/<table>.<csv|parquet>?filters=<json>
+# on the st.App server (app.py); `filters` is the page's own filter dict
+# (views.FILTERS; anything else is answered with 400 and the reason). The
+# sidebar panel links there, or falls back to an in-memory download button for
+# aggregates when the pages run without app.py.
+import json
+import os
+import urllib.parse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from analytics import backends, bitmaps, ingest, sources, streaming, views
+
+CHUNK_ROWS = int(os.environ.get("DASHBOARD_EXPORT_CHUNK_ROWS", "100000"))
+
+FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+ROWS = 'rows'
+
+# Exportable tables per dataset, in sidebar order, with their labels
+TABLES = {
+    'revenue': {
+        'platform_sales': "Platform-wise sales",
+        'orders_per_platform': "Orders per platform",
+        'category_counts': "Orders per platform & category",
+        'most_least': "Most & least ordered category",
+        'revenue_per_order': "Revenue per order",
+        'category_contribution': "Category contribution",
+        'trend': "Revenue & orders trend",
+        'cube': "Daily platform/category aggregates",
+        ROWS: "Filtered orders (raw rows)",
+    },
+    'reviews': {
+        'avg_delivery': "Average delivery time",
+        'delivery_percentiles': "Delivery time p50 / p90 / p99",
+        'most_used_platform': "Most used platform per location",
+        'avg_feedback': "Average customer feedback",
+        'order_product': "Order accuracy & availability",
+        'stats': "Agent/location accumulators",
+        ROWS: "Filtered reviews (raw rows)",
+    },
+}
+
+_routes_mounted = False
+
+
+# -------------------------
+# Aggregates (the pages' own computations and cache keys, see analytics.views)
+# -------------------------
+def _revenue_table(name, path, filters, backend):
+    view = views.revenue_view(path, filters, backend)
+    if name == 'cube':
+        return view.base
+    section = 'category_counts' if name == 'most_least' else name
+    if section not in view.tables:
+        raise LookupError(f"{path} lacks the columns for {name!r}")
+    table = view.tables[section]()
+    if section == 'category_counts':
+        return table[1] if name == 'most_least' else table[0]
+    return table
+
+
+def _drill_down(filters):
+    # The review page's attribute filters (see analytics.bitmaps), keyed by column
+    return {k: v for k, v in filters.items() if k in bitmaps.DRILL_DOWN}
+
+
+def _review_table(name, path, filters, backend):
+    view = views.reviews_view(path, filters, backend)
+    if name == 'stats':
+        return view.base.reset_index()
+    if name == 'delivery_percentiles':
+        return view.tables['delivery_distribution']()[1]
+    return view.tables[name]()
+
+
+def aggregate(dataset, name, filters, path=None, backend=None):
+    """One aggregate table of `dataset` for the page filter dict `filters`."""
+    compute = _revenue_table if dataset == 'revenue' else _review_table
+    return compute(name, path or sources.path(dataset), filters, backend or views.backend())
+
+
+# -------------------------
+# Filtered raw rows
+# -------------------------
+def _revenue_mask(chunk, filters):
+    mask = pd.Series(True, index=chunk.index)
+    if filters.get('Platform') and 'Platform' in chunk.columns:
+        mask &= chunk['Platform'].isin(filters['Platform'])
+    if filters.get('Order Date') and 'Order Date' in chunk.columns:
+        start, end = (pd.Timestamp(d) for d in filters['Order Date'])
+        days = chunk['Order Date'].dt.floor('D')
+        mask &= (days >= start) & (days <= end)
+    return mask
+
+
+def _review_mask(chunk, filters):
+    mask = pd.Series(True, index=chunk.index)
+    for key, column in (('Platform', 'Agent Name'), ('Location', 'Location')):
+        if filters.get(key) is not None:
+            mask &= chunk[column].isin(filters[key])
+    return mask & bitmaps.chunk_mask(chunk, _drill_down(filters))
+
+
+def raw_rows(dataset, filters, path=None, chunk_rows=CHUNK_ROWS):
+    """Yield the rows matching `filters`, one chunk at a time (at least one, possibly empty, chunk)."""
+    path = path or sources.path(dataset)
+    if dataset == 'revenue':
+        chunks, mask = ingest.iter_typed(path, ingest.REVENUE_SCHEMA, chunk_rows), _revenue_mask
+    elif streaming.use_streaming(path):
+        # Streamed datasets have no typed cache: parse the CSV chunk by chunk instead
+        chunks = (ingest.apply_schema(chunk, ingest.REVIEW_SCHEMA)
+                  for chunk in pd.read_csv(path, chunksize=chunk_rows))
+        mask = _review_mask
+    else:
+        chunks, mask = ingest.iter_typed(path, ingest.REVIEW_SCHEMA, chunk_rows), _review_mask
+    empty = None
+    for chunk in chunks:
+        selected = chunk[mask(chunk, filters).to_numpy()]
+        if len(selected):
+            empty = False
+            yield selected
+        elif empty is None:
+            empty = selected
+    if empty is not False:
+        yield empty if empty is not None else pd.DataFrame(columns=backends.csv_columns(path))
+
+
+def frames(dataset, name, filters, path=None, backend=None, chunk_rows=CHUNK_ROWS):
+    """Lazy DataFrame chunks of one exportable table."""
+    if dataset not in TABLES or name not in TABLES[dataset]:
+        raise LookupError(f"no exportable table {dataset}/{name}")
+    views.check_filters(dataset, filters)
+    if name == ROWS:
+        yield from raw_rows(dataset, filters, path, chunk_rows)
+        return
+    table = aggregate(dataset, name, filters, path, backend)
+    for start in range(0, max(len(table), 1), chunk_rows):
+        yield table.iloc[start:start + chunk_rows]
+
+
+# -------------------------
+# Encoders
+# -------------------------
+def csv_stream(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode()
+        header = False
+
+
+class _Sink:
+    """Write-only file object whose contents are drained after every row group."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _arrow_table(chunk):
+    # Plain values instead of per-chunk dictionaries, so every row group shares one schema
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    return pa.table([col.cast(col.type.value_type) if pa.types.is_dictionary(col.type) else col
+                     for col in table.columns], names=table.column_names)
+
+
+def parquet_stream(chunks):
+    sink, writer = _Sink(), None
+    for chunk in chunks:
+        table = _arrow_table(chunk)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        else:
+            table = table.cast(writer.schema)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def stream(dataset, name, fmt, filters, path=None, backend=None):
+    """Encoded bytes of one table. The first chunk is computed right away, so bad requests fail here."""
+    if fmt not in FORMATS:
+        raise LookupError(f"unknown export format {fmt!r}")
+    chunks = frames(dataset, name, filters, path, backend)
+    first = next(chunks)
+
+    def all_chunks():
+        yield first
+        yield from chunks
+
+    return (csv_stream if fmt == 'csv' else parquet_stream)(all_chunks())
+
+
+def file_name(dataset, name, fmt):
+    return f"{dataset}-{name}.{fmt}"
+
+
+# -------------------------
+# HTTP endpoint (st.App routes) and sidebar panel
+# -------------------------
+def url(dataset, name, fmt, filters):
+    query = urllib.parse.urlencode({'filters': json.dumps(filters, default=str)})
+    return f"/export/{dataset}/{name}.{fmt}?{query}"
+
+
+def routes():
+    """Starlette routes for app.py; marks the export endpoint as available to the pages."""
+    global _routes_mounted
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    def endpoint(request):
+        dataset, name, fmt = (request.path_params[k] for k in ('dataset', 'name', 'fmt'))
+        try:
+            filters = json.loads(request.query_params.get('filters', '{}'))
+            body = stream(dataset, name, fmt, filters)
+        except (LookupError, FileNotFoundError) as exc:
+            return JSONResponse({'error': str(exc)}, status_code=404)
+        except ValueError as exc:
+            return JSONResponse({'error': str(exc)}, status_code=400)
+        disposition = f'attachment; filename="{file_name(dataset, name, fmt)}"'
+        return StreamingResponse(body, media_type=FORMATS[fmt], headers={'Content-Disposition': disposition})
+
+    _routes_mounted = True
+    return [Route("/export/{dataset}/{name}.{fmt}", endpoint)]
+
+
+def sidebar_panel(dataset, filters):
+    """Table/format picker with a streaming download link (or an in-memory download button)."""
+    import streamlit as st
+
+    with st.sidebar.expander("⬇️ Export", expanded=False):
+        tables = TABLES[dataset]
+        name = st.selectbox("Table", list(tables), format_func=tables.get, key=f"export_{dataset}_table")
+        fmt = st.radio("Format", list(FORMATS), format_func=str.upper, horizontal=True,
+                       key=f"export_{dataset}_format")
+        if _routes_mounted:
+            st.markdown(f"[⬇️ {file_name(dataset, name, fmt)}]({url(dataset, name, fmt, filters)})")
+        elif name == ROWS:
+            st.caption("Streaming raw rows needs the server started with `streamlit run app.py`.")
+        else:
+            st.download_button("Download", lambda: b''.join(stream(dataset, name, fmt, filters)),
+                               file_name=file_name(dataset, name, fmt), mime=FORMATS[fmt])
+        st.caption("Exports use the filters selected above.")
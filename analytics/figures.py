@@ -0,0 +1,324 @@
+# analytics/figures.py
+# Build the dashboard's Plotly figures from already-aggregated tables.
+#
+# Every chart is drawn from the small per-section tables in analytics.revenue /
+# analytics.reviews, never from raw rows, so Plotly has nothing left to bin in
+# the browser. Each figure is checked against a serialized-size budget: if its
+# JSON would exceed it, the chart keeps only the leading categories (largest by
+# volume where the table has one) and says so in an annotation. Results are
+# Chart objects that the pages keep in the shared filter cache, so an unchanged
+# selection reuses the built figure instead of drawing it again. A Chart holds
+# the figure as the plain dict of the JSON that was measured, not the
+# go.Figure, so rendering it does not serialize the figure again.
+import json
+import os
+
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+DEFAULT_BUDGET_KB = float(os.environ.get("DASHBOARD_FIGURE_BUDGET_KB", "512"))
+
+
+class Chart:
+    """A built figure (as its JSON dict) plus its wire size and how many categories it shows."""
+
+    def __init__(self, spec, nbytes, shown, total):
+        self.spec = spec      # plain {'data': ..., 'layout': ...}; st.plotly_chart / plotly.io take it as is
+        self.nbytes = nbytes  # serialized JSON size; also what the filter cache charges
+        self.shown = shown
+        self.total = total
+
+    @property
+    def truncated(self):
+        return self.shown < self.total
+
+
+def to_json(fig):
+    # Same encoding Streamlit uses when it ships the figure to the browser.
+    return pio.to_json(fig, validate=False)
+
+
+def payload_bytes(fig):
+    return len(to_json(fig))
+
+
+def limit(table, key, k, rank_by=None):
+    """Rows of `table` for the first `k` values of `key` (largest `rank_by` totals if given)."""
+    if rank_by is None:
+        keep = table[key].drop_duplicates().iloc[:k]
+    else:
+        keep = table.groupby(key, observed=True, sort=False)[rank_by].sum().nlargest(k).index
+    return table[table[key].isin(keep)]
+
+
+def fit(draw, table, key, rank_by=None, budget_kb=None, **kwargs):
+    """Draw `table`, dropping trailing `key` categories until the JSON fits the budget."""
+    budget = (DEFAULT_BUDGET_KB if budget_kb is None else budget_kb) * 1024
+    total = shown = table[key].nunique()
+    fig = draw(table, **kwargs)
+    payload = to_json(fig)
+    while len(payload) > budget and shown > 1:
+        shown = max(1, min(shown - 1, int(shown * budget / len(payload) * 0.9)))
+        fig = draw(limit(table, key, shown, rank_by), **kwargs)
+        payload = to_json(fig)
+    if shown < total:
+        order = f"largest by {rank_by}" if rank_by else "first"
+        fig.add_annotation(text=f"Showing {shown} of {total} {key} values ({order})",
+                           xref='paper', yref='paper', x=0, y=1.06, showarrow=False)
+        payload = to_json(fig)
+    return Chart(json.loads(payload), len(payload), shown, total)
+
+
+# -------------------------
+# Revenue Analysis
+# -------------------------
+def orders_per_platform(orders_table):
+    fig_orders = px.bar(orders_table, x='Platform', y='Total Orders', text='Total Orders',color='Platform')
+    fig_orders.update_traces(texttemplate='%{text:,}', textposition='outside')
+    return fig_orders
+
+
+def platform_sales(platform_sales):
+    # Approximate-mode tables carry a ± column: draw it as error bars
+    error = 'Total Sales (INR, Lakh) ±'
+    fig_sales = px.bar(platform_sales, x='Total Sales (INR, Lakh)', y='Platform', orientation='h',
+                       text='Total Sales (INR, Lakh)', color='Platform',
+                       error_x=error if error in platform_sales.columns else None)
+    fig_sales.update_traces(texttemplate='%{text:.2f}', textposition='outside')
+    return fig_sales
+
+
+def category_counts(cat_count):
+    # Stacked bar chart showing percentage breakdown for visual comparison
+    chart_cat = px.bar(
+        cat_count,
+        x='Platform',
+        y='Percentage',
+        color='Product Category',
+        title='Category Breakdown per Platform (Percentage)',
+        text='Percentage',
+        barmode='stack'
+    )
+    chart_cat.update_traces(texttemplate='%{text:.2f}%', textposition='inside', textfont_size=14, textfont_color='white')
+    chart_cat.update_layout(yaxis_title='Percentage', xaxis_title='Platform', legend_title='Product Category', height=500)
+    return chart_cat
+
+
+def revenue_per_order(rpo):
+    return px.scatter(rpo, x='Platform', y='Revenue per Order (INR)', size='Revenue per Order (INR)',
+                      hover_name='Platform', size_max=80,color='Platform')
+
+
+def category_contribution(category_contribution):
+    # Create grouped bar chart
+    error = 'Contribution (%) ±'
+    chart_category = px.bar(
+        category_contribution,
+        x='Platform',
+        y='Contribution (%)',
+        color='Product Category',
+        barmode='group',
+        text='Contribution (%)',
+        error_y=error if error in category_contribution.columns else None
+    )
+
+    # Style labels and layout
+    chart_category.update_traces(
+        textposition='outside',
+        textfont_color='white',
+        textfont_size=11
+    )
+
+    chart_category.update_layout(
+        yaxis_title='Contribution (%)',
+        xaxis_title='Platform',
+        legend_title='Product Category',
+        height=500
+    )
+    return chart_category
+
+
+def trend(trend_table, window=None):
+    # Revenue on top, orders below; faint line = per period, solid = rolling mean.
+    fig_trend = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                              subplot_titles=('Revenue (INR)', 'Orders'))
+    palette = px.colors.qualitative.Plotly
+    rolling_label = f"{window}-period avg" if window else "rolling avg"
+    for i, (platform, rows) in enumerate(trend_table.groupby('Platform', sort=False)):
+        color = palette[i % len(palette)]
+        for row, measure in ((1, 'Revenue'), (2, 'Orders')):
+            fig_trend.add_trace(go.Scatter(
+                x=rows['Period'], y=rows[measure], mode='lines', name=platform, legendgroup=platform,
+                line=dict(color=color, width=1), opacity=0.35, showlegend=False,
+                hovertemplate=f'{platform}<br>%{{x|%d %b %Y}}<br>{measure}=%{{y:,}}<extra></extra>'), row=row, col=1)
+            fig_trend.add_trace(go.Scatter(
+                x=rows['Period'], y=rows[f'{measure} (rolling)'], mode='lines', name=platform,
+                legendgroup=platform, line=dict(color=color, width=2.5), showlegend=row == 1,
+                hovertemplate=f'{platform}<br>%{{x|%d %b %Y}}<br>{measure} ({rolling_label})=%{{y:,.2f}}'
+                              '<extra></extra>'), row=row, col=1)
+    fig_trend.update_layout(height=650, legend_title='Platform', hovermode='x unified')
+    return fig_trend
+
+
+# -------------------------
+# Review Analysis
+# -------------------------
+def avg_delivery(avg_delivery_df):
+    fig_delivery = px.bar(
+        avg_delivery_df,
+        x='Agent Name',
+        y='Delivery Time (min)',
+        text='Formatted Time',
+        title="Average Delivery Time per Platform",
+        color='Agent Name'
+    )
+    fig_delivery.update_traces(textposition='inside', textfont_color='white', textfont_size=16)
+    return fig_delivery
+
+
+def most_used_platform(most_used_platform):
+    return px.sunburst(
+        most_used_platform,
+        path=['Location', 'Most Used Platform'],
+        color='Most Used Platform',
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        hover_data={'Count': True, 'Share (%)': ':.1f'}
+    )
+
+
+def platform_shares(platform_counts, location):
+    fig_sunburst = px.sunburst(
+        platform_counts,
+        path=['Platform'],          # single level sunburst
+        values='Percentage',
+        title=f"Platform Usage in {location}",
+        color='Platform',
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        hover_data={'Count': True, 'Percentage': ':.1f'}
+    )
+
+    # Add text inside slices
+    fig_sunburst.update_traces(
+        texttemplate='%{label}<br>%{value:.1f}%',
+        textinfo='label+value',
+        insidetextfont=dict(color='white', size=16)
+    )
+    return fig_sunburst
+
+
+def avg_feedback(avg_feedback):
+    # One cell per (Location, Agent Name) mean: ship the matrix, not rows for Plotly to bin.
+    # Pairs with no reviews stay empty instead of showing up as a 0 rating.
+    matrix = avg_feedback.pivot(index='Location', columns='Agent Name', values='Customer Service Rating')
+    fig_heatmap = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(dtype='float64'),
+        x=matrix.columns.astype(str),
+        y=matrix.index.astype(str),
+        coloraxis='coloraxis',
+        hovertemplate='Agent Name=%{x}<br>Location=%{y}<br>Avg Rating=%{z:.2f}<extra></extra>',
+    ))
+    fig_heatmap.update_layout(
+        xaxis_title='Agent Name',
+        yaxis_title='Location',
+        coloraxis=dict(colorscale='RdYlGn'),
+        yaxis=dict(autorange="reversed"), height=600,coloraxis_colorbar_title="Avg Rating ⭐"
+    )
+    return fig_heatmap
+
+
+def order_product(order_product_melted):
+    fig_order = px.bar(
+        order_product_melted,
+        x='Agent Name',
+        y='Percentage',
+        color='Metric',
+        barmode='group',
+        text='Percentage',
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    fig_order.update_traces(texttemplate='%{text:.1f}%', textposition='inside', textfont_color='white')
+    return fig_order
+
+
+def delivery_distribution(distribution):
+    fig_distribution = px.line(
+        distribution,
+        x='Delivery Time (min)',
+        y='Share (%)',
+        color='Agent Name',
+        line_shape='hvh',
+        markers=True
+    )
+    fig_distribution.update_layout(yaxis_ticksuffix='%', hovermode='x unified')
+    return fig_distribution
+
+
+def breakdown(breakdown_table, column, metric):
+    fig_breakdown = px.bar(
+        breakdown_table,
+        x=column,
+        y=metric,
+        color='Agent Name',
+        barmode='group',
+        text=metric
+    )
+    fig_breakdown.update_traces(texttemplate='%{text:,}' if metric == 'Reviews' else '%{text:.1f}',
+                                textposition='inside', textfont_color='white')
+    return fig_breakdown
+
+
+# -------------------------
+# Combined Analysis
+# -------------------------
+def platform_comparison(summary):
+    fig_platforms = px.scatter(
+        summary,
+        x='Avg Service Rating',
+        y='Revenue per Order (INR)',
+        size='Reviews',
+        color='Platform',
+        text='Platform',
+        hover_data={'Orders': ':,', 'Avg Delivery Time (min)': ':.1f', 'Product Availability (%)': ':.1f'}
+    )
+    fig_platforms.update_traces(textposition='top center')
+    return fig_platforms
+
+
+def location_metrics(joined):
+    return px.scatter(
+        joined,
+        x='Avg Delivery Time (min)',
+        y='Avg Service Rating',
+        size='Reviews',
+        color='Platform',
+        hover_name='Location',
+        hover_data={'Revenue per Order (INR)': ':.2f', 'Product Availability (%)': ':.1f'}
+    )
+
+
+# name -> (draw function, category column trimmed under budget, column ranking those categories)
+FIGURES = {
+    'orders_per_platform': (orders_per_platform, 'Platform', 'Total Orders'),
+    'platform_sales': (platform_sales, 'Platform', 'Order Value (INR)'),
+    'category_counts': (category_counts, 'Platform', 'Orders'),
+    'revenue_per_order': (revenue_per_order, 'Platform', 'Total Orders'),
+    'category_contribution': (category_contribution, 'Platform', None),
+    'trend': (trend, 'Platform', 'Revenue'),
+    'avg_delivery': (avg_delivery, 'Agent Name', None),
+    'most_used_platform': (most_used_platform, 'Location', 'Count'),
+    'platform_shares': (platform_shares, 'Platform', 'Count'),
+    'avg_feedback': (avg_feedback, 'Location', None),
+    'order_product': (order_product, 'Agent Name', None),
+    'delivery_distribution': (delivery_distribution, 'Agent Name', None),
+    'breakdown': (breakdown, 'Agent Name', 'Reviews'),
+    'platform_comparison': (platform_comparison, 'Platform', 'Orders'),
+    'location_metrics': (location_metrics, 'Location', 'Reviews'),
+}
+
+
+def build(name, table, budget_kb=None, **kwargs):
+    """Chart for section `name` drawn from its aggregated table, within the payload budget."""
+    draw, key, rank_by = FIGURES[name]
+    return fit(draw, table, key, rank_by, budget_kb, **kwargs)
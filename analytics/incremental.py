@@ -0,0 +1,273 @@
+# analytics/incremental.py
+# Incremental append: fold new order/review batches into the stored data and
+# aggregates without rescanning history.
+#
+# An append
+#   1. adds the raw rows to the CSV (it stays the source of truth),
+#   2. writes the typed rows as a new Arrow segment next to the base cache file,
+#   3. folds the batch into the persisted aggregates (revenue cube and its
+#      month partitions, order sample, review stats and delivery sketch),
+#   4. records a new data version in the manifest together with the CSV's new
+#      size/mtime, so ingest.data_version() reports it without re-hashing.
+# The next full rebuild (any out-of-band edit to the CSV) compacts everything.
+# An append holds ingest.cache_lock() throughout, so a concurrent load in
+# another process waits for it instead of rebuilding from the half-appended CSV.
+import argparse
+import csv
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+from analytics import cube, ingest, partitions, sampling, sketches, streaming
+
+REVENUE_PATH = "Sales/Revenue.csv"
+REVIEWS_PATH = "Sales/Reviews.csv"
+
+
+# -------------------------
+# Persisted aggregates
+# -------------------------
+def _read_aggregate(path, name):
+    # Valid only if it was written for the CSV as it is now (data_version re-hashes
+    # the file if it was changed behind our back).
+    manifest = ingest.read_manifest(path) or {}
+    agg_path = ingest.cache_path(path, f".{name}.arrow")
+    if manifest.get('aggregates', {}).get(name) == ingest.data_version(path) and os.path.exists(agg_path):
+        return ingest.read_arrow(agg_path)
+    return None
+
+
+def _write_aggregate(path, name, frame, version):
+    ingest.write_arrow(frame, ingest.cache_path(path, f".{name}.arrow"))
+    with ingest.cache_lock(path):
+        manifest = ingest.read_manifest(path)
+        manifest.setdefault('aggregates', {})[name] = version
+        ingest.write_manifest(path, manifest)
+
+
+def _stats_to_frame(stats):
+    return stats.reset_index()
+
+
+def _frame_to_stats(frame):
+    return frame.set_index(streaming.STATS_KEYS)
+
+
+def load_revenue_cube(path=REVENUE_PATH):
+    """Revenue cube for the current data version, built and persisted on first use."""
+    stored = _read_aggregate(path, 'cube')
+    if stored is not None:
+        for key in ('Platform', 'Product Category'):
+            if key in stored.columns:
+                stored[key] = stored[key].astype('category')
+        return stored
+    built = cube.build_revenue_cube(ingest.load_revenue(path))
+    _write_aggregate(path, 'cube', built, ingest.data_version(path))
+    return built
+
+
+def load_revenue_range(path, start, end):
+    """Daily revenue cube rows for start <= Order Date <= end, from the date-partitioned store."""
+    rows = partitions.read_range(path, start, end)
+    if rows is None:
+        daily = load_revenue_cube(path)
+        partitions.write_partitions(path, daily, ingest.data_version(path))
+        rows = partitions.read_range(path, start, end)
+        if rows is None:
+            # A concurrent rebuild replaced the store in between: answer from the cube
+            rows = partitions.select(daily, start, end)
+    return rows
+
+
+def _sample_name():
+    # The stratum size is part of the name, so changing it draws a new sample.
+    return f'sample{sampling.PER_STRATUM}'
+
+
+def load_revenue_sample(path=REVENUE_PATH):
+    """Stratified order sample (analytics.sampling) for the current data version."""
+    stored = _read_aggregate(path, _sample_name())
+    if stored is not None:
+        return stored
+    version = ingest.data_version(path)
+    built = sampling.build_sample(ingest.load_revenue(path), sampling.rng_for(version))
+    _write_aggregate(path, _sample_name(), built, version)
+    return built
+
+
+def load_review_stats(path=REVIEWS_PATH, streamed=False):
+    """Per-(agent, location) review accumulators for the current data version."""
+    stored = _read_aggregate(path, 'stats')
+    if stored is not None:
+        return _frame_to_stats(stored)
+    if streamed:
+        version = _streamed_manifest(path)['digest']
+        built = streaming.stream_review_stats(path)
+    else:
+        built = streaming.fold_chunk(ingest.load_reviews(path))
+        version = ingest.read_manifest(path)['digest']
+    _write_aggregate(path, 'stats', _stats_to_frame(built), version)
+    return built
+
+
+def load_review_sketch(path=REVIEWS_PATH, streamed=False):
+    """Per-(agent, location) delivery-time histograms for the current data version."""
+    stored = _read_aggregate(path, 'sketch')
+    if stored is not None:
+        return stored.set_index(sketches.SKETCH_KEYS)
+    if streamed:
+        version = _streamed_manifest(path)['digest']
+        built = sketches.stream_sketch(path)
+    else:
+        built = sketches.fold_chunk(ingest.load_reviews(path))
+        version = ingest.read_manifest(path)['digest']
+    _write_aggregate(path, 'sketch', built.reset_index(), version)
+    return built
+
+
+def _streamed_manifest(path):
+    """The manifest of a streamed CSV, brought up to date with the file as it is now.
+
+    Streaming mode never builds the typed cache, so the manifest only carries the
+    digest the streamed aggregates are tagged with. Taken before streaming: if the
+    file changes meanwhile, the tag is stale and the aggregates are rebuilt.
+    """
+    with ingest.cache_lock(path):
+        manifest = ingest.read_manifest(path)
+        st_ = os.stat(path)
+        if manifest is not None and (manifest.get('size'), manifest.get('mtime_ns')) == (st_.st_size, st_.st_mtime_ns):
+            return manifest
+        digest = ingest.file_digest(path)
+        if manifest is not None and manifest.get('digest') == digest:
+            manifest.update(size=st_.st_size, mtime_ns=st_.st_mtime_ns)  # touched but identical
+        else:
+            # Edited out of band: nothing recorded for the old contents applies any more
+            os.makedirs(os.path.dirname(ingest.cache_path(path, '')), exist_ok=True)
+            manifest = {'digest': digest, 'size': st_.st_size, 'mtime_ns': st_.st_mtime_ns, 'segments': []}
+        ingest.write_manifest(path, manifest)
+        return manifest
+
+
+# -------------------------
+# Appending batches
+# -------------------------
+def _batch_payload(batch, header):
+    """CSV bytes (no header, columns in `header` order) for a delta file path or a DataFrame.
+
+    Bytes are taken as rows already in the target's column order, e.g. what
+    another writer appended to a copy of it (analytics.sources).
+    """
+    if isinstance(batch, bytes):
+        return batch
+    if isinstance(batch, (str, os.PathLike)):
+        raw = pd.read_csv(batch, dtype=str, keep_default_na=False)
+    else:
+        raw = pd.DataFrame(batch)
+    missing = [c for c in header if c not in raw.columns]
+    if missing:
+        raise ValueError(f"Batch is missing columns: {missing}")
+    buf = io.StringIO()
+    raw[header].to_csv(buf, header=False, index=False, quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+    return buf.getvalue().encode()
+
+
+def _append_csv(path, payload):
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write(payload)
+
+
+def append_rows(path, batch, schema, typed=True):
+    """Append `batch` to the CSV at `path` (and its typed cache when `typed`).
+
+    Returns (typed batch rows, new data version). The batch is parsed exactly as
+    the full file would be, so its dtypes line up with the base cache.
+    """
+    with ingest.cache_lock(path):
+        if typed:
+            ingest.load_typed(path, schema)  # make sure the base cache is current
+        header = list(pd.read_csv(path, nrows=0).columns)
+        payload = _batch_payload(batch, header)
+        header_buf = io.StringIO()
+        csv.writer(header_buf, lineterminator='\n').writerow(header)
+        rows = ingest.parse_csv(io.BytesIO(header_buf.getvalue().encode() + payload), schema)
+        # Read under the lock: the manifest the new one replaces
+        manifest = ingest.read_manifest(path)
+        version = hashlib.blake2b((manifest['digest'] + ':').encode() + payload, digest_size=16).hexdigest()
+
+        segments = manifest.get('segments', [])
+        if typed:
+            segment = f"{os.path.splitext(os.path.basename(path))[0]}.{version}.arrow"
+            ingest.write_arrow(rows, os.path.join(os.path.dirname(ingest.cache_path(path, '')), segment))
+            segments = segments + [segment]
+        _append_csv(path, payload)
+        st_ = os.stat(path)
+        manifest.update(digest=version, size=st_.st_size, mtime_ns=st_.st_mtime_ns, segments=segments)
+        ingest.write_manifest(path, manifest)
+    return rows, version
+
+
+def append_revenue(batch, path=REVENUE_PATH):
+    """Fold a batch of orders into Revenue.csv, its typed cache and the revenue cube."""
+    with ingest.cache_lock(path):
+        return _append_revenue(batch, path)
+
+
+def _append_revenue(batch, path):
+    previous = load_revenue_cube(path)
+    partitioned = partitions.DATE_COL in previous.columns and \
+        partitions.is_current(path, ingest.data_version(path))
+    sample = _read_aggregate(path, _sample_name())
+    rows, version = append_rows(path, batch, ingest.REVENUE_SCHEMA)
+    batch_cube = cube.build_revenue_cube(rows)
+    _write_aggregate(path, 'cube', cube.merge_cubes(previous, batch_cube), version)
+    if partitioned:
+        # Rewrite only the months the batch touches; a stale store is rebuilt on next read.
+        partitions.update_partitions(path, batch_cube, version)
+    if sample is not None:
+        sample = sampling.fold(sample, rows, sampling.rng_for(version))
+        _write_aggregate(path, _sample_name(), sample, version)
+    return version
+
+
+def append_reviews(batch, path=REVIEWS_PATH):
+    """Fold a batch of reviews into Reviews.csv, its typed cache, the review stats and the delivery sketch."""
+    with ingest.cache_lock(path):
+        return _append_reviews(batch, path)
+
+
+def _append_reviews(batch, path):
+    streamed = streaming.use_streaming(path)
+    previous = load_review_stats(path, streamed=streamed)
+    previous_sketch = load_review_sketch(path, streamed=streamed)
+    # Streamed datasets have no typed cache to extend; only the CSV and aggregates grow.
+    rows, version = append_rows(path, batch, ingest.REVIEW_SCHEMA, typed=not streamed)
+    updated = streaming.combine(previous, streaming.fold_chunk(rows))
+    updated['count'] = updated['count'].astype('int64')
+    _write_aggregate(path, 'stats', _stats_to_frame(updated.sort_index()), version)
+    sketch = sketches.combine(previous_sketch, sketches.fold_chunk(rows))
+    _write_aggregate(path, 'sketch', sketch.sort_index().reset_index(), version)
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append a delta CSV to the dashboard data.")
+    parser.add_argument('dataset', choices=['revenue', 'reviews'])
+    parser.add_argument('delta', help="CSV file with the same header as the target dataset")
+    parser.add_argument('--path', help="target CSV (defaults to the Sales/ file)")
+    args = parser.parse_args(argv)
+    if args.dataset == 'revenue':
+        version = append_revenue(args.delta, args.path or REVENUE_PATH)
+    else:
+        version = append_reviews(args.delta, args.path or REVIEWS_PATH)
+    print(version)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+# analytics/ingest.py
+# Typed, columnar ingestion for Sales/Revenue.csv and Sales/Reviews.csv.
+#
+# Each CSV is parsed once into an uncompressed Arrow IPC file under
+# Sales/.cache/. Later loads memory-map that file, so numeric columns are
+# read without a copy. The CSV is only re-parsed when its contents change.
+#
+# Rebuilds, appends (analytics.incremental) and manifest updates of one CSV
+# run under cache_lock(): an exclusive lock file next to the manifest, held
+# across processes, so a rebuild never picks up rows an append is about to
+# add as a segment.
+import contextlib
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:  # no inter-process locks on this platform; threads are still serialized
+    fcntl = None
+
+CACHE_DIR_NAME = ".cache"
+FORMAT_VERSION = 3
+
+# Column -> kind. Kinds:
+#   category  low-cardinality string, stored dictionary-encoded
+#   string    free text / identifiers
+#   number    coerced to numeric, NaN/inf -> 0, downcast to the smallest lossless dtype
+#   int8      small integer flag, NaN/inf -> 0; a wider dtype if any value is
+#             fractional or outside -128..127
+#   float32   rating-like decimal, NaN/inf -> 0
+#   bool      Yes/No flag (also true/false, 1/0); anything else -> False
+#   datetime  parsed date, invalid -> NaT
+REVENUE_SCHEMA = {
+    'Order ID': 'string',
+    'Order Date': 'datetime',
+    'Platform': 'category',
+    'Product Category': 'category',
+    'Location': 'category',
+    'Order Value (INR)': 'number',
+}
+
+# Every review column has a compact kind: the six text columns are dictionary-
+# encoded, so a typed row takes ~15 bytes instead of several hundred as Python
+# strings and the review computations group on their integer codes.
+REVIEW_SCHEMA = {
+    'Agent Name': 'category',
+    'Location': 'category',
+    'Order Type': 'category',
+    'Customer Feedback Type': 'category',
+    'Price Range': 'category',
+    'Discount Applied': 'bool',
+    'Rating': 'float32',
+    'Delivery Time (min)': 'number',
+    'Customer Service Rating': 'float32',
+    'Order Accuracy': 'int8',
+    'Product Availability': 'int8',
+}
+
+TRUE_VALUES = ('yes', 'y', 'true', '1')
+
+
+# -------------------------
+# Content fingerprint
+# -------------------------
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path(path, suffix):
+    """Path of a cache artifact for the CSV at `path`, e.g. Sales/.cache/Revenue<suffix>."""
+    folder, name = os.path.split(os.path.abspath(path))
+    stem = os.path.splitext(name)[0]
+    return os.path.join(folder, CACHE_DIR_NAME, stem + suffix)
+
+
+def _cache_paths(path):
+    arrow_path = cache_path(path, ".arrow")
+    return os.path.dirname(arrow_path), arrow_path, cache_path(path, ".json")
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _tmp_path(path):
+    # One temp file per writer, so concurrent processes/threads never interleave
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _write_manifest(manifest_path, manifest):
+    tmp_path = _tmp_path(manifest_path)
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def read_manifest(path):
+    return _read_manifest(_cache_paths(path)[2])
+
+
+def write_manifest(path, manifest):
+    _write_manifest(_cache_paths(path)[2], manifest)
+
+
+_locks = {}  # lock file -> [RLock, fd of the held file lock, depth]
+_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def cache_lock(path):
+    """Hold the exclusive lock on the caches of the CSV at `path` (re-entrant per thread).
+
+    Take it around any read-modify-write of the manifest.
+    """
+    lock_path = cache_path(path, ".lock")
+    with _locks_guard:
+        entry = _locks.setdefault(lock_path, [threading.RLock(), None, 0])
+    with entry[0]:
+        if entry[2] == 0 and fcntl is not None:
+            os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            entry[1] = fd
+        entry[2] += 1
+        try:
+            yield
+        finally:
+            entry[2] -= 1
+            if entry[2] == 0 and entry[1] is not None:
+                fcntl.flock(entry[1], fcntl.LOCK_UN)
+                os.close(entry[1])
+                entry[1] = None
+
+
+def adopt_cache(path, copy_path, size, mtime_ns):
+    """Give `copy_path`, a byte copy of the CSV at `path` taken at (size, mtime_ns), the caches of `path`.
+
+    The typed cache, appended segments and persisted aggregates are hard-linked
+    under the copy's name instead of being rebuilt from the copy. Nothing is
+    adopted unless the manifest of `path` describes exactly the file that was
+    copied and no artifact was rewritten after it. Returns whether they were.
+    """
+    cache_dir, _, manifest_path = _cache_paths(path)
+    copy_dir, _, copy_manifest = _cache_paths(copy_path)
+    stem, copy_stem = (os.path.splitext(os.path.basename(p))[0] for p in (path, copy_path))
+    try:
+        written = os.stat(manifest_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    manifest = _read_manifest(manifest_path)
+    if not manifest or (manifest.get('size'), manifest.get('mtime_ns')) != (size, mtime_ns):
+        return False
+    os.makedirs(copy_dir, exist_ok=True)
+    linked = []
+    try:
+        for entry in os.listdir(cache_dir):
+            if not (entry.startswith(stem + '.') and entry.endswith('.arrow')):
+                continue
+            target = os.path.join(copy_dir, copy_stem + entry[len(stem):])
+            tmp_path = _tmp_path(target)
+            os.link(os.path.join(cache_dir, entry), tmp_path)
+            os.replace(tmp_path, target)
+            linked.append(target)
+            if os.stat(target).st_mtime_ns > written:
+                raise ValueError(f"{entry} was rewritten after the manifest")  # belongs to a newer version
+    except (OSError, ValueError):
+        for target in linked:
+            os.remove(target)
+        return False
+    st_ = os.stat(copy_path)
+    manifest.update(size=st_.st_size, mtime_ns=st_.st_mtime_ns,
+                    segments=[copy_stem + seg[len(stem):] for seg in manifest.get('segments', [])])
+    manifest.pop('partitions', None)  # a directory of the original's store; rebuilt on first use
+    _write_manifest(copy_manifest, manifest)
+    return True
+
+
+def data_version(path):
+    """Content digest of the CSV at `path`.
+
+    The (size, mtime) of the last parse is kept in the manifest, so the file is
+    only re-hashed when its stat changes.
+    """
+    st_ = os.stat(path)
+    _, _, manifest_path = _cache_paths(path)
+    manifest = _read_manifest(manifest_path)
+    if manifest and manifest.get('size') == st_.st_size and manifest.get('mtime_ns') == st_.st_mtime_ns:
+        return manifest['digest']
+    return file_digest(path)
+
+
+# -------------------------
+# CSV -> typed DataFrame
+# -------------------------
+def _to_number(s):
+    # Non-numeric, missing and infinite values all become 0 (inf has no integer form)
+    s = pd.to_numeric(s, errors='coerce')
+    if s.dtype.kind == 'f':
+        s = s.mask(np.isinf(s.to_numpy()))
+    return s.fillna(0)
+
+
+def _downcast_number(s):
+    s = _to_number(s)
+    values = s.to_numpy(dtype='float64')
+    if np.array_equal(values, np.round(values)):
+        return pd.to_numeric(s.astype('int64'), downcast='integer')
+    as32 = values.astype('float32')
+    if np.array_equal(as32.astype('float64'), values):
+        return pd.Series(as32, index=s.index, name=s.name)
+    return s.astype('float64')
+
+
+def _small_int(s):
+    # int8 only when that is lossless; otherwise whatever _downcast_number picks
+    s = _to_number(s)
+    values = s.to_numpy(dtype='float64')
+    if np.array_equal(values, np.round(values)) and (not len(values) or (values.min() >= -128 and values.max() <= 127)):
+        return s.astype('int8')
+    return _downcast_number(s)
+
+
+def _parse_flag(s):
+    if s.dtype.kind in 'biuf':
+        return s.fillna(0) != 0
+    # Decide once per distinct value, then look the answer up by code
+    s = s.astype('category')
+    truthy = s.cat.categories.astype(str).str.strip().str.lower().isin(TRUE_VALUES)
+    # code -1 (missing) picks the appended False
+    return pd.Series(np.append(truthy, False)[s.cat.codes.to_numpy()], index=s.index, name=s.name)
+
+
+def apply_schema(df, schema):
+    """Coerce the columns named in `schema` in place and return `df`."""
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        if kind == 'category':
+            df[col] = df[col].astype('category')
+        elif kind == 'string':
+            df[col] = df[col].astype(str)
+        elif kind == 'number':
+            df[col] = _downcast_number(df[col])
+        elif kind == 'int8':
+            df[col] = _small_int(df[col])
+        elif kind == 'float32':
+            df[col] = _to_number(df[col]).astype('float32')
+        elif kind == 'bool':
+            df[col] = _parse_flag(df[col])
+        elif kind == 'datetime':
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def parse_csv(path, schema):
+    # Let the CSV reader build categoricals directly instead of object columns
+    # that are converted afterwards. `path` may also be a file-like object.
+    dtype = {c: 'category' for c, kind in schema.items() if kind in ('category', 'bool')}
+    df = pd.read_csv(path, dtype=dtype)
+    return apply_schema(df, schema)
+
+
+# -------------------------
+# Arrow IPC cache
+# -------------------------
+def write_arrow(df, arrow_path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = _tmp_path(arrow_path)
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+
+
+def read_arrow(arrow_path, segments=()):
+    table = pa.ipc.open_file(pa.memory_map(arrow_path, 'r')).read_all()
+    if segments:
+        # Appended batches (see analytics.incremental) live in their own files
+        # until the next full rebuild folds them into the base file.
+        folder = os.path.dirname(arrow_path)
+        tables = [table] + [pa.ipc.open_file(pa.memory_map(os.path.join(folder, seg), 'r')).read_all()
+                            for seg in segments]
+        table = pa.concat_tables(tables, promote_options='permissive')
+    # split_blocks avoids consolidating columns into one 2-D block, which is
+    # what lets numeric columns stay views over the mapped file.
+    return table.to_pandas(split_blocks=True)
+
+
+def build_cache(path, schema):
+    """Parse `path` and (re)write its Arrow cache. Returns (df, digest)."""
+    cache_dir, arrow_path, manifest_path = _cache_paths(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    with cache_lock(path):
+        old = _read_manifest(manifest_path) or {}
+        st_ = os.stat(path)
+        digest = file_digest(path)
+        df = parse_csv(path, schema)
+        write_arrow(df, arrow_path)
+        _write_manifest(manifest_path, {'digest': digest, 'size': st_.st_size, 'mtime_ns': st_.st_mtime_ns,
+                                        'format': FORMAT_VERSION, 'schema': schema, 'segments': []})
+        for seg in old.get('segments', []):
+            try:
+                os.remove(os.path.join(cache_dir, seg))
+            except FileNotFoundError:
+                pass
+    return df, digest
+
+
+def _ensure_current(path, schema):
+    """The current manifest, rebuilding the cache first if it is stale. Returns (manifest, df or None)."""
+    manifest = _current_manifest(path, schema)
+    if manifest is not None:
+        return manifest, None
+    with cache_lock(path):
+        # An append or rebuild that held the lock may have brought the cache up to date
+        manifest = _current_manifest(path, schema)
+        if manifest is not None:
+            return manifest, None
+        df, _ = build_cache(path, schema)
+        return _read_manifest(_cache_paths(path)[2]), df
+
+
+def _current_manifest(path, schema):
+    """The manifest if the Arrow cache matches the CSV at `path` as it is now, else None."""
+    _, arrow_path, manifest_path = _cache_paths(path)
+    manifest = _read_manifest(manifest_path)
+    if manifest and manifest.get('format') == FORMAT_VERSION and manifest.get('schema') == schema \
+            and os.path.exists(arrow_path):
+        st_ = os.stat(path)
+        unchanged = manifest['size'] == st_.st_size and manifest['mtime_ns'] == st_.st_mtime_ns
+        if not unchanged and file_digest(path) == manifest['digest']:
+            # Touched but identical: refresh the stat so we skip hashing next time.
+            with cache_lock(path):
+                manifest = _read_manifest(manifest_path) or manifest
+                manifest.update(size=st_.st_size, mtime_ns=st_.st_mtime_ns)
+                _write_manifest(manifest_path, manifest)
+            unchanged = True
+        if unchanged:
+            return manifest
+    return None
+
+
+def load_typed(path, schema):
+    """Return the typed DataFrame for the CSV at `path`, re-parsing only on change."""
+    manifest, df = _ensure_current(path, schema)
+    if df is not None:
+        return df
+    return read_arrow(_cache_paths(path)[1], manifest.get('segments', []))
+
+
+def iter_typed(path, schema, chunk_rows=100_000):
+    """Yield the typed rows of the CSV at `path` as DataFrames of at most `chunk_rows` rows.
+
+    Chunks are sliced from the memory-mapped Arrow cache (base file, then
+    appended segments), so only one chunk is converted to pandas at a time.
+    """
+    manifest, _ = _ensure_current(path, schema)
+    arrow_path = _cache_paths(path)[1]
+    folder = os.path.dirname(arrow_path)
+    files = [arrow_path] + [os.path.join(folder, seg) for seg in manifest.get('segments', [])]
+    for file_path in files:
+        table = pa.ipc.open_file(pa.memory_map(file_path, 'r')).read_all()
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            yield batch.to_pandas(split_blocks=True)
+
+
+def load_revenue(path="Sales/Revenue.csv"):
+    return load_typed(path, REVENUE_SCHEMA)
+
+
+def load_reviews(path="Sales/Reviews.csv"):
+    return load_typed(path, REVIEW_SCHEMA)
@@ -0,0 +1,47 @@
+# analytics/parallel.py
+# Run independent page sections concurrently and hand results back as they finish.
+#
+# Sections are plain callables from the pure computation modules; pandas and
+# numpy release the GIL in their heavy loops, so a thread pool overlaps them
+# without pickling the (shared, memory-mapped) inputs. Rendering stays on the
+# caller's thread, which is what Streamlit requires.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MAX_WORKERS = int(os.environ.get("DASHBOARD_SECTION_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def shared_pool():
+    """Process-wide worker pool shared by all sessions."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="dashboard-section")
+        return _pool
+
+
+def _after_fork():
+    # A forked child (e.g. analytics.report workers) has none of the parent's
+    # pool threads: start a fresh pool on first use instead.
+    global _pool, _pool_lock
+    _pool, _pool_lock = None, threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def run_sections(sections, pool=None):
+    """Submit {name: callable} and yield (name, result) in completion order.
+
+    Exceptions are re-raised when the failing section is reached, after any
+    sections that finished earlier have been yielded.
+    """
+    pool = pool or shared_pool()
+    futures = {pool.submit(fn): name for name, fn in sections.items()}
+    for future in as_completed(futures):
+        yield futures[future], future.result()
@@ -0,0 +1,151 @@
+# analytics/partitions.py
+# Date-partitioned store for the daily revenue cube.
+#
+# The cube (analytics.cube) is split by calendar month of Order Date into one
+# Arrow file per month under Sales/.cache/<stem>.daily/<build>/, e.g.
+# 2024-08.arrow. A date-range query opens (memory-maps) only the months it
+# overlaps, so one selected month reads one file however long the history is.
+# Rows without an Order Date are not partitioned; they only show up in the
+# unfiltered view.
+#
+# The manifest records under 'partitions' which data version the store holds
+# and which <build> directory it is in; a version mismatch means the store is
+# rebuilt on the next read. A rebuild writes a new directory privately and
+# renames it into place before recording it, so concurrent rebuilds (sessions,
+# section threads, server processes) never share files and readers never see
+# a partly written month set. A zero-row _schema.arrow keeps the column types
+# for ranges with no data.
+import os
+import shutil
+import uuid
+
+import pandas as pd
+
+from analytics import cube, ingest
+
+DATE_COL = 'Order Date'
+SCHEMA_PARTITION = '_schema'
+
+
+def store_dir(path):
+    return ingest.cache_path(path, ".daily")
+
+
+def month_key(ts):
+    return pd.Timestamp(ts).strftime('%Y-%m')
+
+
+def months_between(start, end):
+    """Month keys from the month of `start` through the month of `end`, inclusive."""
+    return [p.strftime('%Y-%m') for p in pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq='M')]
+
+
+def _stored(path):
+    """The manifest's record of the store ({'version', 'months', 'dir'}), or {}."""
+    return (ingest.read_manifest(path) or {}).get('partitions', {})
+
+
+def _partition_path(path, month, build=None):
+    return os.path.join(store_dir(path), build or _stored(path)['dir'], f"{month}.arrow")
+
+
+def _split(daily):
+    """{month: rows} for the dated rows of a daily cube."""
+    dated = daily[daily[DATE_COL].notna()]
+    return {month_key(period.start_time): part
+            for period, part in dated.groupby(dated[DATE_COL].dt.to_period('M'), sort=True)}
+
+
+def _read_partition(path, month, build=None):
+    return ingest.read_arrow(_partition_path(path, month, build))
+
+
+def _restore_categories(frame):
+    for key in ('Platform', 'Product Category'):
+        if key in frame.columns:
+            frame[key] = frame[key].astype('category')
+    return frame
+
+
+def _record(path, version, months, build):
+    with ingest.cache_lock(path):
+        manifest = ingest.read_manifest(path)
+        manifest['partitions'] = {'version': version, 'months': sorted(months), 'dir': build}
+        ingest.write_manifest(path, manifest)
+
+
+def is_current(path, version):
+    stored = _stored(path)
+    return stored.get('version') == version and 'dir' in stored
+
+
+def _prune(path, keep, started):
+    # Builds finished before this one started (and the flat layout of older
+    # releases); in-flight and concurrent builds are left to their writers
+    folder = store_dir(path)
+    for entry in os.listdir(folder):
+        target = os.path.join(folder, entry)
+        try:
+            if entry == keep or entry.endswith('.tmp') or os.path.getmtime(target) >= started:
+                continue
+        except FileNotFoundError:
+            continue
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        else:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+
+def write_partitions(path, daily, version):
+    """(Re)write the whole store from the daily cube of data version `version`."""
+    folder = store_dir(path)
+    # A fresh name per build: concurrent writers (and rebuilds of the same version) never collide
+    build = f"{version}.{uuid.uuid4().hex[:12]}"
+    tmp = os.path.join(folder, f"{build}.tmp")
+    os.makedirs(tmp)
+    started = os.path.getmtime(tmp)
+    ingest.write_arrow(daily.iloc[0:0], os.path.join(tmp, f"{SCHEMA_PARTITION}.arrow"))
+    parts = _split(daily)
+    for month, part in parts.items():
+        ingest.write_arrow(part.reset_index(drop=True), os.path.join(tmp, f"{month}.arrow"))
+    os.rename(tmp, os.path.join(folder, build))
+    _record(path, version, parts, build)
+    _prune(path, build, started)
+
+
+def update_partitions(path, batch_cube, version):
+    """Fold the daily cube of an appended batch into the months it touches only."""
+    stored = _stored(path)
+    months, build = set(stored.get('months', [])), stored['dir']
+    for month, part in _split(batch_cube).items():
+        if month in months:
+            part = cube.merge_cubes(_restore_categories(_read_partition(path, month, build)), part)
+        ingest.write_arrow(part.reset_index(drop=True), _partition_path(path, month, build))
+        months.add(month)
+    _record(path, version, months, build)
+
+
+def read_range(path, start, end):
+    """Daily cube rows with start <= Order Date <= end, read from the overlapping months only.
+
+    Returns None when the store is missing or was written for another data version.
+    """
+    stored = _stored(path)
+    if stored.get('version') != ingest.data_version(path) or 'dir' not in stored:
+        return None
+    available = set(stored.get('months', []))
+    months = [m for m in months_between(start, end) if m in available] or [SCHEMA_PARTITION]
+    try:
+        parts = [_read_partition(path, m, stored['dir']) for m in months]
+    except FileNotFoundError:
+        return None  # replaced by a newer build since the manifest was read
+    return select(_restore_categories(pd.concat(parts, ignore_index=True)), start, end)
+
+
+def select(daily, start, end):
+    """Rows of a daily cube with start <= Order Date <= end."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    return daily[(daily[DATE_COL] >= start) & (daily[DATE_COL] <= end)].reset_index(drop=True)
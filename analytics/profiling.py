@@ -0,0 +1,249 @@
+# analytics/profiling.py
+# Per-rerun timing, memory and cache instrumentation for the dashboard pages.
+#
+# A page creates one Profiler per script run and routes its steps through it:
+# `section()` times a block, `cached()` wraps a filter-cache lookup and records
+# whether it hit. Every step becomes a record
+#
+#   {page, section, stage, seconds, peak_bytes, rows, cache, thread}
+#
+# with stage one of load / filter / aggregate / figure / render and rows the
+# number of rows the step returned (the filtered view for 'filter', which is
+# what the aggregations then process). When the run
+# finishes, its records are
+#   - folded into a process-wide registry, exported as Prometheus text by
+#     prometheus_text() (and written to DASHBOARD_PROMETHEUS_FILE if set, e.g.
+#     for node_exporter's textfile collector),
+#   - logged as one JSON line each on the `dashboard.profile` logger (enabled
+#     with DASHBOARD_PROFILE_LOG=1),
+#   - shown in the optional debug panel in the sidebar (DASHBOARD_DEBUG=1 or
+#     ?debug=1 in the page URL).
+#
+# Timing is always on; it costs two perf_counter() calls per step. Peak memory
+# needs tracemalloc, which slows allocation down, so it is only traced with
+# DASHBOARD_PROFILE_MEMORY=1. Sections that run at the same time on worker
+# threads share one peak counter, so their peaks are upper bounds.
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+PROFILE_LOG = os.environ.get("DASHBOARD_PROFILE_LOG", "") not in ("", "0")
+TRACE_MEMORY = os.environ.get("DASHBOARD_PROFILE_MEMORY", "") not in ("", "0")
+PROMETHEUS_FILE = os.environ.get("DASHBOARD_PROMETHEUS_FILE")
+DEBUG = os.environ.get("DASHBOARD_DEBUG", "") not in ("", "0")
+
+logger = logging.getLogger("dashboard.profile")
+if PROFILE_LOG and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, tuple) and value and isinstance(value[0], (pd.DataFrame, pd.Series)):
+        return len(value[0])
+    return None
+
+
+class Profiler:
+    """Collects the records of one page run. Safe to use from worker threads."""
+
+    def __init__(self, page, trace_memory=TRACE_MEMORY):
+        self.page = page
+        self.records = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.trace_memory = trace_memory
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+    def _add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    @contextlib.contextmanager
+    def section(self, name, stage, rows=None):
+        """Time the enclosed block. The yielded dict may be updated, e.g. with 'rows'."""
+        record = {'page': self.page, 'section': name, 'stage': stage, 'seconds': None,
+                  'peak_bytes': None, 'rows': rows, 'cache': None,
+                  'thread': threading.current_thread().name}
+        before = tracemalloc.get_traced_memory()[0] if self.trace_memory else None
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if self.trace_memory:
+                record['peak_bytes'] = max(tracemalloc.get_traced_memory()[1] - before, 0)
+            self._add(record)
+
+    def cached(self, cache, key, name, compute, stage='aggregate', rows=None):
+        """cache.get_or_compute(key, compute), recorded as a hit or a timed miss."""
+        sentinel = object()
+        with self.section(name, stage, rows) as record:
+            value = cache.get(key, sentinel)
+            if value is sentinel:
+                record['cache'] = 'miss'
+                value = cache.put(key, compute())
+            else:
+                record['cache'] = 'hit'
+            if record['rows'] is None:
+                record['rows'] = _rows(value)
+        return value
+
+    def frame(self):
+        columns = ['page', 'section', 'stage', 'seconds', 'peak_bytes', 'rows', 'cache', 'thread']
+        with self._lock:
+            return pd.DataFrame(list(self.records), columns=columns)
+
+    def finish(self, cache=None):
+        """Publish this run's records (registry, logs, Prometheus file). Returns the total seconds."""
+        total = time.perf_counter() - self._started
+        with self._lock:
+            records = list(self.records)
+        _registry.add(self.page, records, total, cache.stats() if cache is not None else None)
+        if PROFILE_LOG:
+            for record in records:
+                logger.info(json.dumps(record, default=str))
+            logger.info(json.dumps({'page': self.page, 'section': '_run', 'stage': 'total', 'seconds': total}))
+        if PROMETHEUS_FILE:
+            write_prometheus(PROMETHEUS_FILE)
+        return total
+
+    def to_json_lines(self):
+        with self._lock:
+            return ''.join(json.dumps(r, default=str) + '\n' for r in self.records)
+
+
+# -------------------------
+# Process-wide registry / Prometheus export
+# -------------------------
+class _Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sections = {}   # (page, section, stage) -> [count, seconds sum, max peak bytes, rows total]
+        self.cache = {}      # (page, section, result) -> count
+        self.runs = {}       # page -> [count, seconds sum]
+        self.filter_cache = None
+
+    def add(self, page, records, total, cache_stats):
+        with self._lock:
+            for r in records:
+                entry = self.sections.setdefault((page, r['section'], r['stage']), [0, 0.0, None, 0])
+                entry[0] += 1
+                entry[1] += r['seconds']
+                if r['peak_bytes'] is not None:
+                    entry[2] = max(entry[2] or 0, r['peak_bytes'])
+                entry[3] += r['rows'] or 0
+                if r['cache']:
+                    key = (page, r['section'], r['cache'])
+                    self.cache[key] = self.cache.get(key, 0) + 1
+            run = self.runs.setdefault(page, [0, 0.0])
+            run[0] += 1
+            run[1] += total
+            if cache_stats is not None:
+                self.filter_cache = cache_stats
+
+    def snapshot(self):
+        with self._lock:
+            return (dict(self.sections), dict(self.cache), {k: list(v) for k, v in self.runs.items()},
+                    self.filter_cache)
+
+
+_registry = _Registry()
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                          for k, v in labels.items()) + '}'
+
+
+def prometheus_text():
+    """All metrics recorded by this server process, in Prometheus text exposition format."""
+    sections, cache, runs, filter_cache = _registry.snapshot()
+    lines = [
+        '# HELP dashboard_section_seconds Wall time of page sections by stage.',
+        '# TYPE dashboard_section_seconds summary',
+    ]
+    for (page, section, stage), (count, seconds, _, _) in sorted(sections.items()):
+        labels = _labels(page=page, section=section, stage=stage)
+        lines += [f'dashboard_section_seconds_sum{labels} {seconds:.6f}',
+                  f'dashboard_section_seconds_count{labels} {count}']
+    lines += ['# HELP dashboard_section_rows_total Rows processed by page sections.',
+              '# TYPE dashboard_section_rows_total counter']
+    lines += [f'dashboard_section_rows_total{_labels(page=p, section=s, stage=t)} {rows}'
+              for (p, s, t), (_, _, _, rows) in sorted(sections.items())]
+    peaks = [(k, v[2]) for k, v in sorted(sections.items()) if v[2] is not None]
+    if peaks:
+        lines += ['# HELP dashboard_section_peak_bytes Largest traced memory peak of a section.',
+                  '# TYPE dashboard_section_peak_bytes gauge']
+        lines += [f'dashboard_section_peak_bytes{_labels(page=p, section=s, stage=t)} {peak}'
+                  for (p, s, t), peak in peaks]
+    lines += ['# HELP dashboard_cache_requests_total Filter-cache lookups by page section and result.',
+              '# TYPE dashboard_cache_requests_total counter']
+    lines += [f'dashboard_cache_requests_total{_labels(page=p, section=s, result=r)} {n}'
+              for (p, s, r), n in sorted(cache.items())]
+    lines += ['# HELP dashboard_run_seconds Wall time of whole page runs.',
+              '# TYPE dashboard_run_seconds summary']
+    for page, (count, seconds) in sorted(runs.items()):
+        lines += [f'dashboard_run_seconds_sum{_labels(page=page)} {seconds:.6f}',
+                  f'dashboard_run_seconds_count{_labels(page=page)} {count}']
+    if filter_cache is not None:
+        lines += ['# HELP dashboard_filter_cache_bytes Approximate size of the shared filter cache.',
+                  '# TYPE dashboard_filter_cache_bytes gauge',
+                  f"dashboard_filter_cache_bytes {filter_cache['bytes']}",
+                  '# HELP dashboard_filter_cache_entries Entries in the shared filter cache.',
+                  '# TYPE dashboard_filter_cache_entries gauge',
+                  f"dashboard_filter_cache_entries {filter_cache['entries']}",
+                  '# HELP dashboard_filter_cache_evictions_total Entries evicted from the shared filter cache.',
+                  '# TYPE dashboard_filter_cache_evictions_total counter',
+                  f"dashboard_filter_cache_evictions_total {filter_cache['evictions']}"]
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+# -------------------------
+# Debug sidebar panel
+# -------------------------
+def debug_enabled(query_params=None):
+    return DEBUG or (query_params is not None and query_params.get('debug') in ('1', 'true'))
+
+
+def sidebar_panel(profiler, cache=None):
+    """Render this run's records plus export buttons in a sidebar expander."""
+    import streamlit as st
+
+    with st.sidebar.expander("🛠️ Debug: profiling", expanded=False):
+        frame = profiler.frame()
+        total = frame['seconds'].sum() if len(frame) else 0.0
+        st.caption(f"{len(frame)} steps, {total * 1000:,.0f} ms of section time"
+                   + ("" if profiler.trace_memory else " (set DASHBOARD_PROFILE_MEMORY=1 for peak memory)"))
+        shown = frame.assign(ms=(frame['seconds'] * 1000).round(1),
+                             peak_mb=(frame['peak_bytes'].astype('float64') / 2**20).round(2))
+        st.dataframe(shown[['section', 'stage', 'ms', 'peak_mb', 'rows', 'cache']], hide_index=True)
+        if cache is not None:
+            stats = cache.stats()
+            st.caption(f"Filter cache: {stats['entries']} entries, {stats['bytes'] / 2**20:,.1f} MB, "
+                       f"hit rate {stats['hit_rate']:.0%}")
+        st.download_button("Records (JSON lines)", profiler.to_json_lines(),
+                           file_name=f"{profiler.page}-profile.jsonl", mime="application/json")
+        st.download_button("Metrics (Prometheus text)", prometheus_text(),
+                           file_name="dashboard-metrics.prom", mime="text/plain")
@@ -0,0 +1,312 @@
+# analytics/report.py
+# Headless reports: the Revenue and Review Analysis pages rendered to static
+# HTML and JSON for a list of filter presets, without a Streamlit server.
+#
+#   python -m analytics.report --presets presets.json --out reports/
+#
+# A preset names a report and holds one filter dict per page, with the same
+# keys as the pages' own filter dicts (and the export URLs). Keys left out keep
+# the page's default (everything selected, full date range, exact figures,
+# weekly trend):
+#
+#   [{"name": "blinkit-march",
+#     "revenue": {"Platform": ["Blinkit"], "Order Date": ["2024-03-01", "2024-03-31"],
+#                 "Granularity": "Daily", "Window": 7, "Mode": "approximate"},
+#     "reviews": {"Platform": ["Blinkit"], "Location": ["Delhi", "Pune"], "Order Type": ["Food"],
+#                 "Drill-down": "Price Range", "Metric": "Avg Service Rating"}}]
+#
+# Shared work happens once, in the parent process: warm_up() (analytics.warmup)
+# loads both datasets and builds the unfiltered aggregates, bitmaps, order
+# sample and default views. The distinct (page, filters) pairs of all presets
+# are then computed in worker processes, one per core. Workers are forked where
+# the platform allows it, so they start with those aggregates and the filter
+# cache already in memory; elsewhere they reopen the on-disk caches. Within a
+# worker each page is computed by the pages' own code (analytics.views), its
+# sections concurrently, and a page shared by several presets is computed once.
+#
+# Output, per preset: <name>.html (KPIs, charts and their tables; plotly.js is
+# written once next to them) and <name>.json (KPIs, every section's tables and
+# figure), plus index.html / index.json listing the presets.
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import plotly.io as pio
+import plotly.offline
+
+from analytics import backends, ingest, parallel, revenue, reviews, sources, views, warmup
+
+PAGES = {'revenue': "Revenue Analysis", 'reviews': "Review Analysis"}
+DEFAULT_PRESETS = [{'name': 'default'}]
+DEFAULT_OUT = "reports"
+PLOTLY_JS = "plotly.min.js"
+
+# Section titles, as the pages show them
+TITLES = {
+    'orders_per_platform': "Total Orders (per Platform)",
+    'platform_sales': "Platform-wise Total Sales",
+    'category_counts': "Most & Least Ordered Category per Platform",
+    'revenue_per_order': "Revenue per Order By Platform (INR)",
+    'category_contribution': "Category Contribution % per Platform",
+    'trend': "Revenue & Orders Trend per Platform",
+    'avg_delivery': "Average Delivery Time per Platform",
+    'delivery_distribution': "Delivery Time Distribution (p50 / p90 / p99)",
+    'usage': "Platform Usage per Location",
+    'avg_feedback': "Average Customer Feedback per Platform & Location",
+    'order_product': "Order Accuracy & Product Availability per Platform",
+    'breakdown': "Drill-down by Review Attribute",
+}
+
+
+# -------------------------
+# Page computations (the pages' own code and cache keys, see analytics.views)
+# -------------------------
+def _kpi(label, text, value, note=None):
+    return {'label': label, 'text': text, 'value': value, 'note': note}
+
+
+def _section(name, tables=None, chart=None, note=None):
+    return {'name': name, 'title': TITLES[name], 'tables': tables or {}, 'chart': chart, 'note': note}
+
+
+# Notes of the sections a view leaves out, per reason (see analytics.views)
+NOTES = {
+    'empty': "No data available for the selected filters.",
+    'platforms': "Platform usage chart is available when at least two platforms are selected.",
+}
+
+
+def _page(view, kpis, tables):
+    """The page dict of a computed view; `tables` labels the tables of each section."""
+    results = {}
+    for name, reason in view.missing.items():
+        note = NOTES.get(reason) or f"Requires {', '.join(sorted(revenue.REQUIREMENTS[name]))} columns."
+        results[name] = _section(name, note=note)
+    for name, (table, chart) in parallel.run_sections(view.sections):
+        results[name] = _section(name, tables(name, table), chart)
+    return {'page': view.page, 'filters': view.filters, 'kpis': kpis,
+            'sections': [results[name] for name in views.SECTIONS[view.page] if name in results]}
+
+
+def revenue_page(path, filters, backend):
+    """KPIs and sections of the Revenue Analysis page for a revenue filter dict."""
+    view = views.revenue_view(path, filters, backend)
+    if view.approximate:
+        (total_revenue, revenue_ci), (avg_order_value, aov_ci), (total_orders, orders_ci) = view.kpis()
+        kpis = [_kpi("Total Revenue", f"≈ ₹{total_revenue:,.0f}", total_revenue, f"± ₹{revenue_ci:,.0f}"),
+                _kpi("Average Order Value", f"≈ ₹{avg_order_value:,.2f}", avg_order_value, f"± ₹{aov_ci:,.2f}"),
+                _kpi("Total Orders", f"≈ {total_orders:,}", total_orders, f"± {orders_ci:,.0f}")]
+    else:
+        total_revenue, avg_order_value, total_orders = view.kpis()
+        kpis = [_kpi("Total Revenue", f"₹{total_revenue:,.0f}", total_revenue),
+                _kpi("Average Order Value", f"₹{avg_order_value:,.2f}", avg_order_value),
+                _kpi("Total Orders", f"{total_orders:,}", total_orders)]
+
+    def tables(name, table):
+        if name == 'category_counts':
+            return {"Most & least ordered category": table[1], "Orders per platform & category": table[0]}
+        return {TITLES[name]: table}
+
+    return _page(view, kpis, tables)
+
+
+def reviews_page(path, filters, backend):
+    """KPIs and sections of the Review Analysis page for a reviews filter dict."""
+    view = views.reviews_view(path, filters, backend)
+    metrics = None if view.kpis is None else view.kpis()
+    kpis = []
+    if metrics is not None:
+        agent = view.filters['Platform'][0]
+        avg_time, avg_rating, order_acc, product_avail = metrics
+        kpis = [_kpi(f"Avg Delivery Time ({agent})", reviews.format_minutes(avg_time), avg_time),
+                _kpi(f"Avg Customer Rating ({agent})", f"{avg_rating:.1f} ⭐", avg_rating),
+                _kpi(f"Order Accuracy ({agent})", f"{order_acc:.1f}%", order_acc),
+                _kpi(f"Product Availability ({agent})", f"{product_avail:.1f}%", product_avail)]
+
+    def tables(name, table):
+        if name == 'delivery_distribution':
+            return {"Delivery time distribution": table[0], "Delivery time percentiles (min)": table[1]}
+        if name == 'usage':
+            locations = view.filters['Location']
+            if len(locations) > 1:
+                return {"Most used platform per location": table}
+            return {f"Platform shares in {locations[0]}": table}
+        if name == 'breakdown':
+            return {f"{view.filters['Metric']} by {view.filters['Drill-down']}": table}
+        return {TITLES[name]: table}
+
+    return _page(view, kpis, tables)
+
+
+PAGE_FUNCTIONS = {'revenue': revenue_page, 'reviews': reviews_page}
+
+
+# -------------------------
+# Rendering
+# -------------------------
+def _records(table):
+    return json.loads(table.to_json(orient='records', date_format='iso'))
+
+
+def _figure_html(chart):
+    return pio.to_html(chart.spec, full_html=False, include_plotlyjs=False, default_width='100%')
+
+
+def _render(result):
+    """The JSON document and HTML fragment of one computed page."""
+    doc = {key: result[key] for key in ('page', 'filters', 'kpis')}
+    doc['sections'] = []
+    parts = [f"<h2>{html.escape(PAGES[result['page']])}</h2>", '<div class="kpis">']
+    for kpi in result['kpis']:
+        note = f"<small>{html.escape(kpi['note'])}</small>" if kpi['note'] else ''
+        parts.append(f"<div class=\"kpi\"><span>{html.escape(kpi['label'])}</span>"
+                     f"<b>{html.escape(kpi['text'])}</b>{note}</div>")
+    parts.append('</div>')
+    for section in result['sections']:
+        chart = section['chart']
+        doc['sections'].append({
+            'name': section['name'], 'title': section['title'], 'note': section['note'],
+            'tables': {label: _records(table) for label, table in section['tables'].items()},
+            'figure': None if chart is None else chart.spec,
+            'truncated': bool(chart is not None and chart.truncated),
+        })
+        parts.append(f"<h3>{html.escape(section['title'])}</h3>")
+        if section['note']:
+            parts.append(f"<p class=\"note\">{html.escape(section['note'])}</p>")
+        if chart is not None:
+            parts.append(_figure_html(chart))
+        for label, table in section['tables'].items():
+            parts.append(f"<details><summary>{html.escape(label)}</summary>"
+                         f"{table.to_html(index=False, na_rep='', float_format=lambda x: f'{x:,.2f}')}</details>")
+    return doc, '\n'.join(parts)
+
+
+def run_page(page, path, filters, backend_name=None):
+    """Compute and render one page for one filter dict (runs in a worker process)."""
+    start = time.perf_counter()
+    result = PAGE_FUNCTIONS[page](path, filters, views.backend(backend_name))
+    doc, fragment = _render(result)
+    doc['seconds'] = round(time.perf_counter() - start, 3)
+    return doc, fragment
+
+
+# -------------------------
+# Presets and output
+# -------------------------
+def load_presets(path=None):
+    """Presets from a JSON file (a list, or {"presets": [...]}); one default preset without a file."""
+    if path is None:
+        return DEFAULT_PRESETS
+    with open(path, encoding='utf-8') as f:
+        presets = json.load(f)
+    presets = presets.get('presets', []) if isinstance(presets, dict) else presets
+    names = [preset.get('name') for preset in presets]
+    if not presets or not all(names) or len(set(names)) != len(names):
+        raise ValueError(f"{path}: every preset needs a distinct name")
+    for preset in presets:
+        for page in views.VIEWS:
+            try:
+                views.check_filters(page, preset.get(page) or {})
+            except ValueError as exc:
+                raise ValueError(f"{path}: preset {preset['name']!r}: {exc}") from None
+    return presets
+
+
+def slug(name):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '-', str(name)).strip('-') or 'report'
+
+
+def _job_key(page, filters):
+    return page, json.dumps(filters or {}, sort_keys=True, default=str)
+
+
+_STYLE = """body{font-family:sans-serif;margin:2rem auto;max-width:1200px}
+.kpis{display:flex;gap:1rem;flex-wrap:wrap}.kpi{border:1px solid #ddd;border-radius:6px;padding:.6rem 1rem}
+.kpi span,.kpi small{display:block;color:#666;font-size:.85rem}.kpi b{font-size:1.4rem}
+.note{color:#8a6d3b}table{border-collapse:collapse;font-size:.85rem}td,th{border:1px solid #ddd;padding:2px 6px}"""
+
+
+def _html_document(title, body):
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>"
+            f"<script src=\"{PLOTLY_JS}\"></script><style>{_STYLE}</style></head>"
+            f"<body><h1>{html.escape(title)}</h1>\n{body}\n</body></html>")
+
+
+def _context():
+    # Forked workers inherit the aggregates warmed up in the parent
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+
+def generate(presets, out=DEFAULT_OUT, workers=None, revenue_path=None, reviews_path=None, backend_name=None):
+    """Write every preset's report under `out`. Returns the index (also written to index.json)."""
+    start = time.perf_counter()
+    paths = {'revenue': revenue_path or sources.path('revenue'), 'reviews': reviews_path or sources.path('reviews')}
+    warmed = warmup.warm_up(paths['revenue'], paths['reviews'], views.backend(backend_name))
+    if warmed['state'] != 'ready':
+        raise RuntimeError(f"Loading the data failed: {warmed['error']}")
+
+    # Each distinct (page, filters) pair is computed once, whichever presets share it
+    jobs = {}
+    for preset in presets:
+        for page in PAGES:
+            jobs.setdefault(_job_key(page, preset.get(page)), (page, paths[page], preset.get(page) or {}, backend_name))
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    if workers == 1:
+        done = {key: run_page(*job) for key, job in jobs.items()}
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_context()) as pool:
+            futures = {key: pool.submit(run_page, *job) for key, job in jobs.items()}
+            done = {key: future.result() for key, future in futures.items()}
+
+    os.makedirs(out, exist_ok=True)
+    with open(os.path.join(out, PLOTLY_JS), 'w', encoding='utf-8') as f:
+        f.write(plotly.offline.get_plotlyjs())
+    generated_at = pd.Timestamp.now().isoformat(timespec='seconds')
+    index = {'generated_at': generated_at, 'data_versions': {d: ingest.data_version(p) for d, p in paths.items()},
+             'reports': []}
+    for preset in presets:
+        name = slug(preset['name'])
+        results = [done[_job_key(page, preset.get(page))] for page in PAGES]
+        doc = {'name': preset['name'], 'generated_at': generated_at, 'pages': [doc for doc, _ in results]}
+        with open(os.path.join(out, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump(doc, f, default=str)
+        with open(os.path.join(out, f"{name}.html"), 'w', encoding='utf-8') as f:
+            f.write(_html_document(f"{preset['name']} ({generated_at})",
+                                   '\n'.join(fragment for _, fragment in results)))
+        index['reports'].append({'name': preset['name'], 'html': f"{name}.html", 'json': f"{name}.json"})
+
+    index.update(jobs=len(jobs), workers=workers, seconds=round(time.perf_counter() - start, 3))
+    with open(os.path.join(out, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    links = ''.join(f"<li><a href=\"{r['html']}\">{html.escape(r['name'])}</a> (<a href=\"{r['json']}\">JSON</a>)</li>"
+                    for r in index['reports'])
+    with open(os.path.join(out, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(_html_document(f"Dashboard reports ({generated_at})", f"<ul>{links}</ul>"))
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the Revenue and Review Analysis pages to static HTML/JSON.")
+    parser.add_argument('--presets', help="JSON file of filter presets (default: one report with the page defaults)")
+    parser.add_argument('--out', default=DEFAULT_OUT, help=f"output directory (default: {DEFAULT_OUT}/)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    parser.add_argument('--backend', choices=sorted(backends.BACKENDS), help="query backend (default: DASHBOARD_QUERY_BACKEND)")
+    parser.add_argument('--revenue', help="Revenue CSV (default: the configured source)")
+    parser.add_argument('--reviews', help="Reviews CSV (default: the configured source)")
+    args = parser.parse_args(argv)
+    index = generate(load_presets(args.presets), args.out, args.workers, args.revenue, args.reviews, args.backend)
+    print(json.dumps({k: index[k] for k in ('jobs', 'workers', 'seconds')} | {'out': args.out,
+                     'reports': [r['html'] for r in index['reports']]}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
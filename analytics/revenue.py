@@ -0,0 +1,127 @@
+# analytics/revenue.py
+# Pure computations behind the Revenue Analysis page.
+#
+# Every function takes a (filtered) revenue cube from analytics.cube and returns
+# the table the page plots. Nothing here touches Streamlit, so the functions can
+# run on worker threads, in benchmarks or in batch jobs.
+import pandas as pd
+
+from analytics import cube
+
+# Columns each section needs in the raw data; the page shows an info box otherwise.
+REQUIREMENTS = {
+    'orders_per_platform': {'Platform', 'Order ID'},
+    'platform_sales': {'Platform', 'Order Value (INR)'},
+    'category_counts': {'Platform', 'Product Category', 'Order ID'},
+    'revenue_per_order': {'Platform', 'Order Value (INR)', 'Order ID'},
+    'category_contribution': {'Platform', 'Product Category', 'Order Value (INR)'},
+    'trend': {'Platform', 'Order Date', 'Order ID', 'Order Value (INR)'},
+}
+
+# Trend granularity -> (pandas period alias, date_range frequency of period starts)
+GRANULARITIES = {
+    'Daily': ('D', 'D'),
+    'Weekly': ('W', 'W-MON'),
+    'Monthly': ('M', 'MS'),
+}
+
+# The trend's initial granularity and rolling window (periods) per granularity
+DEFAULT_GRANULARITY = 'Weekly'
+DEFAULT_WINDOWS = {'Daily': 7, 'Weekly': 4, 'Monthly': 3}
+
+
+def kpis(view, columns):
+    """(total revenue, average order value, total orders)."""
+    total_revenue, avg_order_value, total_orders = cube.kpis(view)
+    if 'Order Value (INR)' not in columns:
+        total_revenue, avg_order_value = 0, 0
+    return total_revenue, avg_order_value, total_orders
+
+
+def orders_per_platform(view):
+    return cube.rollup(view, 'Platform')['Orders'].sort_values(ascending=False).reset_index(name='Total Orders')
+
+
+def platform_sales(view):
+    table = cube.rollup(view, 'Platform')['Revenue'].reset_index(name='Order Value (INR)')
+    table['Total Sales (INR, Lakh)'] = (table['Order Value (INR)'] / 100000).round(2)
+    return table.sort_values('Total Sales (INR, Lakh)', ascending=False)
+
+
+def category_counts(view):
+    """(per platform/category order counts with %, most & least ordered category per platform)."""
+    # Count orders per platform and category
+    cat_count = cube.rollup(view, ['Platform', 'Product Category'])['Orders'].reset_index(name='Orders')
+
+    # Compute total orders per platform
+    cat_count['Platform Total'] = cat_count.groupby('Platform', observed=True)['Orders'].transform('sum')
+
+    # Compute % contribution per category
+    cat_count['Percentage'] = (cat_count['Orders'] / cat_count['Platform Total'] * 100).round(2)
+
+    # Most ordered per platform
+    top = cat_count.loc[cat_count.groupby('Platform', observed=True)['Percentage'].idxmax()]
+    top = top[['Platform', 'Product Category', 'Orders', 'Percentage']].rename(
+        columns={'Product Category': 'Top Category', 'Orders': 'Top Orders', 'Percentage': 'Top %'}
+    )
+
+    # Least ordered per platform
+    bottom = cat_count.loc[cat_count.groupby('Platform', observed=True)['Percentage'].idxmin()]
+    bottom = bottom[['Platform', 'Product Category', 'Orders', 'Percentage']].rename(
+        columns={'Product Category': 'Bottom Category', 'Orders': 'Bottom Orders', 'Percentage': 'Bottom %'}
+    )
+
+    # Combine top & bottom
+    return cat_count, pd.merge(top, bottom, on='Platform')
+
+
+def revenue_per_order(view):
+    totals = cube.rollup(view, 'Platform').rename(
+        columns={'Revenue': 'Total Sales (INR)', 'Orders': 'Total Orders'})
+    totals['Revenue per Order (INR)'] = (totals['Total Sales (INR)'] / totals['Total Orders']).round(2)
+    return totals.reset_index().sort_values('Revenue per Order (INR)', ascending=False)
+
+
+def category_contribution(view):
+    # Group sales by Platform and Product Category
+    category_sales = cube.rollup(view, ['Platform', 'Product Category'])['Revenue']
+
+    # Compute % contribution of each category to the total per platform
+    contribution = (category_sales / category_sales.groupby(level=0).transform('sum') * 100).round(1)
+
+    # Reset index for plotting
+    return contribution.reset_index(name='Contribution (%)')
+
+
+def trend(view, granularity='Weekly', window=4):
+    """Orders and revenue per platform and period, with `window`-period rolling means.
+
+    Periods with no orders are filled with 0 so the rolling mean spans calendar time.
+    """
+    period_alias, range_freq = GRANULARITIES[granularity]
+    measures = ['Orders', 'Revenue']
+    dated = view[view['Order Date'].notna()]
+    if dated.empty:
+        return pd.DataFrame(columns=['Period', 'Platform'] + measures + [f'{m} (rolling)' for m in measures])
+
+    period = dated['Order Date'].dt.to_period(period_alias).dt.start_time.rename('Period')
+    wide = dated.groupby([period, 'Platform'], observed=True)[measures].sum().unstack('Platform', fill_value=0)
+    wide = wide.reindex(pd.date_range(wide.index.min(), wide.index.max(), freq=range_freq, name='Period'),
+                        fill_value=0)
+    rolling = wide.rolling(window, min_periods=1).mean().round(2)
+
+    table = wide.stack('Platform').reset_index()
+    smoothed = rolling.stack('Platform').reset_index()
+    for m in measures:
+        table[f'{m} (rolling)'] = smoothed[m].to_numpy()
+    table['Platform'] = table['Platform'].astype(str)
+    return table
+
+
+SECTIONS = {
+    'orders_per_platform': orders_per_platform,
+    'platform_sales': platform_sales,
+    'category_counts': category_counts,
+    'revenue_per_order': revenue_per_order,
+    'category_contribution': category_contribution,
+}
@@ -0,0 +1,103 @@
+# analytics/reviews.py
+# Pure computations behind the Review Analysis page.
+#
+# Inputs are the per-(Agent Name, Location) accumulators from analytics.streaming
+# and delivery-time sketches from analytics.sketches (optionally filtered);
+# outputs are the tables the page plots. Nothing here touches Streamlit.
+import pandas as pd
+
+from analytics import sketches, streaming, usage
+
+
+def format_minutes(x):
+    return f"{int(x)} min {int((x - int(x)) * 60)} sec"
+
+
+def agent_metrics(stats, agent):
+    """(avg delivery time, avg service rating, order accuracy %, availability %) over all locations.
+
+    None when no reviews of `agent` are left, e.g. after drill-down filters.
+    """
+    agent_totals = streaming.totals(stats, 'Agent Name')
+    if agent not in agent_totals.index:
+        return None
+    agent_totals = agent_totals.loc[[agent]]
+    return (streaming.mean(agent_totals, 'Delivery Time (min)').iloc[0],
+            streaming.mean(agent_totals, 'Customer Service Rating').iloc[0],
+            streaming.mean(agent_totals, 'Order Accuracy').iloc[0] * 100,
+            streaming.mean(agent_totals, 'Product Availability').iloc[0] * 100)
+
+
+def avg_delivery(view):
+    per_agent = streaming.totals(view, 'Agent Name')
+    table = streaming.mean(per_agent, 'Delivery Time (min)').reset_index(name='Delivery Time (min)')
+    table['Formatted Time'] = table['Delivery Time (min)'].apply(format_minutes)
+    return table
+
+
+def location_usage(view):
+    return usage.usage_from_stats(view)
+
+
+def most_used_platform(view):
+    return usage.most_used(location_usage(view))
+
+
+def platform_shares(view, location):
+    return usage.shares(location_usage(view), location)
+
+
+def avg_feedback(view):
+    """Mean service rating per (Location, Agent Name), sorted by location then agent."""
+    by_location = view.reorder_levels(['Location', 'Agent Name']).sort_index()
+    return streaming.mean(by_location, 'Customer Service Rating').reset_index(name='Customer Service Rating')
+
+
+def order_product(view):
+    """Order accuracy and product availability per agent, in %, long format."""
+    per_agent = streaming.totals(view, 'Agent Name')
+    table = per_agent[[]].reset_index()
+    table['Order Accuracy'] = streaming.mean(per_agent, 'Order Accuracy').to_numpy() * 100
+    table['Product Availability'] = streaming.mean(per_agent, 'Product Availability').to_numpy() * 100
+    return table.melt(
+        id_vars='Agent Name',
+        value_vars=['Order Accuracy', 'Product Availability'],
+        var_name='Metric',
+        value_name='Percentage'
+    )
+
+
+# Drill-down chart metrics: label -> (accumulator column, scale); None is the review count
+DRILL_DOWN_METRICS = {
+    'Reviews': None,
+    'Avg Service Rating': ('Customer Service Rating', 1),
+    'Avg Delivery Time (min)': ('Delivery Time (min)', 1),
+    'Order Accuracy (%)': ('Order Accuracy', 100),
+    'Product Availability (%)': ('Product Availability', 100),
+}
+
+
+def breakdown(stats, column):
+    """Review count and mean metrics per (Agent Name, `column` value) from accumulators keyed that way."""
+    table = stats[[]].reset_index()
+    table[column] = table[column].astype(str)
+    for label, metric in DRILL_DOWN_METRICS.items():
+        if metric is None:
+            table[label] = stats['count'].to_numpy()
+        else:
+            table[label] = streaming.mean(stats, metric[0]).to_numpy() * metric[1]
+    return table
+
+
+def delivery_distribution(sketch):
+    """(delivery-time distribution per agent, p50/p90/p99 per agent and per agent/location).
+
+    Percentile rows with Location "All selected" merge every selected location of the agent.
+    """
+    per_agent = sketches.quantiles(sketch, ['Agent Name'])
+    per_agent.insert(1, 'Location', 'All selected')
+    per_pair = sketches.quantiles(sketch, ['Agent Name', 'Location'])
+    percentiles = pd.concat([per_agent, per_pair], ignore_index=True)
+    percentiles['Location'] = percentiles['Location'].astype(str)
+    percentiles = percentiles.round({label: 1 for label in sketches.QUANTILES})
+    return sketches.distribution(sketch, 'Agent Name'), percentiles
@@ -0,0 +1,174 @@
+# analytics/sampling.py
+# Stratified order sample for the revenue page's approximate mode.
+#
+# Orders are stratified by (Platform, Product Category). Each stratum keeps a
+# uniform random sample of at most PER_STRATUM orders plus its true order
+# count, so the sample size is bounded by the number of strata, however many
+# orders there are. New batches are folded in without revisiting old orders:
+# for a stratum with N old orders (sampled) and n new ones, the number of
+# slots kept from the old sample is drawn from a hypergeometric distribution,
+# which keeps the result a uniform sample of all N + n orders.
+#
+# Totals, counts and ratios are estimated with the usual stratified (Horvitz-
+# Thompson) estimators. Confidence intervals come from the per-stratum sample
+# variance with the finite population correction, and a stratum that is
+# sampled in full therefore contributes no error.
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics import cube
+
+STRATA = ['Platform', 'Product Category']
+DATE_COL = 'Order Date'
+VALUE_COL = cube.VALUE_COL
+POPULATION_COL = 'Stratum Orders'
+STRATUM_COL = 'Stratum'
+REQUIRED = set(STRATA) | {VALUE_COL}
+
+PER_STRATUM = int(os.environ.get("DASHBOARD_SAMPLE_PER_STRATUM", "2000"))
+Z = 1.96  # 95% two-sided
+
+
+def rng_for(version):
+    """Deterministic generator per data version, so rebuilds draw the same sample."""
+    return np.random.default_rng(int(version[:16], 16))
+
+
+# -------------------------
+# Building and maintaining the sample
+# -------------------------
+def fold(sample, rows, rng, per_stratum=PER_STRATUM):
+    """Uniform per-stratum sample of (orders behind `sample`) + `rows`."""
+    columns = [c for c in STRATA + [DATE_COL, VALUE_COL] if c in rows.columns]
+    new = rows[columns].copy()
+    if DATE_COL in new.columns:
+        new[DATE_COL] = new[DATE_COL].dt.floor('D')
+    new[VALUE_COL] = new[VALUE_COL].astype('float64')
+    new[POPULATION_COL] = 0  # marks rows of the batch
+    if sample is not None and len(sample):
+        new = pd.concat([sample[columns + [POPULATION_COL]], new], ignore_index=True)
+    for key in STRATA:
+        new[key] = new[key].astype(object)
+
+    parts = []
+    for code, (_, group) in enumerate(new.groupby(STRATA, dropna=False, sort=False)):
+        is_new = (group[POPULATION_COL] == 0).to_numpy()
+        old, fresh = group[~is_new], group[is_new]
+        n_old = int(old[POPULATION_COL].iloc[0]) if len(old) else 0
+        n_new = len(fresh)
+        keep = min(per_stratum, n_old + n_new)
+        from_old = rng.hypergeometric(n_old, n_new, keep) if n_old and n_new else (keep if n_old else 0)
+        picked = pd.concat([
+            old.iloc[rng.choice(len(old), from_old, replace=False)],
+            fresh.iloc[rng.choice(n_new, keep - from_old, replace=False)],
+        ])
+        picked[POPULATION_COL] = n_old + n_new
+        picked[STRATUM_COL] = code  # dense stratum id, so estimates can use bincount
+        parts.append(picked)
+    if not parts:
+        return new.iloc[0:0]
+    result = pd.concat(parts, ignore_index=True)
+    result[POPULATION_COL] = result[POPULATION_COL].astype('int64')
+    result[STRATUM_COL] = result[STRATUM_COL].astype('int32')
+    return result
+
+
+def build_sample(df, rng, per_stratum=PER_STRATUM, chunk_rows=1_000_000):
+    """Sample the typed order frame `df`, one slice at a time."""
+    sample = None
+    for start in range(0, max(len(df), 1), chunk_rows):
+        sample = fold(sample, df.iloc[start:start + chunk_rows], rng, per_stratum)
+    return sample
+
+
+# -------------------------
+# Estimates
+# -------------------------
+def _domain(sample, platforms=None, start=None, end=None):
+    # Same selection semantics as cube.filter_cube / the date-range filter
+    mask = np.ones(len(sample), dtype=bool)
+    if platforms:
+        mask &= sample['Platform'].isin(platforms).to_numpy()
+    if start is not None and DATE_COL in sample.columns:
+        dates = sample[DATE_COL]
+        mask &= ((dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))).to_numpy()
+    return mask
+
+
+def _strata_totals(sample, values, by=None):
+    """Estimated total of `values` and its variance, summed over strata, per `by` group."""
+    codes = sample[STRATUM_COL].to_numpy()
+    n = np.bincount(codes).astype('float64')
+    s1 = np.bincount(codes, weights=values)
+    s2 = np.bincount(codes, weights=values * values)
+    N = np.bincount(codes, weights=sample[POPULATION_COL].to_numpy(dtype='float64')) / n
+    var = np.where(n > 1, (s2 - s1 * s1 / n) / np.maximum(n - 1, 1), 0.0)
+    strata = pd.DataFrame({
+        'total': N * s1 / n,
+        'variance': np.clip(N * N * (1 - n / N) * var / n, 0, None),
+    })
+    if by is None:
+        return strata.sum()
+    by = [by] if isinstance(by, str) else by
+    keys = sample.drop_duplicates(STRATUM_COL).set_index(STRATUM_COL).sort_index()[by]
+    totals = strata.groupby([keys[key].to_numpy() for key in by])[['total', 'variance']].sum()
+    return totals.rename_axis(by if len(by) > 1 else by[0])
+
+
+def kpis(sample, platforms=None, start=None, end=None):
+    """((revenue, ±), (average order value, ±), (orders, ±)) with 95% half-widths."""
+    mask = _domain(sample, platforms, start, end)
+    values = sample[VALUE_COL].to_numpy(dtype='float64') * mask
+    revenue = _strata_totals(sample, values)
+    orders = _strata_totals(sample, mask.astype('float64'))
+    if orders['total'] <= 0:
+        return (0.0, 0.0), (float('nan'), 0.0), (0, 0.0)
+    aov = revenue['total'] / orders['total']
+    # Ratio estimator: linearized residuals u = y - R * 1[domain]
+    residual = _strata_totals(sample, values - aov * mask)
+    return ((revenue['total'], Z * np.sqrt(revenue['variance'])),
+            (aov, Z * np.sqrt(residual['variance']) / orders['total']),
+            (int(round(orders['total'])), Z * np.sqrt(orders['variance'])))
+
+
+def platform_sales(sample, platforms=None, start=None, end=None):
+    """Estimated analytics.revenue.platform_sales table with a ± (95%) column."""
+    mask = _domain(sample, platforms, start, end)
+    totals = _strata_totals(sample, sample[VALUE_COL].to_numpy(dtype='float64') * mask, 'Platform')
+    # Like the exact table, leave out platforms with no orders in the selection
+    totals = totals[_strata_totals(sample, mask.astype('float64'), 'Platform')['total'] > 0]
+    table = pd.DataFrame({
+        'Platform': totals.index.astype(str),
+        'Order Value (INR)': totals['total'].round(0).to_numpy(),
+        'Total Sales (INR, Lakh)': (totals['total'] / 100000).round(2).to_numpy(),
+        'Total Sales (INR, Lakh) ±': (Z * np.sqrt(totals['variance']) / 100000).round(2).to_numpy(),
+    })
+    return table.sort_values('Total Sales (INR, Lakh)', ascending=False)
+
+
+def category_contribution(sample, platforms=None, start=None, end=None):
+    """Estimated analytics.revenue.category_contribution table with a ± (95%) column."""
+    mask = _domain(sample, platforms, start, end)
+    cells = _strata_totals(sample, sample[VALUE_COL].to_numpy(dtype='float64') * mask, STRATA)
+    cells = cells[_strata_totals(sample, mask.astype('float64'), STRATA)['total'] > 0].reset_index()
+    per_platform = cells.groupby('Platform')[['total', 'variance']].transform('sum')
+    share = cells['total'] / per_platform['total']
+    # A category's total and the rest of its platform come from disjoint strata, so they are independent
+    variance = ((1 - share) ** 2 * cells['variance']
+                + share ** 2 * (per_platform['variance'] - cells['variance'])) / per_platform['total'] ** 2
+    table = pd.DataFrame({
+        'Platform': cells['Platform'].astype(str),
+        'Product Category': cells['Product Category'].astype(str),
+        'Contribution (%)': (share * 100).round(1),
+        'Contribution (%) ±': (Z * np.sqrt(variance.clip(lower=0)) * 100).round(1),
+    })
+    return table.sort_values(STRATA).reset_index(drop=True)
+
+
+# Revenue-page sections that approximate mode answers from the sample
+SECTIONS = {
+    'platform_sales': platform_sales,
+    'category_contribution': category_contribution,
+}
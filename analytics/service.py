@@ -0,0 +1,186 @@
+# analytics/service.py
+# Local data service: one process holds the datasets, every dashboard worker
+# queries it for aggregated results.
+#
+#   python -m analytics.service                      # serve on 127.0.0.1:8599
+#   DASHBOARD_QUERY_BACKEND=service streamlit run app.py
+#
+# The service wraps one of the in-process query backends (analytics.backends,
+# pandas by default) behind a small HTTP API on the loopback interface, so the
+# Arrow caches, revenue cube, partitions, review stats and delivery sketches
+# are loaded once no matter how many Streamlit processes and sessions are
+# running. Workers use
+# backends.ServiceBackend, which has the same methods as the other backends
+# and only ever receives the filtered, aggregated tables. Worker memory is then
+# the filter cache plus those tables, independent of the dataset size.
+#
+# Protocol: POST /query with a JSON body {"method": ..., "dataset": ..., "args": [...]}.
+# `dataset` is a dataset name (revenue, reviews), never a path: the service
+# reads the current snapshot of its own configured source (analytics.sources),
+# so run it with the same sources.toml / DASHBOARD_*_SOURCE as the workers.
+# `args` are the method's arguments after the path and data version.
+# Tables come back as an Arrow IPC stream, anything else as JSON. Errors are
+# JSON {"error", "type"} with status 404 (dataset missing) or 500.
+# GET /health reports the wrapped backend and the service's resident memory.
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pyarrow as pa
+
+from analytics import ingest, sources
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8599
+DEFAULT_URL = os.environ.get("DASHBOARD_SERVICE_URL", f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+JSON_TYPE = 'application/json'
+
+# Backend methods the service answers, with the dataset each one reads;
+# nothing else can be called remotely.
+METHODS = {
+    'revenue_cube': 'revenue',
+    'revenue_platforms': 'revenue',
+    'revenue_dates': 'revenue',
+    'review_stats': 'reviews',
+    'review_options': 'reviews',
+    'review_sketch': 'reviews',
+    'review_breakdown': 'reviews',
+}
+
+
+# -------------------------
+# Wire format
+# -------------------------
+def encode_table(frame):
+    """Arrow IPC stream bytes for a DataFrame (index, categoricals and dtypes preserved)."""
+    table = pa.Table.from_pandas(frame, preserve_index=not isinstance(frame.index, pd.RangeIndex))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_table(payload):
+    return pa.ipc.open_stream(pa.py_buffer(payload)).read_all().to_pandas()
+
+
+def encode_value(value):
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.Timestamp):
+        value = [ts.isoformat() for ts in value]  # revenue_dates
+    return json.dumps(value, default=str).encode()
+
+
+def encode_args(args):
+    # Dates from the date picker travel as ISO strings; the backends accept those.
+    return [a.isoformat() if hasattr(a, 'isoformat') else a for a in args]
+
+
+# -------------------------
+# Server
+# -------------------------
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive: each worker thread reuses one connection
+    backend = None
+    paths = None  # {dataset: CSV path} served instead of the configured sources
+
+    def _path(self, dataset):
+        return self.paths[dataset] if self.paths is not None else sources.path(dataset)
+
+    def _reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, exc):
+        self._reply(status, json.dumps({'error': str(exc), 'type': type(exc).__name__}).encode(), JSON_TYPE)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._error(404, LookupError(f"no route {self.path}"))
+        health = {'status': 'ok', 'backend': self.backend.name, 'pid': os.getpid(),
+                  'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+        self._reply(200, json.dumps(health).encode(), JSON_TYPE)
+
+    def do_POST(self):
+        if self.path != '/query':
+            return self._error(404, LookupError(f"no route {self.path}"))
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            method = request.get('method')
+            if method not in METHODS:
+                raise ValueError(f"unknown method {method!r}")
+            if request.get('dataset') != METHODS[method]:
+                raise ValueError(f"{method} reads the {METHODS[method]!r} dataset, not {request.get('dataset')!r}")
+            path = self._path(METHODS[method])
+            result = getattr(self.backend, method)(path, ingest.data_version(path), *request.get('args', []))
+        except FileNotFoundError as exc:
+            return self._error(404, exc)
+        except Exception as exc:
+            return self._error(500, exc)
+        if isinstance(result, pd.DataFrame):
+            self._reply(200, encode_table(result), ARROW_TYPE)
+        else:
+            self._reply(200, encode_value(result), JSON_TYPE)
+
+    def log_message(self, format, *args):
+        pass  # one line per query would drown the console
+
+
+def make_server(backend, host=DEFAULT_HOST, port=DEFAULT_PORT, paths=None):
+    """HTTP server answering queries with `backend`; call serve_forever() on it.
+
+    `paths` ({dataset: CSV path}) pins the served files; by default each query
+    reads the current snapshot of the dataset's configured source.
+    """
+    handler = type('Handler', (_Handler,), {'backend': backend, 'paths': paths})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_thread(backend, host=DEFAULT_HOST, port=0, paths=None):
+    """Start a server on a background thread (port 0 picks a free port). Returns the server."""
+    server = make_server(backend, host, port, paths)
+    threading.Thread(target=server.serve_forever, name="dashboard-service", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    from analytics import backends, warmup
+
+    parser = argparse.ArgumentParser(description="Serve the dashboard's datasets to its worker processes.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--backend', default='pandas', choices=[n for n in backends.BACKENDS if n != 'service'],
+                        help="Backend that holds the data inside the service (default: pandas)")
+    parser.add_argument('--no-warmup', action='store_true', help="Don't load both datasets before serving")
+    args = parser.parse_args(argv)
+
+    backend = backends.get_backend(args.backend)
+    if not args.no_warmup:
+        # Loads the datasets and builds every persisted artifact before the first query
+        print(json.dumps(warmup.warm_up(backend=backend)), flush=True)
+    # New snapshots are prepared with this backend, then served, like in the dashboard
+    sources.watch(lambda dataset, path: warmup.prepare(dataset, path, backend))
+    server = make_server(backend, args.host, args.port)
+    print(f"Serving {backend.name} data on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# analytics/sketches.py
+# Mergeable delivery-time histograms for tail-latency percentiles.
+#
+# Each (Agent Name, Location) pair keeps a histogram of Delivery Time (min)
+# over fixed, log-spaced bins (the DDSketch layout): bin k holds the values in
+# (GAMMA^(k-1), GAMMA^k], and reporting a bin by its relative midpoint is off
+# by at most ALPHA (0.5%) of the true value, at any scale. Only occupied bins
+# are stored, as rows of (Agent Name, Location, Bin) -> count, so integer
+# minutes cost one row per distinct value.
+#
+# Histograms merge by adding counts. A sketch is built once per data version
+# (in chunks, like the review accumulators in analytics.streaming) and every
+# filter combination is answered by summing the selected pairs' bins: p50,
+# p90 and p99 then come from a cumulative sum over a few hundred bins instead
+# of sorting the raw rows.
+import numpy as np
+import pandas as pd
+
+from analytics import streaming
+
+VALUE_COL = 'Delivery Time (min)'
+SKETCH_KEYS = streaming.STATS_KEYS + ['Bin']
+QUANTILES = {'p50': 0.50, 'p90': 0.90, 'p99': 0.99}
+
+ALPHA = 0.005
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+MIN_VALUE = 0.01  # minutes; smaller values (including 0) share the lowest bin
+
+
+def bin_index(values):
+    values = np.maximum(np.asarray(values, dtype='float64'), MIN_VALUE)
+    return np.ceil(np.log(values) / np.log(GAMMA)).astype('int64')
+
+
+def bin_value(index):
+    """Value reported for bin `index`: within ALPHA of everything in the bin."""
+    return 2 * GAMMA ** np.asarray(index, dtype='float64') / (GAMMA + 1)
+
+
+def empty():
+    return pd.DataFrame({'count': pd.Series([], dtype='int64')},
+                        index=pd.MultiIndex.from_arrays([[], [], pd.Index([], dtype='int64')], names=SKETCH_KEYS))
+
+
+# -------------------------
+# Building
+# -------------------------
+def fold_chunk(chunk, weights=None):
+    """Per-(agent, location) histograms of one chunk of review rows.
+
+    `weights` (optional, one count per row) folds pre-grouped rows, e.g. the
+    (agent, location, value) counts a SQL backend returns.
+    """
+    if not len(chunk):
+        return empty()
+    agent_codes, agents = streaming.key_codes(chunk['Agent Name'])
+    loc_codes, locs = streaming.key_codes(chunk['Location'])
+    bins = bin_index(streaming.numeric(chunk[VALUE_COL]))
+    low = bins.min()
+    span = bins.max() - low + 1
+    # One integer per (agent, location, bin); np.unique groups them in a single pass
+    cells, inverse = np.unique((agent_codes * len(locs) + loc_codes) * span + (bins - low), return_inverse=True)
+    counts = np.bincount(inverse, weights=None if weights is None else np.asarray(weights, dtype='float64'),
+                         minlength=len(cells))
+    pairs, offsets = np.divmod(cells, span)
+    index = pd.MultiIndex.from_arrays([agents[pairs // len(locs)], locs[pairs % len(locs)], offsets + low],
+                                      names=SKETCH_KEYS)
+    return pd.DataFrame({'count': counts.astype('int64')}, index=index).sort_index()
+
+
+def combine(acc, part):
+    if acc is None:
+        return part
+    merged = acc.add(part, fill_value=0)
+    merged['count'] = merged['count'].astype('int64')
+    return merged
+
+
+def stream_sketch(path, chunksize=streaming.DEFAULT_CHUNKSIZE):
+    """Fold the CSV at `path` chunk by chunk; never holds more than one chunk of rows."""
+    usecols = streaming.STATS_KEYS + [VALUE_COL]
+    dtype = {key: 'category' for key in streaming.STATS_KEYS}
+    acc = None
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize):
+        acc = combine(acc, fold_chunk(chunk))
+    return empty() if acc is None else acc.sort_index()
+
+
+# -------------------------
+# Queries over merged histograms
+# -------------------------
+def filter_sketch(sketch, agents=None, locations=None):
+    """Bins of the selected agents/locations (None means all)."""
+    if agents is not None:
+        sketch = sketch[sketch.index.get_level_values('Agent Name').isin(agents)]
+    if locations is not None:
+        sketch = sketch[sketch.index.get_level_values('Location').isin(locations)]
+    return sketch
+
+
+def merge(sketch, by):
+    """Counts per (`by`..., Bin), summed over the other keys; bins ascending within each group."""
+    return sketch['count'].groupby(level=list(by) + ['Bin']).sum().sort_index()
+
+
+def quantiles(sketch, by, quantiles=QUANTILES):
+    """Table of `by` keys, review count and one column per quantile (in minutes)."""
+    by = list(by)
+    counts = merge(sketch, by)
+    groups = counts.groupby(level=by, sort=False)
+    totals = groups.transform('sum')
+    cumulative = groups.cumsum()
+    table = counts.groupby(level=by).sum().rename('Reviews').to_frame()
+    for label, q in quantiles.items():
+        # Nearest rank: the first bin whose cumulative count reaches q * n
+        reached = cumulative[cumulative >= q * totals]
+        first = reached.groupby(level=by, sort=False).head(1)
+        table[label] = pd.Series(bin_value(first.index.get_level_values('Bin')),
+                                 index=first.index.droplevel('Bin'))
+    return table.reset_index()
+
+
+def distribution(sketch, by, display_bins=40):
+    """Share (%) of reviews per `by` group over at most ~`display_bins` equal-width minute bins."""
+    counts = merge(sketch, [by]).reset_index()
+    if counts.empty:
+        return pd.DataFrame(columns=[by, VALUE_COL, 'Share (%)'])
+    values = bin_value(counts['Bin'].to_numpy())
+    width = max(1.0, float(np.ceil((values.max() - values.min()) / display_bins)))
+    counts[VALUE_COL] = np.round(values / width) * width
+    table = counts.groupby([by, VALUE_COL], observed=True, as_index=False)['count'].sum()
+    table['Share (%)'] = table['count'] / table.groupby(by, observed=True)['count'].transform('sum') * 100
+    return table.drop(columns='count')
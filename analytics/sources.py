@@ -0,0 +1,414 @@
+# analytics/sources.py
+# Where the dashboard's datasets come from, and how new versions are picked up.
+#
+# Each dataset (revenue, reviews) is read from a source, configured in
+# .streamlit/sources.toml or overridden per dataset with DASHBOARD_REVENUE_SOURCE /
+# DASHBOARD_REVIEWS_SOURCE:
+#
+#   Sales/Revenue.csv        a local CSV file (default: the Sales/ files)
+#   dir:Sales/revenue        a directory of partition CSVs (any depth, same header)
+#   store://bucket/prefix    objects under a prefix in the local object store
+#                            stand-in: a folder per bucket under
+#                            DASHBOARD_OBJECT_STORE_ROOT, keys are relative paths
+#
+# Partitioned and object-store sources are materialized into an immutable
+# snapshot CSV (one per fingerprint of the listed files) under SNAPSHOT_DIR;
+# everything downstream -- typed caches, aggregates, backends, filter cache --
+# keeps working on a single local CSV path and its data version.
+#
+# snapshot(dataset) returns the current Snapshot; only the very first call
+# waits for a load. watch() polls every source on a background thread: when a
+# fingerprint changes, the new snapshot is materialized and prepared (caches
+# built, see analytics.warmup) while pages keep using the last good snapshot,
+# then swapped in with a single assignment. A failed refresh keeps the last
+# good snapshot and is reported by status().
+#
+# A local file is snapshotted the same way, by copying it: a file rewritten or
+# appended to (e.g. by analytics.incremental) while a page run reads it is
+# never hashed or parsed half-written. The copy is a copy-on-write clone where
+# the filesystem supports it and takes over the file's typed cache and
+# aggregates (ingest.adopt_cache). A file that has only grown since the current
+# snapshot is not copied again: the new snapshot is the current one plus the
+# appended bytes, folded in with analytics.incremental, so an append costs only
+# its own rows whoever wrote it; the pages see it with the next refresh.
+#
+# Like analytics.warmup, this module only imports the standard library.
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import tomllib
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: snapshots are plain copies there
+    fcntl = None
+
+CONFIG_PATH = os.environ.get("DASHBOARD_SOURCES_CONFIG", ".streamlit/sources.toml")
+OBJECT_STORE_ROOT = os.environ.get("DASHBOARD_OBJECT_STORE_ROOT", "Sales/.objectstore")
+SNAPSHOT_DIR = os.environ.get("DASHBOARD_SNAPSHOT_DIR", "Sales/.cache/snapshots")
+KEEP_SNAPSHOTS = 2  # the current one and the one in-flight page runs may still be reading
+
+DEFAULT_SOURCES = {'revenue': "Sales/Revenue.csv", 'reviews': "Sales/Reviews.csv"}
+DEFAULT_REFRESH_SECONDS = 30.0
+
+
+# -------------------------
+# Configuration
+# -------------------------
+def _read_config(path=CONFIG_PATH):
+    try:
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def configured_uri(dataset, config=None):
+    """Source URI of `dataset`: env override, then sources.toml, then the Sales/ default."""
+    config = _read_config() if config is None else config
+    env = os.environ.get(f"DASHBOARD_{dataset.upper()}_SOURCE")
+    return env or config.get(dataset, {}).get('uri') or DEFAULT_SOURCES[dataset]
+
+
+def refresh_seconds(config=None):
+    config = _read_config() if config is None else config
+    return float(os.environ.get("DASHBOARD_SOURCE_REFRESH_SECONDS")
+                 or config.get('refresh_seconds', DEFAULT_REFRESH_SECONDS))
+
+
+# -------------------------
+# Sources
+# -------------------------
+COPY_ATTEMPTS = 3
+BOUNDARY_BYTES = 1 << 16  # compared at the end of the previous snapshot to tell an append from a rewrite
+FICLONE = 0x40049409      # Linux ioctl: copy-on-write clone (btrfs, XFS, ...)
+APPENDERS = {'revenue': 'append_revenue', 'reviews': 'append_reviews'}  # analytics.incremental
+
+
+def _stat_entry(path, name):
+    st_ = os.stat(path)
+    return [name, st_.st_size, st_.st_mtime_ns]
+
+
+def _snapshot_path(dataset, fingerprint):
+    digest = hashlib.sha1(json.dumps(fingerprint).encode()).hexdigest()[:16]
+    return os.path.join(SNAPSHOT_DIR, f"{dataset}-{digest}.csv")
+
+
+def _tmp_path(target):
+    return f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _clone(src, dst):
+    # Shares the blocks until either file is written where the filesystem can; else a byte copy
+    if fcntl is not None:
+        try:
+            with open(src, 'rb') as source, open(dst, 'wb') as out:
+                fcntl.ioctl(out.fileno(), FICLONE, source.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
+
+def _remove_artifacts(csv_path):
+    # A CSV and everything cached for it (see _prune)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    for artifact in [csv_path] + glob.glob(os.path.join(os.path.dirname(csv_path), '.cache', glob.escape(stem) + '*')):
+        if os.path.isdir(artifact):
+            shutil.rmtree(artifact, ignore_errors=True)  # e.g. the .daily partition store
+            continue
+        try:
+            os.remove(artifact)
+        except OSError:
+            pass
+
+
+class FileSource:
+    """A local CSV, copied into a snapshot file."""
+
+    kind = 'file'
+
+    def __init__(self, path):
+        self.path = path
+
+    def fingerprint(self):
+        return [_stat_entry(self.path, os.path.basename(self.path))]
+
+    def _grown_from(self, previous, fingerprint):
+        """Size of the `previous` snapshot if the file has only been appended to since, else None.
+
+        Like analytics.incremental, an append is trusted to leave the earlier rows
+        alone; the bytes before the old end are compared to catch a rewrite.
+        """
+        if previous is None or not os.path.exists(previous.path):
+            return None
+        (name, old_size, _), (new_name, new_size, _) = previous.fingerprint[0], fingerprint[0]
+        if name != new_name or not 0 < old_size < new_size or os.path.getsize(previous.path) != old_size:
+            return None
+        n = min(old_size, BOUNDARY_BYTES)
+        with open(previous.path, 'rb') as old, open(self.path, 'rb') as new:
+            old.seek(old_size - n)
+            new.seek(old_size - n)
+            boundary = old.read(n)
+            if not boundary.endswith(b'\n') or new.read(n) != boundary:
+                return None
+        return old_size
+
+    def _extend(self, dataset, previous, old_size, fingerprint, target):
+        """Snapshot `target` as `previous` plus the appended bytes.
+
+        Returns True once written, False if the file changed meanwhile, None if
+        `previous` has no caches to extend (a plain copy costs the same then).
+        """
+        from analytics import incremental, ingest
+
+        staging = _tmp_path(target)
+        try:
+            _clone(previous.path, staging)
+            st_ = os.stat(previous.path)
+            if not ingest.adopt_cache(previous.path, staging, st_.st_size, st_.st_mtime_ns):
+                return None
+            with open(self.path, 'rb') as f:
+                f.seek(old_size)
+                payload = f.read(fingerprint[0][1] - old_size)
+            if self.fingerprint() != fingerprint:
+                return False
+            getattr(incremental, APPENDERS[dataset])(payload, staging)
+            os.link(staging, target)  # readers only ever see a complete snapshot
+            st_ = os.stat(target)
+            ingest.adopt_cache(staging, target, st_.st_size, st_.st_mtime_ns)
+            return True
+        finally:
+            _remove_artifacts(staging)
+
+    def materialize(self, dataset, fingerprint, previous=None):
+        for _ in range(COPY_ATTEMPTS):
+            target = _snapshot_path(dataset, fingerprint)
+            if os.path.exists(target):
+                return target
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            old_size = self._grown_from(previous, fingerprint)
+            if old_size is not None:
+                extended = self._extend(dataset, previous, old_size, fingerprint, target)
+                if extended:
+                    return target
+                if extended is False:
+                    fingerprint = self.fingerprint()  # appended to again: extend by the new bytes
+                    continue
+            tmp = _tmp_path(target)
+            _clone(self.path, tmp)
+            copied, fingerprint = fingerprint, self.fingerprint()
+            if fingerprint != copied:
+                os.remove(tmp)  # written to while being copied: copy the new version instead
+                continue
+            os.replace(tmp, target)  # readers only ever see a complete snapshot
+            from analytics import ingest
+
+            ingest.adopt_cache(self.path, target, *fingerprint[0][1:])
+            return target
+        raise RuntimeError(f"{self.path} kept changing while being copied")
+
+
+class _ConcatSource:
+    """Several CSV parts with one header, concatenated into a snapshot file."""
+
+    def _parts(self):
+        """Sorted [(name, local path)] of the parts."""
+        raise NotImplementedError
+
+    def fingerprint(self):
+        parts = self._parts()
+        if not parts:
+            raise FileNotFoundError(2, "No CSV parts found", self.location)
+        return [_stat_entry(path, name) for name, path in parts]
+
+    def _open_part(self, path):
+        return open(path, 'rb')
+
+    def materialize(self, dataset, fingerprint, previous=None):
+        target = _snapshot_path(dataset, fingerprint)
+        if os.path.exists(target):
+            return target
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        tmp = _tmp_path(target)
+        header = None
+        with open(tmp, 'wb') as out:
+            for name, path in self._parts():
+                with self._open_part(path) as part:
+                    first = part.readline()
+                    if header is None:
+                        header = first.rstrip(b'\r\n')
+                        out.write(header + b'\n')
+                    elif first.rstrip(b'\r\n') != header:
+                        raise ValueError(f"{name}: header differs from the first part's")
+                    if not first.endswith(b'\n'):
+                        continue  # header only
+                    shutil.copyfileobj(part, out, 1 << 20)
+                    # A part without a trailing newline must not glue its last row to the next part
+                    part.seek(-1, os.SEEK_END)
+                    if part.read(1) != b'\n':
+                        out.write(b'\n')
+        os.replace(tmp, target)  # readers only ever see a complete snapshot
+        return target
+
+
+class DirectorySource(_ConcatSource):
+    """Partition CSVs anywhere below a directory, in path order."""
+
+    kind = 'dir'
+
+    def __init__(self, path):
+        self.location = path
+
+    def _parts(self):
+        paths = glob.glob(os.path.join(self.location, '**', '*.csv'), recursive=True)
+        return [(os.path.relpath(p, self.location), p) for p in sorted(paths)]
+
+
+class ObjectStoreSource(_ConcatSource):
+    """CSV objects under a key prefix of the local object store stand-in, in key order.
+
+    Listing and reads go through list_objects() / _open_part(), the two calls a
+    real object-store client would replace.
+    """
+
+    kind = 'store'
+
+    def __init__(self, bucket, prefix, root=None):
+        self.bucket, self.prefix = bucket, prefix.strip('/')
+        self.root = os.path.join(root or OBJECT_STORE_ROOT, bucket)
+        self.location = f"store://{bucket}/{self.prefix}"
+
+    def list_objects(self):
+        """Sorted keys of the CSV objects under the prefix."""
+        base = os.path.join(self.root, self.prefix)
+        paths = glob.glob(os.path.join(base, '**', '*.csv'), recursive=True)
+        return sorted(os.path.relpath(p, self.root).replace(os.sep, '/') for p in paths)
+
+    def _parts(self):
+        return [(key, os.path.join(self.root, *key.split('/'))) for key in self.list_objects()]
+
+
+def from_uri(uri):
+    """Source object for a configured URI."""
+    if uri.startswith('store://'):
+        bucket, _, prefix = uri[len('store://'):].partition('/')
+        return ObjectStoreSource(bucket, prefix)
+    if uri.startswith('dir:'):
+        return DirectorySource(uri[len('dir:'):])
+    path = uri[len('file:'):] if uri.startswith('file:') else uri
+    return DirectorySource(path) if os.path.isdir(path) else FileSource(path)
+
+
+# -------------------------
+# Snapshots: last good version per dataset, swapped atomically
+# -------------------------
+class Snapshot:
+    """One loaded version of a dataset: the local CSV the pages read and when it was loaded."""
+
+    def __init__(self, dataset, uri, path, fingerprint):
+        self.dataset, self.uri, self.path, self.fingerprint = dataset, uri, path, fingerprint
+        self.loaded_at = time.time()
+
+    def describe(self):
+        return {'uri': self.uri, 'path': self.path, 'loaded_at': self.loaded_at}
+
+
+_lock = threading.Lock()
+_load_locks = {name: threading.Lock() for name in DEFAULT_SOURCES}
+_snapshots = {}
+_status = {name: {'state': 'idle', 'error': None, 'checked_at': None} for name in DEFAULT_SOURCES}
+_watcher = None
+
+
+def _set_status(dataset, **fields):
+    with _lock:
+        _status[dataset].update(fields)
+
+
+def status():
+    """Per dataset: state (idle, loading, refreshing, ready, failed), last error and current snapshot."""
+    with _lock:
+        return {name: dict(entry, snapshot=_snapshots[name].describe() if name in _snapshots else None)
+                for name, entry in _status.items()}
+
+
+def refresh(dataset, prepare=None):
+    """Load `dataset` again if its source changed. Returns the (possibly new) current snapshot.
+
+    `prepare(dataset, path)` runs on the new snapshot before it is swapped in.
+    Errors propagate when there is no snapshot yet; otherwise the last good one stays.
+    """
+    with _load_locks[dataset]:
+        current = _snapshots.get(dataset)
+        uri = configured_uri(dataset)
+        try:
+            source = from_uri(uri)
+            fingerprint = source.fingerprint()
+            _set_status(dataset, checked_at=time.time())
+            if current is not None and current.uri == uri and current.fingerprint == fingerprint:
+                return current
+            _set_status(dataset, state='loading' if current is None else 'refreshing')
+            previous = current if current is not None and current.uri == uri else None
+            path = source.materialize(dataset, fingerprint, previous)
+            if prepare is not None:
+                prepare(dataset, path)
+        except Exception as exc:
+            _set_status(dataset, state='failed' if current is None else 'ready',
+                        error=f"{type(exc).__name__}: {exc}")
+            if current is None:
+                raise
+            return current
+        snapshot = Snapshot(dataset, uri, path, fingerprint)
+        with _lock:
+            _snapshots[dataset] = snapshot
+            _status[dataset].update(state='ready', error=None)
+        _prune(dataset)
+        return snapshot
+
+
+def snapshot(dataset):
+    """Current snapshot of `dataset`; waits for the first load only."""
+    current = _snapshots.get(dataset)
+    return current if current is not None else refresh(dataset)
+
+
+def path(dataset):
+    """Local CSV path of the current snapshot of `dataset`."""
+    return snapshot(dataset).path
+
+
+def is_refreshing(dataset):
+    return status()[dataset]['state'] == 'refreshing'
+
+
+def _prune(dataset):
+    # Drop snapshot files (and their caches) beyond the newest KEEP_SNAPSHOTS of this dataset
+    files = sorted(glob.glob(os.path.join(SNAPSHOT_DIR, f"{dataset}-*.csv")), key=os.path.getmtime, reverse=True)
+    current = _snapshots[dataset].path
+    for old in [f for f in files if os.path.abspath(f) != os.path.abspath(current)][KEEP_SNAPSHOTS - 1:]:
+        _remove_artifacts(old)
+
+
+def watch(prepare=None, interval=None):
+    """Poll every dataset's source on a background thread, once per process."""
+    global _watcher
+
+    def loop():
+        while True:
+            time.sleep(interval or refresh_seconds())
+            for dataset in DEFAULT_SOURCES:
+                try:
+                    refresh(dataset, prepare)
+                except Exception:
+                    pass  # recorded in status(); the pages report a missing dataset themselves
+
+    with _lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=loop, name="dashboard-sources", daemon=True)
+            _watcher.start()
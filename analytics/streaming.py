@@ -0,0 +1,123 @@
+# analytics/streaming.py
+# Bounded-memory review statistics.
+#
+# Reviews.csv is read in chunks and each chunk is folded into running
+# accumulators keyed by (Agent Name, Location): row count, sum and sum of squares
+# of delivery time and service rating, and the number of accurate / available
+# orders. Memory is bounded by the number of (agent, location) pairs, not by the
+# file size, and every review-page chart can be answered from these totals.
+#
+# Folding works on integer codes: each key column is dictionary-encoded (the
+# typed loader already stores them as categoricals), the pair of codes is
+# combined into one group id and every accumulator is a single bincount.
+import os
+
+import numpy as np
+import pandas as pd
+
+STATS_KEYS = ['Agent Name', 'Location']
+MEASURES = ['Delivery Time (min)', 'Customer Service Rating']
+FLAGS = ['Order Accuracy', 'Product Availability']
+
+DEFAULT_CHUNKSIZE = 250_000
+STREAMING_THRESHOLD_MB = float(os.environ.get("DASHBOARD_STREAMING_THRESHOLD_MB", "512"))
+
+
+def use_streaming(path):
+    """Stream files larger than DASHBOARD_STREAMING_THRESHOLD_MB instead of loading them."""
+    return os.path.getsize(path) > STREAMING_THRESHOLD_MB * 2**20
+
+
+def stat_columns():
+    cols = ['count']
+    for m in MEASURES:
+        cols += [f'{m} sum', f'{m} sumsq']
+    return cols + [f'{f} sum' for f in FLAGS]
+
+
+def key_codes(values):
+    """(codes, labels) of a key column; a missing key gets its own code, len(labels) - 1."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, labels = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, labels = pd.factorize(values, sort=True)
+    labels = np.append(np.asarray(labels, dtype=object), np.nan)
+    return np.where(codes < 0, len(labels) - 1, codes).astype('int64'), labels
+
+
+def numeric(values):
+    # Same coercion as the in-memory loader: unparseable/missing -> 0
+    if values.dtype.kind not in 'biuf':
+        values = pd.to_numeric(values, errors='coerce')
+    return values.to_numpy(dtype='float64', na_value=0.0)
+
+
+def fold_chunk(chunk, keys=STATS_KEYS):
+    """Per-(agent, location) accumulators for one chunk of review rows (or per any other `keys`)."""
+    codes, labels = zip(*(key_codes(chunk[key]) for key in keys))
+    shape = tuple(len(l) for l in labels)
+    n_groups = int(np.prod(shape))
+    groups = np.ravel_multi_index(codes, shape)
+    parts = {'count': np.bincount(groups, minlength=n_groups)}
+    for col in MEASURES + FLAGS:
+        values = numeric(chunk[col])
+        parts[f'{col} sum'] = np.bincount(groups, weights=values, minlength=n_groups)
+        if col in MEASURES:
+            parts[f'{col} sumsq'] = np.bincount(groups, weights=values * values, minlength=n_groups)
+    # Only groups that occur; a review with no location still counts towards its agent.
+    # Key levels are plain objects so stats from different sources align in combine().
+    present = np.flatnonzero(parts['count'])
+    index = pd.MultiIndex.from_arrays([l[c] for l, c in zip(labels, np.unravel_index(present, shape))],
+                                      names=list(keys))
+    stats = pd.DataFrame({c: parts[c][present] for c in stat_columns()}, index=index, dtype='float64')
+    stats['count'] = stats['count'].astype('int64')
+    return stats.sort_index()
+
+
+def combine(acc, part):
+    if acc is None:
+        return part
+    return acc.add(part, fill_value=0)
+
+
+def stream_review_stats(path="Sales/Reviews.csv", chunksize=DEFAULT_CHUNKSIZE):
+    """Fold the CSV at `path` chunk by chunk; never holds more than one chunk of rows."""
+    usecols = STATS_KEYS + MEASURES + FLAGS
+    # Per-chunk categoricals are fine: fold_chunk() emits plain key labels.
+    dtype = {key: 'category' for key in STATS_KEYS}
+    acc = None
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize):
+        acc = combine(acc, fold_chunk(chunk))
+    if acc is None:
+        acc = pd.DataFrame(columns=stat_columns(),
+                           index=pd.MultiIndex.from_arrays([[], []], names=STATS_KEYS))
+    acc['count'] = acc['count'].astype('int64')
+    return acc.sort_index()
+
+
+# ----------------------
+# Queries over the accumulators
+# ----------------------
+def filter_stats(stats, platforms, locations):
+    agents = stats.index.get_level_values('Agent Name')
+    locs = stats.index.get_level_values('Location')
+    return stats[agents.isin(platforms) & locs.isin(locations)]
+
+
+def options(stats, level):
+    return sorted(stats.index.get_level_values(level).dropna().unique())
+
+
+def totals(stats, by):
+    """Accumulators summed over the other key."""
+    return stats.groupby(level=by, observed=True).sum()
+
+
+def mean(stats, column):
+    return stats[f'{column} sum'] / stats['count']
+
+
+def std(stats, column):
+    n = stats['count']
+    var = (stats[f'{column} sumsq'] - stats[f'{column} sum'] ** 2 / n) / (n - 1)
+    return np.sqrt(var.clip(lower=0))
@@ -0,0 +1,69 @@
+# analytics/usage.py
+# Platform usage per location as a vectorized crosstab + argmax.
+#
+# Counts are scattered into a (location x platform) matrix with integer codes, so
+# "most used platform per location" is a single argmax over rows instead of a
+# Python value_counts() callback per location. Works for any number of platforms.
+import numpy as np
+import pandas as pd
+
+
+def crosstab(row_codes, col_codes, n_rows, n_cols, weights=None):
+    """Dense (n_rows x n_cols) count matrix from integer codes; negative codes (NaN) are skipped."""
+    row_codes = np.asarray(row_codes, dtype='int64')
+    col_codes = np.asarray(col_codes, dtype='int64')
+    valid = (row_codes >= 0) & (col_codes >= 0)
+    flat = row_codes[valid] * n_cols + col_codes[valid]
+    w = None if weights is None else np.asarray(weights)[valid]
+    return np.bincount(flat, weights=w, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+
+
+def _trim(counts):
+    # Only locations / platforms that actually occur in the selection
+    return counts.loc[counts.sum(axis=1) > 0, counts.sum(axis=0) > 0]
+
+
+def usage_from_stats(stats):
+    """Location x platform review counts from the per-(agent, location) accumulators."""
+    index = stats.index
+    agent_level = index.names.index('Agent Name')
+    loc_level = index.names.index('Location')
+    matrix = crosstab(index.codes[loc_level], index.codes[agent_level],
+                      len(index.levels[loc_level]), len(index.levels[agent_level]),
+                      weights=stats['count'].to_numpy())
+    counts = pd.DataFrame(matrix.astype('int64'), index=pd.Index(index.levels[loc_level], name='Location'),
+                          columns=pd.Index(index.levels[agent_level], name='Agent Name'))
+    return _trim(counts)
+
+
+def usage_from_frame(df):
+    """Location x platform review counts straight from review rows."""
+    loc = df['Location'].astype('category').cat
+    agent = df['Agent Name'].astype('category').cat
+    matrix = crosstab(loc.codes, agent.codes, len(loc.categories), len(agent.categories))
+    counts = pd.DataFrame(matrix, index=pd.Index(loc.categories, name='Location'),
+                          columns=pd.Index(agent.categories, name='Agent Name'))
+    return _trim(counts)
+
+
+def most_used(counts):
+    """Most used platform per location with its count and share (ties go to the first platform)."""
+    values = counts.to_numpy()
+    best = values.argmax(axis=1)
+    top = values[np.arange(len(values)), best]
+    totals = values.sum(axis=1)
+    return pd.DataFrame({
+        'Location': counts.index.astype(str),
+        'Most Used Platform': counts.columns.astype(str)[best],
+        'Count': top,
+        'Share (%)': top / totals * 100,
+    })
+
+
+def shares(counts, location):
+    """Per-platform counts and percentage for one location, largest first."""
+    row = counts.loc[location]
+    row = row[row > 0].sort_values(ascending=False, kind='stable')
+    table = pd.DataFrame({'Platform': row.index.astype(str), 'Count': row.to_numpy()})
+    table['Percentage'] = table['Count'] / table['Count'].sum() * 100
+    return table
@@ -0,0 +1,296 @@
+# analytics/views.py
+# The Revenue and Review Analysis pages' computations for one filter dict.
+#
+# revenue_view() and reviews_view() turn a page's filter dict (the keys the
+# pages, the export URLs and the report presets share; keys left out keep the
+# page default) into a PageView: the KPIs plus every section's aggregated table
+# and chart, computed through the shared filter cache under the pages' keys.
+# The pages only add widgets and rendering on top; warm-up, export and the
+# headless reports call the same functions, so they always hit the entries the
+# pages read.
+#
+# Nothing but the filtered base view is computed up front: KPIs, tables and
+# sections are callables, and `sections` is ready for parallel.run_sections().
+import contextlib
+import functools
+import json
+
+import pandas as pd
+
+from analytics import backends, bitmaps, figures, incremental, ingest, revenue, reviews, sampling
+from analytics import cache as fcache
+
+# Sections in page order
+SECTIONS = {
+    'revenue': list(revenue.SECTIONS) + ['trend'],
+    'reviews': ['avg_delivery', 'delivery_distribution', 'usage', 'avg_feedback', 'order_product', 'breakdown'],
+}
+
+# Filter dict keys per page and the values they take (check_filters):
+#   labels  a list of values; null means every value
+#   dates   [first, last] ISO dates; null means the whole range
+#   window  a positive whole number of periods
+#   or the list of allowed values
+FILTERS = {
+    'revenue': {'Platform': 'labels', 'Order Date': 'dates', 'Granularity': list(revenue.GRANULARITIES),
+                'Window': 'window', 'Mode': ['approximate']},
+    'reviews': {'Platform': 'labels', 'Location': 'labels', **{c: 'labels' for c in bitmaps.DRILL_DOWN},
+                'Drill-down': list(bitmaps.DRILL_DOWN), 'Metric': list(reviews.DRILL_DOWN_METRICS)},
+}
+
+# Why a section is missing from PageView.sections (the pages word it themselves):
+#   columns    the data lacks the section's columns
+#   empty      nothing matches the selection
+#   platforms  usage compares platforms and needs at least two selected
+
+
+class PageView:
+    """One page's computations for one filter dict (read-only; results are shared)."""
+
+    def __init__(self, page, filters, base, kpis, tables, sections, missing, approximate=False):
+        self.page = page
+        self.filters = filters          # the full filter dict, defaults filled in (export, reports)
+        self.base = base                # filtered revenue cube / review accumulators
+        self.kpis = kpis                # callable -> the page's KPI values, or None without KPIs
+        self.tables = tables            # {cache name: callable -> table}
+        self.sections = sections        # {section: callable -> (table, chart)}, in page order
+        self.missing = missing          # {section: reason}
+        self.approximate = approximate  # revenue KPIs and sampled sections are (value, CI) estimates
+
+
+def _is_date(value):
+    if not isinstance(value, str):
+        return False
+    try:
+        return not pd.isna(pd.Timestamp(value))
+    except ValueError:
+        return False
+
+
+def check_filters(page, filters):
+    """Raise ValueError naming the offending key unless `filters` is a filter dict of `page`.
+
+    For filter dicts from outside the pages (export URLs, report presets); the
+    views themselves trust their input.
+    """
+    if not isinstance(filters, dict):
+        raise ValueError(f"{page} filters must be an object, not {type(filters).__name__}")
+    schema = FILTERS[page]
+    for key, value in filters.items():
+        kind = schema.get(key)
+        if kind is None:
+            raise ValueError(f"unknown {page} filter {key!r} (expected one of: {', '.join(schema)})")
+        if kind == 'labels':
+            valid = value is None or isinstance(value, list) and all(
+                isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in value)
+            expected = "a list of values"
+        elif kind == 'dates':
+            valid = value is None or isinstance(value, list) and len(value) == 2 and all(map(_is_date, value))
+            expected = "[first, last] as ISO dates"
+        elif kind == 'window':
+            valid = isinstance(value, int) and not isinstance(value, bool) and value >= 1
+            expected = "a positive whole number"
+        else:
+            valid = value in kind
+            expected = "one of: " + ', '.join(kind)
+        if not valid:
+            raise ValueError(f"{page} filter {key!r} must be {expected}, got {json.dumps(value, default=str)}")
+
+
+@functools.lru_cache(maxsize=None)
+def backend(name=None):
+    """The process's query backend `name` (default: DASHBOARD_QUERY_BACKEND), built once.
+
+    The pages, warm-up, export and the report workers all ask for it here, so
+    every session and request shares one instance: its connections and
+    in-memory cubes, accumulators and bitmaps.
+    """
+    return backends.get_backend(name)
+
+
+def _cached(version, page_filters, profiler):
+    cache = fcache.shared_cache()
+
+    def cached(name, compute, filters=None, stage='aggregate', label=None):
+        key = fcache.make_key(version, name, page_filters if filters is None else filters)
+        if profiler is None:
+            return cache.get_or_compute(key, compute)
+        return profiler.cached(cache, key, label or name, compute, stage)
+    return cached
+
+
+def _timed(profiler, name, stage):
+    return contextlib.nullcontext() if profiler is None else profiler.section(name, stage)
+
+
+def _sections(cached):
+    tables, sections = {}, {}
+
+    def add(name, compute, filters=None, figure=None, figure_filters=None, charted=None, **kwargs):
+        # Aggregated table plus its chart; both are reused while the selection is unchanged.
+        def table():
+            return cached(name, compute, filters)
+
+        def section():
+            result = table()
+            chart_table = result if charted is None else charted(result)
+            return result, cached('figure.' + name, lambda: figures.build(figure or name, chart_table, **kwargs),
+                                  filters if figure_filters is None else figure_filters, stage='figure', label=name)
+
+        tables[name] = table
+        sections[name] = section
+    return tables, sections, add
+
+
+def _option(options, key, load):
+    return options[key] if key in options else load()
+
+
+@functools.lru_cache(maxsize=2)
+def _sample(path, version):
+    # Bounded stratified sample of orders for approximate mode; persisted per data
+    # version and kept up to date by analytics.incremental appends.
+    return incremental.load_revenue_sample(path)
+
+
+def revenue_view(path, filters, backend, profiler=None, options=None):
+    """The Revenue Analysis page for a revenue filter dict.
+
+    Keys: Platform, Order Date ([first, last]), Granularity, Window, Mode
+    ('approximate'). `options` ({'Platform': [...], 'Order Date': (first, last)})
+    passes what the caller already loaded for its widgets; `profiler` records
+    every step (analytics.profiling).
+    """
+    options = options or {}
+    version = ingest.data_version(path)
+    columns = set(backends.csv_columns(path))
+    platforms = filters.get('Platform')
+    if platforms is None:
+        platforms = _option(options, 'Platform', lambda: backend.revenue_platforms(path, version)
+                            if 'Platform' in columns else [])
+
+    page_filters = {'Platform': platforms}
+    date_range = (None, None)
+    if filters.get('Order Date') and 'Order Date' in columns:
+        bounds = _option(options, 'Order Date', lambda: backend.revenue_dates(path, version))
+        picked = tuple(pd.Timestamp(day).date() for day in filters['Order Date'])
+        if bounds is not None and picked != tuple(day.date() for day in bounds):
+            page_filters['Order Date'] = [str(day) for day in picked]
+            date_range = picked
+    approximate = filters.get('Mode') == 'approximate' and sampling.REQUIRED.issubset(columns)
+    approx_filters = dict(page_filters, Mode='approximate')
+    cached = _cached(version, page_filters, profiler)
+
+    # The selection is pushed down to the backend, which returns the matching
+    # (Platform, Product Category, day) groups already aggregated.
+    view = cached('cube', lambda: backend.revenue_cube(path, version, platforms, *date_range), stage='filter')
+    if approximate:
+        with _timed(profiler, 'sample', 'load'):
+            sample = _sample(path, version)
+
+        def kpis():
+            return cached('kpis', lambda: sampling.kpis(sample, platforms, *date_range), approx_filters)
+    else:
+        def kpis():
+            return cached('kpis', lambda: revenue.kpis(view, columns))
+
+    tables, sections, add = _sections(cached)
+    missing = {}
+    for name, compute in revenue.SECTIONS.items():
+        if not revenue.REQUIREMENTS[name].issubset(columns):
+            missing[name] = 'columns'
+        elif approximate and name in sampling.SECTIONS:
+            add(name, lambda name=name: sampling.SECTIONS[name](sample, platforms, *date_range), approx_filters)
+        else:
+            add(name, lambda compute=compute: compute(view),
+                charted=(lambda table: table[0]) if name == 'category_counts' else None)
+
+    full_filters = dict(page_filters)
+    if revenue.REQUIREMENTS['trend'].issubset(columns):
+        granularity = filters.get('Granularity', revenue.DEFAULT_GRANULARITY)
+        window = int(filters.get('Window', revenue.DEFAULT_WINDOWS[granularity]))
+        full_filters.update(Granularity=granularity, Window=window)
+        add('trend', lambda: revenue.trend(view, granularity, window),
+            dict(page_filters, Granularity=granularity, Window=window), window=window)
+    else:
+        missing['trend'] = 'columns'
+    if approximate:
+        full_filters['Mode'] = 'approximate'
+    return PageView('revenue', full_filters, view, kpis, tables, sections, missing, approximate)
+
+
+def reviews_view(path, filters, backend, profiler=None, options=None):
+    """The Review Analysis page for a reviews filter dict.
+
+    Keys: Platform, Location, the review attributes (bitmaps.DRILL_DOWN),
+    Drill-down, Metric. `options` ({filter key: values}) passes what the
+    caller already loaded for its widgets; `profiler` records every step.
+    """
+    options = options or {}
+    version = ingest.data_version(path)
+    platforms = filters.get('Platform')
+    if platforms is None:
+        platforms = _option(options, 'Platform', lambda: backend.review_options(path, version, 'Agent Name'))
+    locations = filters.get('Location')
+    if locations is None:
+        locations = _option(options, 'Location', lambda: backend.review_options(path, version, 'Location'))
+    drill_columns = [c for c in bitmaps.DRILL_DOWN if c in backends.csv_columns(path)]
+    drill_options = {c: _option(options, c, lambda c=c: backend.review_options(path, version, c))
+                     for c in drill_columns}
+    # Only attributes that leave values out filter anything (and enter the cache keys)
+    extra = bitmaps.restricting({c: filters.get(c, drill_options[c]) for c in drill_columns}, drill_options)
+    page_filters = {'Platform': platforms, 'Location': locations, **extra}
+    cached = _cached(version, page_filters, profiler)
+
+    stats_view = cached('filtered', lambda: backend.review_stats(path, version, platforms, locations, extra or None),
+                        stage='filter')
+
+    kpis = None
+    if len(platforms) == 1:
+        agent = platforms[0]
+
+        def kpis():
+            # Key metrics ignore the location filter, so they are cached per agent only
+            return cached('agent_metrics', lambda: reviews.agent_metrics(
+                backend.review_stats(path, version, [agent], extra=extra or None), agent), {'Platform': [agent], **extra})
+
+    tables, sections, add = _sections(cached)
+    add('avg_delivery', lambda: reviews.avg_delivery(stats_view))
+    # Percentiles come from per-(agent, location) delivery-time sketches merged for the selection
+    add('delivery_distribution', lambda: reviews.delivery_distribution(
+        cached('sketch', lambda: backend.review_sketch(path, version, platforms, locations, extra or None),
+               stage='filter')), charted=lambda table: table[0])
+    add('most_used_platform', lambda: reviews.most_used_platform(stats_view))
+    if len(locations) == 1:
+        add('platform_counts', lambda: reviews.platform_shares(stats_view, locations[0]),
+            figure='platform_shares', location=locations[0])
+    add('avg_feedback', lambda: reviews.avg_feedback(stats_view))
+    add('order_product', lambda: reviews.order_product(stats_view))
+
+    full_filters = dict(page_filters)
+    if drill_columns:
+        drill_column = filters.get('Drill-down', drill_columns[0])
+        drill_metric = filters.get('Metric', next(iter(reviews.DRILL_DOWN_METRICS)))
+        full_filters.update({'Drill-down': drill_column, 'Metric': drill_metric})
+        # The table depends on the attribute only; the chart also on the metric shown
+        drill_filters = {**page_filters, 'Drill-down': drill_column}
+        add('breakdown', lambda: reviews.breakdown(backend.review_breakdown(
+            path, version, drill_column, platforms, locations, extra or None), drill_column), drill_filters,
+            figure_filters={**drill_filters, 'Metric': drill_metric}, column=drill_column, metric=drill_metric)
+
+    # Usage shows the most used platform per location, or every platform's share in a single location
+    usage = 'most_used_platform' if len(locations) > 1 else 'platform_counts'
+    page_sections, missing = {}, {}
+    for name in SECTIONS['reviews']:
+        if name == 'breakdown' and not drill_columns:
+            continue
+        if stats_view.empty:
+            missing[name] = 'empty'
+        elif name == 'usage' and len(platforms) < 2:
+            missing[name] = 'platforms'
+        else:
+            page_sections[name] = sections[usage if name == 'usage' else name]
+    return PageView('reviews', full_filters, stats_view, kpis, tables, page_sections, missing)
+
+
+VIEWS = {'revenue': revenue_view, 'reviews': reviews_view}
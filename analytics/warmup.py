@@ -0,0 +1,226 @@
+# analytics/warmup.py
+# Server-boot warm-up: load, aggregate and cache both datasets before the first
+# visitor asks for them.
+#
+# start() runs warm_up() once per process on a background thread. It imports
+# the heavy libraries, builds (or opens) every persisted artifact the pages read
+# -- Arrow caches, review stats and sketch, revenue cube, month partitions,
+# order sample, SQL database -- and then computes each page's default view (all platforms /
+# locations selected) into the shared filter cache under the exact keys the
+# pages use, so a first visit is served from the cache like any later one.
+#
+# The datasets are the current snapshots of the configured sources
+# (analytics.sources). Once warm, start() also watches those sources: a new
+# version gets the same preparation in the background before it is swapped in.
+# The pages call watch() themselves, so a page opened without the landing page
+# (or app.py) still picks up new data.
+#
+# This module only imports the standard library at top level: the landing
+# page and the ASGI launcher (app.py) import it to start the warm-up and show
+# readiness without paying for pandas or plotly themselves.
+#
+#   python -m analytics.warmup          # prebuild the on-disk caches, e.g. in a deploy step
+import argparse
+import json
+import sys
+import threading
+import time
+
+from analytics import sources
+
+_lock = threading.Lock()
+_thread = None
+_status = {'state': 'idle', 'seconds': None, 'steps': [], 'error': None}
+_recording = threading.local()  # steps are reported by warm_up(), not by background refreshes
+
+
+def status():
+    """Snapshot of the warm-up: state is idle, warming, ready or failed."""
+    with _lock:
+        return dict(_status, steps=list(_status['steps']))
+
+
+def is_ready():
+    return status()['state'] == 'ready'
+
+
+def _step(name, fn):
+    start = time.perf_counter()
+    result = fn()
+    if getattr(_recording, 'active', False):
+        with _lock:
+            _status['steps'].append({'step': name, 'seconds': round(time.perf_counter() - start, 3)})
+    return result
+
+
+# -------------------------
+# Steps
+# -------------------------
+def _import_libraries():
+    import pandas  # noqa: F401
+    import plotly.express as px
+    import plotly.io as pio
+
+    # The first figure build and JSON export load plotly's validators
+    pio.to_json(px.bar(x=[0], y=[0]), validate=False)
+
+
+def _warm_revenue(backend, path):
+    from analytics import backends, incremental, ingest, parallel, sampling, views
+
+    version = ingest.data_version(path)
+    columns = set(backends.csv_columns(path))
+    platforms = _step('revenue.load', lambda: backend.revenue_platforms(path, version)
+                      if 'Platform' in columns else [])
+    dates = backend.revenue_dates(path, version) if 'Order Date' in columns else None
+    if dates is not None and backend.name == 'pandas':
+        # Builds the month partitions the date-range filter reads from
+        _step('revenue.partitions', lambda: incremental.load_revenue_range(path, dates[0], dates[0]))
+    if sampling.REQUIRED.issubset(columns):
+        _step('revenue.sample', lambda: incremental.load_revenue_sample(path))
+
+    def default_view():
+        # The page's default selection, computed by the page's own code
+        view = views.revenue_view(path, {}, backend, options={'Platform': platforms, 'Order Date': dates})
+        view.kpis()
+        for _ in parallel.run_sections(view.sections):
+            pass
+
+    _step('revenue.default_view', default_view)
+
+
+def _warm_reviews(backend, path):
+    from analytics import backends, bitmaps, ingest, parallel, views
+
+    version = ingest.data_version(path)
+    agents = _step('reviews.load', lambda: backend.review_options(path, version, 'Agent Name'))
+    locations = backend.review_options(path, version, 'Location')
+    # Per-value bitmaps behind the page's drill-down filters, built with the rows
+    drill_columns = [c for c in bitmaps.DRILL_DOWN if c in backends.csv_columns(path)]
+    drill_options = _step('reviews.bitmaps', lambda: {c: backend.review_options(path, version, c)
+                                                      for c in drill_columns})
+
+    def default_view():
+        # The page's default selection, computed by the page's own code
+        view = views.reviews_view(path, {}, backend,
+                                  options={'Platform': agents, 'Location': locations, **drill_options})
+        if view.kpis is not None:
+            view.kpis()
+        for _ in parallel.run_sections(view.sections):
+            pass
+
+    _step('reviews.default_view', default_view)
+
+
+def _warm_combined(backend, revenue_path, reviews_path):
+    from analytics import combined, figures, ingest
+    from analytics import cache as fcache
+
+    version = (ingest.data_version(revenue_path), ingest.data_version(reviews_path))
+    cache = fcache.shared_cache()
+
+    def cached(name, compute, section_filters):
+        return cache.get_or_compute(fcache.make_key(version, name, section_filters), compute)
+
+    def default_view():
+        # Same keys as pages/5_Combined_Analysis.py with its default selection
+        index = cached('key_index', lambda: combined.build_index(
+            backend.revenue_cube(revenue_path, version[0]), backend.review_stats(reviews_path, version[1])), {})
+        platforms, locations = index.platforms['Platform'].tolist(), index.locations['Location'].tolist()
+        filters = {'Platform': platforms, 'Location': locations}
+        joined = cached('joined', lambda: combined.join(index, platforms, locations), filters)
+        summary = cached('platform_comparison', lambda: combined.platform_summary(index, platforms, locations),
+                         filters)
+        for name, table in (('platform_comparison', summary), ('location_metrics', joined)):
+            cached(name, lambda: table, filters)
+            cached('figure.' + name, lambda: figures.build(name, table), filters)
+        cached('correlations', lambda: combined.correlations(joined), filters)
+
+    _step('combined.default_view', default_view)
+
+
+def warm_up(revenue_path=None, reviews_path=None, backend=None):
+    """Run every warm-up step now, on this thread. Returns status().
+
+    Paths default to the current snapshots of the configured sources.
+    """
+    with _lock:
+        _status.update(state='warming', seconds=None, steps=[], error=None)
+    _recording.active = True
+    start = time.perf_counter()
+    try:
+        _step('imports', _import_libraries)
+        from analytics import views
+
+        backend = backend or views.backend()
+        paths = {'revenue': revenue_path, 'reviews': reviews_path}
+        for warm, datasets in ((_warm_revenue, ('revenue',)), (_warm_reviews, ('reviews',)),
+                               (_warm_combined, ('revenue', 'reviews'))):
+            try:
+                warm(backend, *(paths[d] or sources.path(d) for d in datasets))
+            except FileNotFoundError as exc:
+                # A missing dataset is reported by its page; nothing to warm.
+                with _lock:
+                    _status['steps'].append({'step': warm.__name__[len('_warm_'):],
+                                             'skipped': f"{exc.filename or datasets[0]} not found"})
+    except Exception as exc:
+        outcome = {'state': 'failed', 'error': f"{type(exc).__name__}: {exc}"}
+    else:
+        outcome = {'state': 'ready'}
+    finally:
+        _recording.active = False
+    with _lock:
+        _status.update(outcome, seconds=round(time.perf_counter() - start, 3))
+    return status()
+
+
+def prepare(dataset, path, backend=None):
+    """Build the caches and default view of a new snapshot (sources.refresh hook)."""
+    from analytics import views
+
+    warm = _warm_revenue if dataset == 'revenue' else _warm_reviews
+    warm(backend or views.backend(), path)
+
+
+def watch():
+    """Poll the sources (once per process), preparing each new snapshot before it is swapped in."""
+    sources.watch(prepare)
+
+
+def _warm_and_watch(revenue_path, reviews_path):
+    warm_up(revenue_path, reviews_path)
+    watch()
+
+
+def start(revenue_path=None, reviews_path=None):
+    """Start warm_up() on a background thread, once per process, then watch the sources. Returns status()."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warm_and_watch, args=(revenue_path, reviews_path),
+                                       name="dashboard-warmup", daemon=True)
+            _status['state'] = 'warming'
+            _thread.start()
+    return status()
+
+
+def wait(timeout=None):
+    """Block until a started warm-up has finished (or `timeout` seconds passed)."""
+    thread = _thread
+    if thread is not None:
+        thread.join(timeout)
+    return status()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the dashboard's data caches ahead of the first visit.")
+    parser.add_argument('--revenue', help="Revenue CSV (default: the configured source)")
+    parser.add_argument('--reviews', help="Reviews CSV (default: the configured source)")
+    args = parser.parse_args(argv)
+    result = warm_up(args.revenue, args.reviews)
+    print(json.dumps(result, indent=2))
+    return 0 if result['state'] == 'ready' else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
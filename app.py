@@ -0,0 +1,31 @@
+# app.py
+# Server entry point with boot-time warm-up:
+#
+#   streamlit run app.py
+#
+# Serves the same dashboard as `streamlit run Home.py`, but starts warming the
+# data caches (analytics.warmup) as soon as the server starts instead of on the
+# first visit, and adds a readiness probe: GET /ready answers 503 while warming
+# and 200 once every page's default view is cached. It also serves the pages'
+# streaming CSV/Parquet exports under /export/ (analytics.export).
+from contextlib import asynccontextmanager
+
+import streamlit as st
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from analytics import export, warmup
+
+
+@asynccontextmanager
+async def lifespan(app):
+    warmup.start()
+    yield
+
+
+async def ready(request):
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status['state'] == 'ready' else 503)
+
+
+app = st.App("Home.py", lifespan=lifespan, routes=[Route("/ready", ready), *export.routes()])
@@ -0,0 +1,3 @@
+# benchmarks/__init__.py
+# Synthetic-data benchmarks for the dashboard pages (see benchmarks/run.py) and
+# golden-output checks of the optimized paths (see benchmarks/golden.py).
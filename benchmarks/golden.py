@@ -0,0 +1,447 @@
+# benchmarks/golden.py
+# Golden-output checks: every optimized path must give the reference numbers.
+#
+#   python -m benchmarks.golden                      # check against benchmarks/goldens/
+#   python -m benchmarks.golden --update             # record new goldens after an intended change
+#   python -m benchmarks.golden --engines pandas,sqlite --datasets sales,synthetic --no-timing
+#
+# The reference is the dashboard's original computation: pandas straight over
+# the raw CSV rows, as the pages did before the cube, accumulators, bitmaps and
+# query backends. For every dataset (a seeded synthetic pair from
+# benchmarks.synthetic; with --datasets sales also the local Sales/Revenue.csv +
+# Sales/Reviews.csv, which are not in the repository, so their golden file is
+# recorded locally and skipped when the files are missing) and every filter
+# case, each engine is compared with the reference:
+#
+#   total revenue, AOV, orders       relative 1e-9, orders exact; approximate
+#                                    mode within twice its 95% half-width
+#   top / bottom category %          0.01 points (the tables round to 2
+#                                    decimals); any tied category is accepted
+#   feedback heatmap means           1e-9 per (location, platform)
+#   most used platform per location  the reference's top count; ties go to
+#                                    any tied platform
+#
+# and the reference itself is compared with the golden file, so a change of
+# the data or of the reference code shows up too. Every engine is also timed
+# over all cases of a dataset (best of --repeat warm runs), and so is the
+# reference in the same run. Timings are only compared as ratios to that
+# reference, never as wall times, so they carry over between machines: an
+# engine taking more than --time-slack times its golden ratio times this run's
+# reference (plus TIME_FLOOR for timer noise) fails.
+#
+# Engines: the pandas, sqlite and duckdb query backends (those installed; with
+# --require-engines a missing one fails the run, as in CI), the data service
+# over HTTP, and approximate mode (revenue KPIs only).
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import pandas as pd
+
+from analytics import backends, bitmaps, incremental, ingest, revenue, reviews, sampling, service
+from benchmarks import synthetic
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'goldens')
+DEFAULT_WORKDIR = os.path.join(REPO_ROOT, '.bench', 'golden')
+SALES = {'revenue': os.path.join(REPO_ROOT, 'Sales', 'Revenue.csv'),
+         'reviews': os.path.join(REPO_ROOT, 'Sales', 'Reviews.csv')}
+
+ENGINES = ['pandas', 'sqlite', 'duckdb', 'service', 'approximate']
+DEFAULT_SYNTHETIC_SIZE = '20k'
+
+REL_TOL = 1e-9
+PCT_TOL = 0.01
+MEAN_TOL = 1e-9
+CI_FACTOR = 2.0
+TIME_SLACK = 3.0
+TIME_FLOOR = 0.05  # seconds
+
+
+# -------------------------
+# Reference: the original page computations over raw rows
+# -------------------------
+def load_revenue_rows(path):
+    df = pd.read_csv(path)
+    df['Order Value (INR)'] = pd.to_numeric(df['Order Value (INR)'], errors='coerce').fillna(0)
+    df['Order ID'] = df['Order ID'].astype(str)
+    df['Order Date'] = pd.to_datetime(df['Order Date'], errors='coerce')
+    return df
+
+
+def load_review_rows(path):
+    df = pd.read_csv(path)
+    for col in ('Customer Service Rating', 'Delivery Time (min)', 'Order Accuracy', 'Product Availability'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+def revenue_cases(df):
+    """Filter cases as revenue page filter dicts: all platforms, one platform, two platforms over a date range."""
+    platforms = sorted(df['Platform'].dropna().unique())
+    days = df['Order Date'].dropna().dt.floor('D')
+    middle = (days.min() + (days.max() - days.min()) / 2).floor('D')
+    return {
+        'all': {'Platform': platforms},
+        'one platform': {'Platform': platforms[:1]},
+        'date range': {'Platform': platforms[:2], 'Order Date': [str(days.min().date()), str(middle.date())]},
+    }
+
+
+def review_cases(df):
+    """Filter cases as review page filter dicts, including a drill-down selection."""
+    platforms = sorted(df['Agent Name'].dropna().unique())
+    locations = sorted(df['Location'].dropna().unique())
+    return {
+        'all': {'Platform': platforms, 'Location': locations},
+        'subset': {'Platform': platforms[:2], 'Location': locations[::2]},
+        'drill-down': {'Platform': platforms, 'Location': locations,
+                       'Order Type': sorted(df['Order Type'].dropna().unique())[:1], 'Discount Applied': ['Yes']},
+    }
+
+
+def _flag_label(values):
+    return values.map(lambda v: 'Yes' if str(v).strip().lower() in ('yes', 'true', '1', '1.0') else 'No')
+
+
+def reference_revenue(df, case):
+    rows = df[df['Platform'].isin(case['Platform'])]
+    if 'Order Date' in case:
+        start, end = (pd.Timestamp(day) for day in case['Order Date'])
+        days = rows['Order Date'].dt.floor('D')
+        rows = rows[(days >= start) & (days <= end)]
+    cat_count = rows.groupby(['Platform', 'Product Category'])['Order ID'].count().reset_index(name='Orders')
+    cat_count['Percentage'] = (cat_count['Orders'] / cat_count.groupby('Platform')['Orders'].transform('sum')
+                               * 100).round(2)
+    return {
+        'kpis': {'Total Revenue': float(rows['Order Value (INR)'].sum()),
+                 'Average Order Value': float(rows['Order Value (INR)'].mean()),
+                 'Total Orders': int(rows['Order ID'].count())},
+        'category_pct': {platform: dict(zip(group['Product Category'], group['Percentage'].astype(float)))
+                         for platform, group in cat_count.groupby('Platform')},
+    }
+
+
+def reference_reviews(df, case):
+    rows = df[df['Agent Name'].isin(case['Platform']) & df['Location'].isin(case['Location'])]
+    for column, values in case.items():
+        if column in bitmaps.DRILL_DOWN:
+            labels = _flag_label(rows[column]) if column == 'Discount Applied' else rows[column]
+            rows = rows[labels.isin(values)]
+    feedback = rows.groupby(['Location', 'Agent Name'])['Customer Service Rating'].mean()
+    usage = rows.groupby(['Location', 'Agent Name']).size()
+    return {
+        'rows': len(rows),
+        'feedback': {f"{loc} | {agent}": float(v) for (loc, agent), v in feedback.items()},
+        'usage': {loc: {agent: int(n) for (_, agent), n in group.items()}
+                  for loc, group in usage.groupby(level='Location')},
+    }
+
+
+# -------------------------
+# Engines: the dashboard's own code paths
+# -------------------------
+def _dates(case):
+    if 'Order Date' not in case:
+        return None, None
+    return tuple(pd.Timestamp(day).date() for day in case['Order Date'])
+
+
+def engine_revenue(engine, backend, path, case):
+    version = ingest.data_version(path)
+    if engine == 'approximate':
+        (total, total_ci), (aov, aov_ci), (orders, orders_ci) = sampling.kpis(
+            incremental.load_revenue_sample(path), case['Platform'], *_dates(case))
+        return {'kpis': {'Total Revenue': total, 'Average Order Value': aov, 'Total Orders': orders},
+                'ci': {'Total Revenue': total_ci, 'Average Order Value': aov_ci, 'Total Orders': orders_ci}}
+    view = backend.revenue_cube(path, version, case['Platform'], *_dates(case))
+    total, aov, orders = revenue.kpis(view, set(backends.csv_columns(path)))
+    most_least = revenue.category_counts(view)[1]
+    return {'kpis': {'Total Revenue': total, 'Average Order Value': aov, 'Total Orders': orders},
+            'most_least': {row['Platform']: row for row in most_least.to_dict('records')}}
+
+
+def engine_reviews(engine, backend, path, case):
+    version = ingest.data_version(path)
+    extra = {column: values for column, values in case.items() if column in bitmaps.DRILL_DOWN}
+    view = backend.review_stats(path, version, case['Platform'], case['Location'], extra or None)
+    feedback = reviews.avg_feedback(view)
+    most_used = reviews.most_used_platform(view) if len(view) else pd.DataFrame(
+        columns=['Location', 'Most Used Platform', 'Count'])
+    return {
+        'rows': int(view['count'].sum()),
+        'feedback': {f"{row['Location']} | {row['Agent Name']}": row['Customer Service Rating']
+                     for row in feedback.to_dict('records')},
+        'most_used': {row['Location']: (row['Most Used Platform'], int(row['Count']))
+                      for row in most_used.to_dict('records')},
+    }
+
+
+# -------------------------
+# Comparisons (each returns a list of failure messages)
+# -------------------------
+def _close(a, b, rel=0.0, abs_=0.0):
+    if a is None or b is None or (isinstance(a, float) and math.isnan(a)) or (isinstance(b, float) and math.isnan(b)):
+        return (a is None or a != a) and (b is None or b != b)
+    return math.isclose(float(a), float(b), rel_tol=rel, abs_tol=abs_)
+
+
+def compare_kpis(expected, actual, ci=None):
+    failures = []
+    for name, value in expected.items():
+        if ci is not None:
+            ok = _close(actual[name], value, REL_TOL, CI_FACTOR * ci[name])
+        elif name == 'Total Orders':
+            ok = int(actual[name]) == value
+        else:
+            ok = _close(actual[name], value, REL_TOL)
+        if not ok:
+            bound = f" (± {CI_FACTOR * ci[name]:.6g})" if ci is not None else ''
+            failures.append(f"{name}: {actual[name]!r} != {value!r}{bound}")
+    return failures
+
+
+def compare_categories(expected, actual):
+    failures = []
+    if set(actual) != set(expected):
+        return [f"platforms {sorted(actual)} != {sorted(expected)}"]
+    for platform, percentages in expected.items():
+        row = actual[platform]
+        for side, pick in (('Top', max), ('Bottom', min)):
+            want = pick(percentages.values())
+            got, category = row[f'{side} %'], row[f'{side} Category']
+            if not _close(got, want, abs_=PCT_TOL):
+                failures.append(f"{platform} {side} %: {got!r} != {want!r}")
+            elif not _close(percentages.get(category, math.nan), want, abs_=PCT_TOL):
+                failures.append(f"{platform} {side} Category: {category!r} is not at {want!r}%")
+    return failures
+
+
+def compare_feedback(expected, actual):
+    if set(actual) != set(expected):
+        return [f"pairs differ: missing {sorted(set(expected) - set(actual))[:5]}, "
+                f"extra {sorted(set(actual) - set(expected))[:5]}"]
+    return [f"{pair}: {actual[pair]!r} != {value!r}" for pair, value in expected.items()
+            if not _close(actual[pair], value, abs_=MEAN_TOL)]
+
+
+def compare_usage(expected, actual):
+    if set(actual) != set(expected):
+        return [f"locations {sorted(actual)} != {sorted(expected)}"]
+    failures = []
+    for location, counts in expected.items():
+        platform, count = actual[location]
+        top = max(counts.values())
+        if count != top or counts.get(platform) != top:
+            tied = sorted(p for p, n in counts.items() if n == top)
+            failures.append(f"{location}: {platform} ({count}) is not among {tied} ({top})")
+    return failures
+
+
+def compare_revenue(expected, actual):
+    """Engine (or golden) revenue results against the reference."""
+    if 'ci' in actual:
+        return compare_kpis(expected['kpis'], actual['kpis'], actual['ci'])
+    failures = compare_kpis(expected['kpis'], actual['kpis'])
+    if 'most_least' in actual:
+        failures += compare_categories(expected['category_pct'], actual['most_least'])
+    else:
+        failures += [f"category % {msg}" for msg in _compare_pct(expected['category_pct'], actual['category_pct'])]
+    return failures
+
+
+def _compare_pct(expected, actual):
+    if set(actual) != set(expected):
+        return [f"platforms {sorted(actual)} != {sorted(expected)}"]
+    return [f"{p} / {c}: {actual[p].get(c)!r} != {v!r}" for p, cats in expected.items() for c, v in cats.items()
+            if not _close(actual[p].get(c, math.nan), v, abs_=PCT_TOL) or set(actual[p]) != set(cats)]
+
+
+def compare_reviews(expected, actual):
+    """Engine (or golden) review results against the reference."""
+    failures = [] if actual['rows'] == expected['rows'] else [f"rows: {actual['rows']} != {expected['rows']}"]
+    failures += [f"feedback {msg}" for msg in compare_feedback(expected['feedback'], actual['feedback'])]
+    if 'most_used' in actual:
+        failures += [f"most used {msg}" for msg in compare_usage(expected['usage'], actual['most_used'])]
+    elif actual['usage'] != expected['usage']:
+        failures.append("usage counts differ")
+    return failures
+
+
+# -------------------------
+# Runner
+# -------------------------
+def _timed(fn, repeat):
+    """Result of fn() and the best wall time of `repeat` runs after a warm-up run."""
+    result = fn()
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def available_engines(names):
+    """(engines that can run, engines whose package is not installed)."""
+    found, missing = [], []
+    for name in names:
+        available = getattr(backends.BACKENDS.get(name), 'available', None)
+        (missing if available is not None and not available() else found).append(name)
+    return found, missing
+
+
+def _backend(engine, server):
+    if engine == 'approximate':
+        return None
+    if engine == 'service':
+        return backends.ServiceBackend(f"http://{service.DEFAULT_HOST}:{server.server_port}")
+    return backends.get_backend(engine)
+
+
+def check_dataset(name, paths, engines, golden, repeat, server):
+    """Reference, golden and engine results of one dataset. Returns (failures, record for the golden file)."""
+    failures = []
+    revenue_rows, review_rows = load_revenue_rows(paths['revenue']), load_review_rows(paths['reviews'])
+    cases = {'revenue': revenue_cases(revenue_rows), 'reviews': review_cases(review_rows)}
+    compute = {'revenue': (reference_revenue, revenue_rows, engine_revenue, compare_revenue),
+               'reviews': (reference_reviews, review_rows, engine_reviews, compare_reviews)}
+    versions = {dataset: ingest.data_version(path) for dataset, path in paths.items()}
+    record = {'data_versions': versions, 'cases': cases, 'revenue': {}, 'reviews': {}, 'seconds': {}, 'ratios': {}}
+
+    for dataset, (reference, rows, engine_fn, compare) in compute.items():
+        expected, seconds = _timed(lambda: {case: reference(rows, filters)
+                                            for case, filters in cases[dataset].items()}, repeat)
+        record[dataset] = expected
+        record['seconds'].setdefault('reference', {})[dataset] = seconds
+        if golden is not None:
+            if golden['data_versions'].get(dataset) != versions[dataset]:
+                failures.append(f"{name} {dataset} golden: recorded for another version of {paths[dataset]} "
+                                "(run with --update if the data changed on purpose)")
+            else:
+                for case, want in golden[dataset].items():
+                    for msg in compare(want, expected[case]):
+                        failures.append(f"{name} {dataset} reference vs golden [{case}] {msg}")
+        for engine in engines:
+            if engine == 'approximate' and dataset != 'revenue':
+                continue
+            backend = _backend(engine, server)
+            actual, seconds = _timed(lambda: {case: engine_fn(engine, backend, paths[dataset], filters)
+                                              for case, filters in cases[dataset].items()}, repeat)
+            record['seconds'].setdefault(engine, {})[dataset] = seconds
+            record['ratios'].setdefault(engine, {})[dataset] = seconds / record['seconds']['reference'][dataset]
+            found = [f"{name} {dataset} {engine} [{case}] {msg}"
+                     for case in cases[dataset] for msg in compare(expected[case], actual[case])]
+            print(f"{'FAIL' if found else 'ok  '}  {name} {dataset} {engine}: {len(cases[dataset])} cases, "
+                  f"{seconds * 1000:.1f} ms")
+            failures += found
+    return failures, record
+
+
+def check_timings(name, record, golden, slack):
+    """Engine times against `slack` x their golden ratio x the reference time of this run."""
+    failures = []
+    for engine, by_dataset in record['ratios'].items():
+        for dataset, ratio in by_dataset.items():
+            recorded = (golden or {}).get('ratios', {}).get(engine, {}).get(dataset)
+            reference = record['seconds']['reference'][dataset]
+            if recorded is not None and record['seconds'][engine][dataset] > slack * recorded * reference + TIME_FLOOR:
+                failures.append(f"{name} {dataset} {engine} timing: {ratio:.2f} x reference > {slack:g} x "
+                                f"golden {recorded:.2f} x reference (reference {reference:.3f}s, "
+                                f"+ {TIME_FLOOR:g}s)")
+    return failures
+
+
+def _golden_path(name):
+    return os.path.join(GOLDEN_DIR, f"{name}.json")
+
+
+def read_golden(name):
+    try:
+        with open(_golden_path(name), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_golden(name, record):
+    # Wall times depend on the machine; only their ratios to the reference are kept
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    with open(_golden_path(name), 'w', encoding='utf-8') as f:
+        json.dump({k: v for k, v in record.items() if k != 'seconds'}, f, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+def datasets(names, size, seed, workdir):
+    found = {}
+    if 'sales' in names:
+        missing = [path for path in SALES.values() if not os.path.exists(path)]
+        if missing:
+            print(f"skip  sales: {', '.join(missing)} not found")
+        else:
+            found['sales'] = SALES
+    if 'synthetic' in names:
+        paths = synthetic.make_dataset(os.path.join(workdir, f"{size}-seed{seed}"), synthetic.parse_size(size), seed)
+        found[f"synthetic-{size}-seed{seed}"] = {'revenue': paths['Revenue.csv'], 'reviews': paths['Reviews.csv']}
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every engine against the reference and golden outputs.")
+    parser.add_argument('--engines', default=','.join(ENGINES), help="comma-separated, from " + ', '.join(ENGINES))
+    parser.add_argument('--datasets', default='synthetic',
+                        help="comma-separated: synthetic, sales (the local Sales/ CSVs, skipped if missing)")
+    parser.add_argument('--size', default=DEFAULT_SYNTHETIC_SIZE, help="synthetic rows per file, e.g. 20k")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR, help="where synthetic datasets are kept")
+    parser.add_argument('--repeat', type=int, default=3, help="timed warm runs per engine (best is kept)")
+    parser.add_argument('--time-slack', type=float, default=TIME_SLACK, help="allowed slowdown vs the golden ratios to the reference")
+    parser.add_argument('--no-timing', action='store_true', help="skip the timing assertions")
+    parser.add_argument('--require-engines', action='store_true',
+                        help="fail instead of skipping engines that are not installed")
+    parser.add_argument('--update', action='store_true', help="record the reference results and times as goldens")
+    parser.add_argument('--out', help="also write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    engines, missing = available_engines([e.strip() for e in args.engines.split(',') if e.strip()])
+    unknown = sorted(set(engines) - set(ENGINES))
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)}")
+    failures, records = [], {}
+    for name in missing:
+        if args.require_engines:
+            failures.append(f"{name}: not installed")
+        else:
+            print(f"skip  {name}: not installed")
+    for name, paths in datasets(args.datasets.split(','), args.size, args.seed, args.workdir).items():
+        golden = None if args.update else read_golden(name)
+        if golden is None and not args.update:
+            failures.append(f"{name}: no golden file at {_golden_path(name)} (record one with --update)")
+        # The service serves datasets by name: one per dataset, pinned to its files
+        server = service.serve_in_thread(backends.PandasBackend(), paths=paths) if 'service' in engines else None
+        try:
+            found, records[name] = check_dataset(name, paths, engines, golden, args.repeat, server)
+        finally:
+            if server is not None:
+                server.shutdown()
+        if not args.no_timing and not args.update:
+            found += check_timings(name, records[name], golden, args.time_slack)
+        failures += found
+        if args.update and not found:
+            write_golden(name, records[name])
+            print(f"wrote {_golden_path(name)}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'failures': failures, 'results': records}, f, indent=1, default=str)
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    print(f"{len(failures)} failure(s)" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# benchmarks/run.py
+# Times the Revenue and Review pages over synthetic datasets of increasing size.
+#
+#   python -m benchmarks.run --sizes 10k,1M --out bench.json
+#   python -m benchmarks.run --sizes 10k --apptest
+#
+# Each stage (load, filter, every aggregation block, figure build) is timed on
+# its own by calling the analytics layer directly; --apptest additionally runs
+# each page end to end through Streamlit's AppTest. Results are written as JSON
+# (one record per size/dataset/stage) so runs can be diffed for regressions.
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from analytics import backends, bitmaps, cube, figures, incremental, ingest, revenue, reviews, sampling, sketches, streaming
+from benchmarks import synthetic
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WORKDIR = os.path.join(REPO_ROOT, '.bench')
+
+
+class Recorder:
+    def __init__(self):
+        self.records = []
+
+    @contextlib.contextmanager
+    def stage(self, size, dataset, name, rows=None):
+        start = time.perf_counter()
+        yield
+        self.records.append({
+            'size': size, 'dataset': dataset, 'stage': name,
+            'seconds': round(time.perf_counter() - start, 6),
+            'rows': rows,
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        })
+
+    def __call__(self, size, dataset, name, fn, rows=None):
+        with self.stage(size, dataset, name, rows):
+            return fn()
+
+
+# -------------------------
+# Revenue page
+# -------------------------
+def bench_revenue(rec, size, path, platforms):
+    run = lambda name, fn, rows=None: rec(size, 'revenue', name, fn, rows)  # noqa: E731
+    run('load.cold', lambda: ingest.build_cache(path, ingest.REVENUE_SCHEMA), rows=size)
+    df = run('load.warm', lambda: ingest.load_revenue(path), rows=size)
+    run('cube.build', lambda: cube.build_revenue_cube(df), rows=size)
+    sales_cube = run('cube.load', lambda: incremental.load_revenue_cube(path))
+    view = run('filter', lambda: cube.filter_cube(sales_cube, platforms), rows=len(sales_cube))
+    run('agg.kpis', lambda: revenue.kpis(view, df.columns))
+
+    tables = {}
+    for name, compute in revenue.SECTIONS.items():
+        tables[name] = run(f'agg.{name}', lambda: compute(view))
+    tables['trend'] = run('agg.trend', lambda: revenue.trend(view))
+
+    sample = run('sample.build', lambda: sampling.build_sample(df, sampling.rng_for('0' * 16)), rows=size)
+    run('approx.kpis', lambda: sampling.kpis(sample, platforms), rows=len(sample))
+    for name, estimate in sampling.SECTIONS.items():
+        run(f'approx.{name}', lambda: estimate(sample, platforms), rows=len(sample))
+
+    first = sales_cube['Order Date'].min()
+    month = (first, first + pd.offsets.MonthEnd(0))
+    run('partitions.build', lambda: incremental.load_revenue_range(path, *month))
+    run('partitions.one_month', lambda: incremental.load_revenue_range(path, *month))
+
+    for name, table in tables.items():
+        chart_table = table[0] if name == 'category_counts' else table
+        run(f'fig.{name}', lambda: figures.build(name, chart_table))
+
+
+# -------------------------
+# Review page
+# -------------------------
+def bench_reviews(rec, size, path, platforms, locations):
+    run = lambda name, fn, rows=None: rec(size, 'reviews', name, fn, rows)  # noqa: E731
+    run('load.cold', lambda: ingest.build_cache(path, ingest.REVIEW_SCHEMA), rows=size)
+    df = run('load.warm', lambda: ingest.load_reviews(path), rows=size)
+    run('stats.fold', lambda: streaming.fold_chunk(df), rows=size)
+    run('stats.stream', lambda: streaming.stream_review_stats(path), rows=size)
+    stats = run('stats.load', lambda: incremental.load_review_stats(path))
+    view = run('filter', lambda: streaming.filter_stats(stats, platforms, locations), rows=len(stats))
+    run('sketch.fold', lambda: sketches.fold_chunk(df), rows=size)
+    sketch = run('sketch.load', lambda: incremental.load_review_sketch(path))
+    sketch_view = run('sketch.filter', lambda: sketches.filter_sketch(sketch, platforms, locations), rows=len(sketch))
+    index = run('bitmaps.build', lambda: bitmaps.build_index(df), rows=size)
+    drill = {'Agent Name': platforms, 'Location': locations, 'Order Type': index.options('Order Type')[:1]}
+    selected = run('bitmaps.select', lambda: index.rows(drill), rows=size)
+    drill_stats = run('bitmaps.fold', lambda: bitmaps.breakdown_fold('Price Range')(df.take(selected)),
+                      rows=len(selected))
+
+    tables = {
+        'avg_delivery': run('agg.avg_delivery', lambda: reviews.avg_delivery(view)),
+        'most_used_platform': run('agg.most_used_platform', lambda: reviews.most_used_platform(view)),
+        'avg_feedback': run('agg.avg_feedback', lambda: reviews.avg_feedback(view)),
+        'order_product': run('agg.order_product', lambda: reviews.order_product(view)),
+        'delivery_distribution': run('agg.delivery_distribution',
+                                     lambda: reviews.delivery_distribution(sketch_view)[0]),
+    }
+    for name, table in tables.items():
+        run(f'fig.{name}', lambda: figures.build(name, table))
+    breakdown = run('agg.breakdown', lambda: reviews.breakdown(drill_stats, 'Price Range'))
+    run('fig.breakdown', lambda: figures.build('breakdown', breakdown, column='Price Range', metric='Reviews'))
+
+
+# -------------------------
+# SQL query backends
+# -------------------------
+def bench_backend(rec, size, name, revenue_path, reviews_path, platforms, locations):
+    if not backends.BACKENDS[name].available():
+        return
+    backend = backends.get_backend(name)
+    run = lambda stage, fn, rows=None: rec(size, name, stage, fn, rows)  # noqa: E731
+    revenue_version, reviews_version = ingest.data_version(revenue_path), ingest.data_version(reviews_path)
+    run('build.revenue', lambda: backend.revenue_platforms(revenue_path, revenue_version), rows=size)
+    run('build.reviews', lambda: backend.review_options(reviews_path, reviews_version, 'Location'), rows=size)
+    run('query.revenue_cube', lambda: backend.revenue_cube(revenue_path, revenue_version, platforms))
+    run('query.review_stats', lambda: backend.review_stats(reviews_path, reviews_version, None, locations))
+    run('query.review_sketch', lambda: backend.review_sketch(reviews_path, reviews_version, None, locations))
+    run('query.review_breakdown', lambda: backend.review_breakdown(reviews_path, reviews_version, 'Order Type',
+                                                                   None, locations, {'Price Range': ['Low']}))
+
+
+# -------------------------
+# End-to-end page runs
+# -------------------------
+def bench_apptest(rec, size, root):
+    from streamlit.testing.v1 import AppTest
+
+    cwd = os.getcwd()
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(root)  # pages read Sales/... relative to the working directory
+    try:
+        for dataset, page in (('revenue', '1_Revenue_Analysis.py'), ('reviews', '2_Review_Analysis.py')):
+            at = AppTest.from_file(os.path.join(REPO_ROOT, 'pages', page), default_timeout=3600)
+            with rec.stage(size, dataset, 'page.first_run', rows=size):
+                at.run()
+            with rec.stage(size, dataset, 'page.rerun', rows=size):
+                at.run()
+            if at.exception:
+                raise RuntimeError(f"{page} raised: {[e.value for e in at.exception]}")
+    finally:
+        os.chdir(cwd)
+        sys.path.remove(REPO_ROOT)
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pages on synthetic data.")
+    parser.add_argument('--sizes', default='10k,1M', help="comma-separated row counts, e.g. 10k,1M,50M")
+    parser.add_argument('--workdir', default=DEFAULT_WORKDIR, help="where synthetic datasets are kept")
+    parser.add_argument('--out', help="write JSON results here (default: stdout)")
+    parser.add_argument('--apptest', action='store_true', help="also time full page runs via AppTest")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rec = Recorder()
+    for label in args.sizes.split(','):
+        size = synthetic.parse_size(label)
+        root = os.path.join(args.workdir, label.strip())
+        with rec.stage(size, 'all', 'generate', rows=size):
+            paths = synthetic.make_dataset(root, size, seed=args.seed)
+        bench_revenue(rec, size, paths['Revenue.csv'], synthetic.PLATFORMS[:2])
+        bench_reviews(rec, size, paths['Reviews.csv'], synthetic.PLATFORMS, synthetic.LOCATIONS[:5])
+        for name in ('sqlite', 'duckdb'):
+            bench_backend(rec, size, name, paths['Revenue.csv'], paths['Reviews.csv'],
+                          synthetic.PLATFORMS[:2], synthetic.LOCATIONS[:5])
+        if args.apptest:
+            bench_apptest(rec, size, root)
+
+    report = {'environment': environment(), 'results': rec.records}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
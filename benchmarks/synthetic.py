@@ -0,0 +1,77 @@
+# benchmarks/synthetic.py
+# Synthetic Revenue.csv / Reviews.csv generators matching the dashboard schemas.
+# Rows are produced in fixed-size chunks so 50M-row files never sit in memory.
+import os
+
+import numpy as np
+import pandas as pd
+
+PLATFORMS = ['Blinkit', 'JioMart', 'Swiggy Instamart']
+LOCATIONS = ['Ahmedabad', 'Bangalore', 'Chennai', 'Delhi', 'Hyderabad',
+             'Jaipur', 'Kolkata', 'Lucknow', 'Mumbai', 'Pune']
+CATEGORIES = ['Beverages', 'Dairy', 'Fruits & Vegetables', 'Grocery', 'Personal Care', 'Snacks']
+ORDER_TYPES = ['Electronics', 'Essentials', 'Food', 'Grocery', 'Pharmacy']
+FEEDBACK_TYPES = ['Negative', 'Neutral', 'Positive']
+PRICE_RANGES = ['High', 'Low', 'Medium']
+
+CHUNK_ROWS = 1_000_000
+START_DATE = np.datetime64('2024-01-01')
+
+
+def parse_size(text):
+    """'10k' -> 10_000, '1M' -> 1_000_000, '50M' -> 50_000_000."""
+    text = str(text).strip()
+    scale = {'k': 1_000, 'K': 1_000, 'm': 1_000_000, 'M': 1_000_000}.get(text[-1])
+    return int(float(text[:-1]) * scale) if scale else int(text)
+
+
+def revenue_chunk(rng, start, n):
+    days = rng.integers(0, 365, n)
+    return pd.DataFrame({
+        'Order ID': np.char.add('ORD', np.char.zfill((np.arange(start, start + n)).astype(str), 9)),
+        'Order Date': (START_DATE + days.astype('timedelta64[D]')).astype(str),
+        'Platform': np.array(PLATFORMS)[rng.choice(len(PLATFORMS), n, p=[0.4, 0.25, 0.35])],
+        'Location': np.array(LOCATIONS)[rng.integers(0, len(LOCATIONS), n)],
+        'Product Category': np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), n)],
+        'Order Value (INR)': rng.gamma(2.0, 400.0, n).round().astype('int64') + 20,
+    })
+
+
+def reviews_chunk(rng, start, n):
+    return pd.DataFrame({
+        'Agent Name': np.array(PLATFORMS)[rng.integers(0, len(PLATFORMS), n)],
+        'Rating': rng.integers(10, 51, n) / 10,
+        'Delivery Time (min)': rng.integers(10, 61, n),
+        'Location': np.array(LOCATIONS)[rng.integers(0, len(LOCATIONS), n)],
+        'Order Type': np.array(ORDER_TYPES)[rng.integers(0, len(ORDER_TYPES), n)],
+        'Customer Feedback Type': np.array(FEEDBACK_TYPES)[rng.integers(0, len(FEEDBACK_TYPES), n)],
+        'Price Range': np.array(PRICE_RANGES)[rng.integers(0, len(PRICE_RANGES), n)],
+        'Discount Applied': np.where(rng.random(n) < 0.5, 'Yes', 'No'),
+        'Product Availability': rng.integers(0, 2, n),
+        'Customer Service Rating': rng.integers(1, 6, n),
+        'Order Accuracy': rng.integers(0, 2, n),
+    })
+
+
+def write_csv(path, make_chunk, n_rows, seed=0, chunk_rows=CHUNK_ROWS):
+    rng = np.random.default_rng(seed)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', newline='') as f:
+        for start in range(0, n_rows, chunk_rows):
+            chunk = make_chunk(rng, start, min(chunk_rows, n_rows - start))
+            chunk.to_csv(f, header=(start == 0), index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def make_dataset(root, n_rows, seed=0):
+    """Write <root>/Sales/Revenue.csv and Reviews.csv with `n_rows` each (reused if present)."""
+    sales = os.path.join(root, 'Sales')
+    os.makedirs(sales, exist_ok=True)
+    paths = {}
+    for name, make_chunk in (('Revenue.csv', revenue_chunk), ('Reviews.csv', reviews_chunk)):
+        path = os.path.join(sales, name)
+        if not os.path.exists(path):
+            write_csv(path, make_chunk, n_rows, seed=seed)
+        paths[name] = path
+    return paths
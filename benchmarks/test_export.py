@@ -0,0 +1,53 @@
+# benchmarks/test_export.py
+# The export endpoint (analytics.export) answers malformed filter dicts with
+# 400 and the reason, and accepts the filter dicts the pages link to:
+#
+#   python -m pytest benchmarks/test_export.py
+import json
+import urllib.parse
+
+import pytest
+from starlette.requests import Request
+
+from analytics import export, views
+from benchmarks import synthetic
+
+
+def _get(dataset, name, fmt, filters):
+    query = urllib.parse.urlencode({'filters': filters if isinstance(filters, str) else json.dumps(filters)})
+    endpoint = export.routes()[0].endpoint
+    return endpoint(Request({'type': 'http', 'method': 'GET', 'path': f"/export/{dataset}/{name}.{fmt}",
+                             'query_string': query.encode(), 'headers': [],
+                             'path_params': {'dataset': dataset, 'name': name, 'fmt': fmt}}))
+
+
+@pytest.mark.parametrize('dataset, filters, reason', [
+    ('revenue', {'Platform': 'Blinkit'}, "'Platform' must be a list"),
+    ('revenue', {'Platfrom': ['Blinkit']}, "unknown revenue filter 'Platfrom'"),
+    ('revenue', {'Order Date': ['2024-03-01']}, "'Order Date' must be [first, last]"),
+    ('revenue', {'Granularity': 'Hourly'}, "'Granularity' must be one of"),
+    ('revenue', {'Window': '7'}, "'Window' must be a positive whole number"),
+    ('revenue', ['Blinkit'], "must be an object"),
+    ('reviews', {'Location': [['Delhi']]}, "'Location' must be a list of values"),
+    ('reviews', {'Metric': 'Bogus'}, "'Metric' must be one of"),
+    ('reviews', '{"Platform": ', "Expecting value"),
+])
+def test_bad_filters_are_400(dataset, filters, reason):
+    response = _get(dataset, 'rows', 'csv', filters)
+    assert response.status_code == 400
+    assert reason in json.loads(response.body)['error']
+
+
+def test_page_filters_export(tmp_path):
+    paths = synthetic.make_dataset(str(tmp_path), 2_000)
+    backend = views.backend('pandas')
+    for dataset, path, filters in (
+            ('revenue', paths['Revenue.csv'], {'Platform': ['Blinkit'], 'Order Date': ['2024-02-01', '2024-02-29'],
+                                               'Mode': 'approximate'}),
+            ('reviews', paths['Reviews.csv'], {'Location': ['Delhi'], 'Price Range': ['High'],
+                                               'Discount Applied': ['Yes']})):
+        view = views.VIEWS[dataset](path, filters, backend)
+        views.check_filters(dataset, view.filters)  # what the sidebar panel puts in the export URL
+        for name in export.TABLES[dataset]:
+            body = b''.join(export.stream(dataset, name, 'csv', view.filters, path, backend))
+            assert body.count(b'\n') >= 1, (dataset, name)
@@ -0,0 +1,11 @@
+# benchmarks/test_golden.py
+# pytest entry point for the golden-output checks (benchmarks/golden.py):
+#
+#   python -m pytest benchmarks/test_golden.py
+#
+# Outputs only; timings are checked by running benchmarks.golden itself.
+from benchmarks import golden
+
+
+def test_golden_outputs():
+    assert golden.main(['--no-timing', '--datasets', 'synthetic']) == 0
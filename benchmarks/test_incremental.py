@@ -0,0 +1,60 @@
+# benchmarks/test_incremental.py
+# An append (analytics.incremental) must leave the typed cache and the persisted
+# aggregates exactly as a full rebuild of the grown CSV would:
+#
+#   python -m pytest benchmarks/test_incremental.py
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from analytics import incremental, ingest
+from benchmarks import synthetic
+
+BASE_ROWS, BATCH_ROWS = 5_000, 1_000
+
+
+def _dataset(tmp_path, name, make_chunk):
+    # A base CSV plus one batch of new rows with the same columns
+    os.makedirs(tmp_path / 'appended')
+    path = synthetic.write_csv(str(tmp_path / 'appended' / name), make_chunk, BASE_ROWS)
+    return path, make_chunk(np.random.default_rng(1), BASE_ROWS, BATCH_ROWS)
+
+
+def _rebuilt(tmp_path, path):
+    # The appended CSV as a new file, with nothing cached for it
+    os.makedirs(tmp_path / 'rebuilt')
+    return shutil.copyfile(path, tmp_path / 'rebuilt' / os.path.basename(path))
+
+
+def _sorted(frame):
+    frame = frame.reset_index() if frame.index.name or frame.index.nlevels > 1 else frame
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+def test_append_revenue_equals_rebuild(tmp_path):
+    path, batch = _dataset(tmp_path, 'Revenue.csv', synthetic.revenue_chunk)
+    incremental.load_revenue_cube(path)  # aggregates of the base file, then extended by the append
+    incremental.append_revenue(batch, path)
+    assert ingest.read_manifest(path)['segments']  # extended in place, not rebuilt
+    full = _rebuilt(tmp_path, path)
+
+    pd.testing.assert_frame_equal(ingest.load_revenue(path), ingest.load_revenue(full))
+    pd.testing.assert_frame_equal(_sorted(incremental.load_revenue_cube(path)),
+                                  _sorted(incremental.load_revenue_cube(full)))
+
+
+def test_append_reviews_equals_rebuild(tmp_path):
+    path, batch = _dataset(tmp_path, 'Reviews.csv', synthetic.reviews_chunk)
+    incremental.load_review_stats(path)
+    incremental.load_review_sketch(path)
+    incremental.append_reviews(batch, path)
+    assert ingest.read_manifest(path)['segments']  # extended in place, not rebuilt
+    full = _rebuilt(tmp_path, path)
+
+    pd.testing.assert_frame_equal(ingest.load_reviews(path), ingest.load_reviews(full))
+    pd.testing.assert_frame_equal(_sorted(incremental.load_review_stats(path)),
+                                  _sorted(incremental.load_review_stats(full)))
+    pd.testing.assert_frame_equal(_sorted(incremental.load_review_sketch(path)),
+                                  _sorted(incremental.load_review_sketch(full)))
@@ -1,7 +1,8 @@
 # pages/1_Revenue_Analysis.py
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+from analytics import cache as fcache
+from analytics import backends, export, ingest, parallel, profiling, revenue, sampling, sources, views, warmup
 
 st.set_page_config(page_title="Revenue Analysis", page_icon="💰", layout="wide")
 st.title("💰 Revenue Analysis")
@@ -11,91 +12,130 @@ This dashboard showcases category contributions, total earnings,
 and platform-wise revenue performance for a clear financial overview.
 """)
 
-
+# Times every step of this run (see analytics.profiling); shown in the debug panel.
+profiler = profiling.Profiler('revenue')
 
 # -------------------------
 # 1) Load data (cached)
 # -------------------------
-@st.cache_data
-def load_data(path="Sales/Revenue.csv"):
-    df = pd.read_csv(path)
-    # ensure numeric column for revenue
-    if 'Order Value (INR)' in df.columns:
-        df['Order Value (INR)'] = pd.to_numeric(df['Order Value (INR)'], errors='coerce').fillna(0)
-    # ensure Order ID is string (so count works)
-    if 'Order ID' in df.columns:
-        df['Order ID'] = df['Order ID'].astype(str)
-    # parse date if present
-    if 'Order Date' in df.columns:
-        df['Order Date'] = pd.to_datetime(df['Order Date'], errors='coerce')
-    return df
-
-# Change this path if your CSV is elsewhere
-DATA_PATH = "Sales/Revenue.csv"
+# New source data is picked up by a background poller (see analytics.sources), started
+# here too in case this page is the first one opened.
+warmup.watch()
 
 try:
-    df_sales = load_data(DATA_PATH)
+    with profiler.section('data', 'load'), st.spinner("Loading revenue data…"):
+        # Local CSV of the configured source's current snapshot (see analytics.sources):
+        # newer data is swapped in between runs, never during one.
+        DATA_PATH = sources.path('revenue')
+        # `data_version` is the CSV's content digest: a new digest means new cache entries.
+        data_version = ingest.data_version(DATA_PATH)
+        columns = set(backends.csv_columns(DATA_PATH))
 except FileNotFoundError:
-    st.error(f"Data file not found at `{DATA_PATH}`. Put `Revenue.csv` in the `Sales/` folder or update the path.")
+    st.error(f"Revenue data not found at `{sources.configured_uri('revenue')}`. Put `Revenue.csv` in the `Sales/` "
+             "folder or point `.streamlit/sources.toml` at your data.")
     st.stop()
 
+if sources.is_refreshing('revenue'):
+    st.sidebar.caption("🔄 Newer revenue data is loading in the background; showing the current snapshot.")
+
 # -------------------------
 # 2) Sidebar filters
 # -------------------------
 st.sidebar.header("Filters")
 
-if 'Platform' in df_sales.columns:
-    platform_options = sorted(df_sales['Platform'].dropna().unique())
+with profiler.section('backend', 'load'):
+    # One query backend per server process (DASHBOARD_QUERY_BACKEND), shared by all
+    # sessions. It returns the daily revenue cube aggregated and filtered: in memory
+    # for the pandas backend, inside the database file for sqlite/duckdb.
+    backend = views.backend()
+    platform_options = backend.revenue_platforms(DATA_PATH, data_version) if 'Platform' in columns else []
+    date_bounds = backend.revenue_dates(DATA_PATH, data_version) if 'Order Date' in columns else None
+
+if 'Platform' in columns:
     selected_platforms = st.sidebar.multiselect("Platform", options=platform_options, default=platform_options)
 else:
-    platform_options = []
     selected_platforms = []
 
-df = df_sales.copy()
-if selected_platforms:
-    df = df[df['Platform'].isin(selected_platforms)]
+if date_bounds is not None:
+    first_day, last_day = (day.date() for day in date_bounds)
+    picked = st.sidebar.date_input("Order Date", value=(first_day, last_day),
+                                   min_value=first_day, max_value=last_day)
+    # While a range is being picked the widget returns only its start date
+    picked = tuple(picked) if isinstance(picked, (list, tuple)) else (picked,)
+    start_day, end_day = picked[0], picked[-1]
+    full_range = (start_day, end_day) == (first_day, last_day)
+else:
+    full_range = True
+
+approximate = sampling.REQUIRED.issubset(columns) and st.sidebar.toggle(
+    "Fast approximate mode",
+    help="Estimate the KPIs, platform sales and category contribution from a stratified sample of orders. "
+         "Turn off for exact figures.")
+
+# The page's filter dict (same keys as the export URLs and report presets);
+# the trend's granularity and window are added by its widgets below.
+filters = {'Platform': selected_platforms}
+if not full_range:
+    filters['Order Date'] = [str(start_day), str(end_day)]
+if approximate:
+    filters['Mode'] = 'approximate'
 
 # -------------------------
 # 3) KPIs
 # -------------------------
 st.subheader("KPI Summary")
-total_revenue = df['Order Value (INR)'].sum() if 'Order Value (INR)' in df.columns else 0
-avg_order_value = df['Order Value (INR)'].mean() if 'Order Value (INR)' in df.columns else 0
-total_orders = df['Order ID'].count() if 'Order ID' in df.columns else len(df)
-
-c1, c2, c3 = st.columns(3)
-c1.metric("Total Revenue", f"₹{total_revenue:,.0f}")
-c2.metric("Average Order Value", f"₹{avg_order_value:,.2f}")
-c3.metric("Total Orders", f"{total_orders:,}")
+slots = {'kpis': st.container()}
+
+def render_kpis(kpis, approximate):
+    c1, c2, c3 = st.columns(3)
+    if approximate:
+        (total_revenue, revenue_ci), (avg_order_value, aov_ci), (total_orders, orders_ci) = kpis
+
+        c1.metric("Total Revenue", f"≈ ₹{total_revenue:,.0f}")
+        c1.caption(f"± ₹{revenue_ci:,.0f}")
+        c2.metric("Average Order Value", f"≈ ₹{avg_order_value:,.2f}")
+        c2.caption(f"± ₹{aov_ci:,.2f}")
+        c3.metric("Total Orders", f"≈ {total_orders:,}")
+        c3.caption(f"± {orders_ci:,.0f}")
+        st.caption(f"≈ Estimated from a stratified sample of up to {sampling.PER_STRATUM:,} orders per platform and "
+                   "category; ± is the 95% confidence interval. Platform sales and category contribution below "
+                   "are estimated the same way. Turn off fast approximate mode for exact figures.")
+    else:
+        total_revenue, avg_order_value, total_orders = kpis
+
+        c1.metric("Total Revenue", f"₹{total_revenue:,.0f}")
+        c2.metric("Average Order Value", f"₹{avg_order_value:,.2f}")
+        c3.metric("Total Orders", f"{total_orders:,}")
+
+# Each section below gets a slot in page order; its chart is filled in by the
+# render loop at the end as soon as that section's computation finishes.
+renderers = {}
 
 # -------------------------
 # 4) Total Orders per Platform (bar)
 # -------------------------
 st.header("\n")
 st.subheader("Total Orders (per Platform)")
-if {'Platform', 'Order ID'}.issubset(df.columns):
-    orders_table = df.groupby('Platform')['Order ID'].count().sort_values(ascending=False).reset_index(name='Total Orders')
-    fig_orders = px.bar(orders_table, x='Platform', y='Total Orders', text='Total Orders',color='Platform')
-    fig_orders.update_traces(texttemplate='%{text:,}', textposition='outside')
-    st.plotly_chart(fig_orders, use_container_width=True)
-else:
-    st.info("Requires `Platform` and `Order ID` columns to show Total Orders chart.")
+slots['orders_per_platform'] = st.container()
+
+def render_orders_per_platform(orders_table, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
+
+renderers['orders_per_platform'] = (render_orders_per_platform,
+                                    "Requires `Platform` and `Order ID` columns to show Total Orders chart.")
 
 # -------------------------
 # 5) Platform-wise Sales (horizontal bar)
 # -------------------------
 st.header('\n')
 st.subheader("Platform-wise Total Sales")
-if {'Platform', 'Order Value (INR)'}.issubset(df.columns):
-    platform_sales = df.groupby('Platform')['Order Value (INR)'].sum().reset_index()
-    platform_sales['Total Sales (INR, Lakh)'] = (platform_sales['Order Value (INR)'] / 100000).round(2)
-    platform_sales = platform_sales.sort_values('Total Sales (INR, Lakh)', ascending=False)
-    fig_sales = px.bar(platform_sales, x='Total Sales (INR, Lakh)', y='Platform', orientation='h',
-                       text='Total Sales (INR, Lakh)', color='Platform')
-    fig_sales.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-    st.plotly_chart(fig_sales, use_container_width=True)
-else:
-    st.info("Requires `Platform` and `Order Value (INR)` columns to show Platform Sales.")
+slots['platform_sales'] = st.container()
+
+def render_platform_sales(platform_sales, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
+
+renderers['platform_sales'] = (render_platform_sales,
+                               "Requires `Platform` and `Order Value (INR)` columns to show Platform Sales.")
 
 
 # -------------------------
@@ -103,52 +143,19 @@ else:
 # -------------------------
 st.header('\n')
 st.subheader("Most & Least Ordered Category per Platform")
+slots['category_counts'] = st.container()
+
+def render_category_counts(result, chart):
+    cat_count, most_least = result
 
-if {'Platform', 'Product Category', 'Order ID'}.issubset(df.columns):
-    # Count orders per platform and category
-    cat_count = df.groupby(['Platform', 'Product Category'])['Order ID'].count().reset_index(name='Orders')
-    
-    # Compute total orders per platform
-    cat_count['Platform Total'] = cat_count.groupby('Platform')['Orders'].transform('sum')
-    
-    # Compute % contribution per category
-    cat_count['Percentage'] = (cat_count['Orders'] / cat_count['Platform Total'] * 100).round(2)
-    
-    # Most ordered per platform
-    top = cat_count.loc[cat_count.groupby('Platform')['Percentage'].idxmax()]
-    top = top[['Platform', 'Product Category', 'Orders', 'Percentage']].rename(
-        columns={'Product Category':'Top Category', 'Orders':'Top Orders', 'Percentage':'Top %'}
-    )
-    
-    # Least ordered per platform
-    bottom = cat_count.loc[cat_count.groupby('Platform')['Percentage'].idxmin()]
-    bottom = bottom[['Platform', 'Product Category', 'Orders', 'Percentage']].rename(
-        columns={'Product Category':'Bottom Category', 'Orders':'Bottom Orders', 'Percentage':'Bottom %'}
-    )
-    
-    # Combine top & bottom
-    most_least = pd.merge(top, bottom, on='Platform')
-    
     # Display table
     st.table(most_least)
-    
+
     # Stacked bar chart showing percentage breakdown for visual comparison
-    chart_cat = px.bar(
-        cat_count,
-        x='Platform',
-        y='Percentage',
-        color='Product Category',
-        title='Category Breakdown per Platform (Percentage)',
-        text='Percentage',
-        barmode='stack'
-    )
-    chart_cat.update_traces(texttemplate='%{text:.2f}%', textposition='inside', textfont_size=14, textfont_color='white')
-    chart_cat.update_layout(yaxis_title='Percentage', xaxis_title='Platform', legend_title='Product Category', height=500)
-    
-    st.plotly_chart(chart_cat, use_container_width=True)
-    
-else:
-    st.info("Requires `Platform`, `Product Category`, and `Order ID` columns to show most/least ordered categories.")
+    st.plotly_chart(chart.spec, use_container_width=True)
+
+renderers['category_counts'] = (render_category_counts,
+                                "Requires `Platform`, `Product Category`, and `Order ID` columns to show most/least ordered categories.")
 
 
 
@@ -157,64 +164,76 @@ else:
 # -------------------------
 st.header('\n')
 st.subheader("Revenue per Order By Platform (INR)")
-if {'Platform', 'Order Value (INR)', 'Order ID'}.issubset(df.columns):
-    total_by_platform = df.groupby('Platform').agg({
-        'Order Value (INR)': 'sum',
-        'Order ID': 'count'
-    }).rename(columns={'Order Value (INR)': 'Total Sales (INR)', 'Order ID': 'Total Orders'})
-    total_by_platform['Revenue per Order (INR)'] = (total_by_platform['Total Sales (INR)'] / total_by_platform['Total Orders']).round(2)
-    rpo = total_by_platform.reset_index().sort_values('Revenue per Order (INR)', ascending=False)
-    fig_rpo = px.scatter(rpo, x='Platform', y='Revenue per Order (INR)', size='Revenue per Order (INR)',
-                         hover_name='Platform', size_max=80,color='Platform')
-    st.plotly_chart(fig_rpo, use_container_width=True)
+slots['revenue_per_order'] = st.container()
+
+def render_revenue_per_order(rpo, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
     st.dataframe(rpo[['Platform', 'Total Orders', 'Total Sales (INR)', 'Revenue per Order (INR)']])
-else:
-    st.info("Requires `Platform`, `Order Value (INR)`, and `Order ID` columns to show Revenue per Order.")
+
+renderers['revenue_per_order'] = (render_revenue_per_order,
+                                  "Requires `Platform`, `Order Value (INR)`, and `Order ID` columns to show Revenue per Order.")
 
 # -------------------------
 # 8) Category contribution to overall sales (grouped bar chart)
 # -------------------------
 st.header('\n')
 st.subheader("Category Contribution % per Platform")
+slots['category_contribution'] = st.container()
 
-if {'Platform', 'Product Category', 'Order Value (INR)'}.issubset(df.columns):
-    # Group sales by Platform and Product Category
-    category_sales = df.groupby(['Platform', 'Product Category'])['Order Value (INR)'].sum()
-
-    # Compute % contribution of each category to the total per platform
-    category_contribution = (category_sales / category_sales.groupby(level=0).transform('sum') * 100).round(1)
-
-    # Reset index for plotting
-    category_contribution = category_contribution.reset_index(name='Contribution (%)')
-
-    # Create grouped bar chart
-    chart_category = px.bar(
-        category_contribution,
-        x='Platform',
-        y='Contribution (%)',
-        color='Product Category',
-        barmode='group',
-        text='Contribution (%)'
-    )
-
-    # Style labels and layout
-    chart_category.update_traces(
-        textposition='outside',
-        textfont_color='white',
-        textfont_size=11
-    )
-
-    chart_category.update_layout(
-        yaxis_title='Contribution (%)',
-        xaxis_title='Platform',
-        legend_title='Product Category',
-        height=500
-    )
-
-    st.plotly_chart(chart_category, use_container_width=True)
+def render_category_contribution(category_contribution, chart):
+    # Grouped bar chart
+    st.plotly_chart(chart.spec, use_container_width=True)
     st.dataframe(category_contribution.sort_values(['Platform', 'Contribution (%)'], ascending=[True, False]))
-else:
-    st.info("Requires `Platform`, `Product Category`, and `Order Value (INR)` columns to show category contribution.")
 
+renderers['category_contribution'] = (render_category_contribution,
+                                      "Requires `Platform`, `Product Category`, and `Order Value (INR)` columns to show category contribution.")
+
+# -------------------------
+# 9) Revenue & order trends over time (lines + rolling average)
+# -------------------------
+st.header('\n')
+st.subheader("Revenue & Orders Trend per Platform")
+
+if revenue.REQUIREMENTS['trend'].issubset(columns):
+    g1, g2 = st.columns(2)
+    filters['Granularity'] = g1.radio("Granularity", list(revenue.GRANULARITIES),
+                                      index=list(revenue.GRANULARITIES).index(revenue.DEFAULT_GRANULARITY),
+                                      horizontal=True)
+    filters['Window'] = g2.slider("Rolling average window (periods)", min_value=1, max_value=30,
+                                  value=revenue.DEFAULT_WINDOWS[filters['Granularity']])
+slots['trend'] = st.container()
+
+def render_trend(trend_table, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
 
+renderers['trend'] = (render_trend,
+                      "Requires `Platform`, `Order Date`, `Order ID`, and `Order Value (INR)` columns to show trends.")
+
+# -------------------------
+# 10) KPIs, then the sections computed concurrently and rendered as each one finishes
+# -------------------------
+# Filtered views and aggregates are shared across sessions through the filter
+# cache, keyed by data version + sorted selection (see analytics.views). Treat
+# results as read-only.
+filter_cache = fcache.shared_cache()
+view = views.revenue_view(DATA_PATH, filters, backend, profiler,
+                          options={'Platform': platform_options, 'Order Date': date_bounds})
+
+with slots['kpis']:
+    render_kpis(view.kpis(), view.approximate)
+
+for name in view.missing:
+    slots[name].info(renderers[name][1])
+
+for name, result in parallel.run_sections(view.sections):
+    with slots[name], profiler.section(name, 'render'):
+        renderers[name][0](*result)
+
+# -------------------------
+# 11) Export of the tables above and the filtered orders (sidebar)
+# -------------------------
+export.sidebar_panel('revenue', view.filters)
 
+profiler.finish(filter_cache)
+if profiling.debug_enabled(st.query_params):
+    profiling.sidebar_panel(profiler, filter_cache)
@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+from analytics import cache as fcache
+from analytics import backends, bitmaps, export, ingest, parallel, profiling, reviews, sources, views, warmup
 
 st.set_page_config(page_title="Review Analysis", page_icon="📝", layout="wide")
 st.title("📝 Review Analysis")
@@ -11,197 +12,188 @@ This analysis focuses on identifying top-performing platforms in terms of speed,
 accuracy, and city-wise popularity based on review data.
 """)
 
+# Times every step of this run (see analytics.profiling); shown in the debug panel.
+profiler = profiling.Profiler('reviews')
+
 
 # ----------------------
 # Load data
 # ----------------------
-@st.cache_data
-def load_data(path="Sales/Reviews.csv"):
-    df = pd.read_csv(path)
-    # Ensure numeric columns
-    df['Customer Service Rating'] = pd.to_numeric(df['Customer Service Rating'], errors='coerce').fillna(0)
-    df['Delivery Time (min)'] = pd.to_numeric(df['Delivery Time (min)'], errors='coerce').fillna(0)
-    df['Order Accuracy'] = pd.to_numeric(df['Order Accuracy'], errors='coerce').fillna(0)
-    df['Product Availability'] = pd.to_numeric(df['Product Availability'], errors='coerce').fillna(0)
-    return df
-
-df_review = load_data("Sales/Reviews.csv")  # change path if needed
+# New source data is picked up by a background poller (see analytics.sources), started
+# here too in case this page is the first one opened.
+warmup.watch()
+
+with profiler.section('backend', 'load'), st.spinner("Loading review data…"):
+    # Local CSV of the configured source's current snapshot (see analytics.sources)
+    DATA_PATH = sources.path('reviews')
+    data_version = ingest.data_version(DATA_PATH)
+    # One query backend per server process (DASHBOARD_QUERY_BACKEND), shared by all
+    # sessions. Every section below is answered from per-(Agent Name, Location)
+    # accumulators or delivery-time sketches, which the backend returns already
+    # filtered and aggregated.
+    backend = views.backend()
+    platforms = backend.review_options(DATA_PATH, data_version, 'Agent Name')
+    locations = backend.review_options(DATA_PATH, data_version, 'Location')
+    # Drill-down attributes present in this file, with their values (flags as Yes/No)
+    drill_columns = [c for c in bitmaps.DRILL_DOWN if c in backends.csv_columns(DATA_PATH)]
+    drill_options = {c: backend.review_options(DATA_PATH, data_version, c) for c in drill_columns}
+
+if sources.is_refreshing('reviews'):
+    st.sidebar.caption("🔄 Newer review data is loading in the background; showing the current snapshot.")
 
 # ----------------------
 # Sidebar filters
 # ----------------------
 st.sidebar.header("Filters")
-platforms = sorted(df_review['Agent Name'].dropna().unique())
 selected_platforms = st.sidebar.multiselect("Platform", platforms, default=platforms)
 
-locations = sorted(df_review['Location'].dropna().unique())
 selected_locations = st.sidebar.multiselect("Location", locations, default=locations)
 
-df = df_review[(df_review['Agent Name'].isin(selected_platforms)) & 
-               (df_review['Location'].isin(selected_locations))]
+# Review attributes: a selection narrows every section to the matching reviews,
+# looked up in per-value bitmaps built when the data is loaded (see analytics.bitmaps)
+selected_values = {c: st.sidebar.multiselect(c, drill_options[c], default=drill_options[c]) for c in drill_columns}
+
+# The page's filter dict (same keys as the export URLs and report presets);
+# the drill-down attribute and metric are added by their widgets below.
+filters = {'Platform': selected_platforms, 'Location': selected_locations, **selected_values}
 
 # ----------------------
 # KPIs
 # ----------------------
 st.subheader("Key Metrics")
+slots = {'kpis': st.container()}
 
-if len(selected_platforms) == 1:
-    agent = selected_platforms[0]
-
-    avg_time = df_review[df_review['Agent Name'] == agent]['Delivery Time (min)'].mean()
-    formatted_time = f"{int(avg_time)} min {int((avg_time - int(avg_time)) * 60)} sec"
+def render_kpis(agent, agent_metrics):
+    if agent_metrics is None:
+        st.info(f"⚠️ No reviews of {agent} match the selected review attributes.")
+    else:
+        avg_time, avg_rating, order_acc, product_avail = agent_metrics
+        formatted_time = reviews.format_minutes(avg_time)
 
-    avg_rating = df_review[df_review['Agent Name'] == agent]['Customer Service Rating'].mean()
+        # Create 4 columns to show metrics in a single line
+        col1, col2, col3, col4 = st.columns(4)
 
-    order_acc = df_review[df_review['Agent Name'] == agent]['Order Accuracy'].mean() * 100
-    product_avail = df_review[df_review['Agent Name'] == agent]['Product Availability'].mean() * 100
+        col1.metric(label=f"Avg Delivery Time ({agent})", value=formatted_time)
+        col2.metric(label=f"Avg Customer Rating ({agent})", value=f"{avg_rating:.1f} ⭐")
+        col3.metric(label=f"Order Accuracy ({agent})", value=f"{order_acc:.1f}%")
+        col4.metric(label=f"Product Availability ({agent})", value=f"{product_avail:.1f}%")
 
-    # Create 4 columns to show metrics in a single line
-    col1, col2, col3, col4 = st.columns(4)
+# Each chart section gets a slot in page order; the render loop at the end fills
+# it in as soon as that section's computation finishes. Renderers come with the
+# message shown instead when the section can't be drawn (see analytics.views).
+renderers = {}
 
-    col1.metric(label=f"Avg Delivery Time ({agent})", value=formatted_time)
-    col2.metric(label=f"Avg Customer Rating ({agent})", value=f"{avg_rating:.1f} ⭐")
-    col3.metric(label=f"Order Accuracy ({agent})", value=f"{order_acc:.1f}%")
-    col4.metric(label=f"Product Availability ({agent})", value=f"{product_avail:.1f}%")
+# ----------------------
+# Average Delivery Time chart
+# ----------------------
+st.subheader("Average Delivery Time per Platform")
+slots['avg_delivery'] = st.container()
 
-else:
-    st.info("⚠️ Select a single agent to view Key Metrics.")
+def render_avg_delivery(avg_delivery_df, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
 
+renderers['avg_delivery'] = (render_avg_delivery, {
+    'empty': "⚠️ No data available to display Average Delivery Time. Please adjust filters."})
 
 # ----------------------
-# Average Delivery Time chart
+# Delivery Time Distribution and tail percentiles
 # ----------------------
-st.subheader("Average Delivery Time per Platform")
-if df.empty:
-    st.info("⚠️ No data available to display Average Delivery Time. Please adjust filters.")
-else:
-    avg_delivery_df = df.groupby('Agent Name')['Delivery Time (min)'].mean().reset_index()
-    avg_delivery_df['Formatted Time'] = avg_delivery_df['Delivery Time (min)'].apply(
-        lambda x: f"{int(x)} min {int((x - int(x))*60)} sec"
-    )
-    fig_delivery = px.bar(
-        avg_delivery_df,
-        x='Agent Name',
-        y='Delivery Time (min)',
-        text='Formatted Time',
-        title="Average Delivery Time per Platform",
-        color='Agent Name'
-    )
-    fig_delivery.update_traces(textposition='inside', textfont_color='white', textfont_size=16)
-    st.plotly_chart(fig_delivery, use_container_width=True)
+st.subheader("Delivery Time Distribution (p50 / p90 / p99)")
+slots['delivery_distribution'] = st.container()
+
+def render_delivery_distribution(table, chart):
+    distribution, percentiles = table
+    st.plotly_chart(chart.spec, use_container_width=True)
+    st.caption("Delivery time percentiles in minutes (within 0.5%), per platform and per platform & location.")
+    st.dataframe(percentiles, use_container_width=True, hide_index=True)
+
+renderers['delivery_distribution'] = (render_delivery_distribution, {
+    'empty': "⚠️ No data available to display the Delivery Time Distribution. Please adjust filters."})
 
 # ----------------------
 # Most Used Platform per Location
 # ----------------------
 st.subheader("Platform Usage per Location")
+slots['usage'] = st.container()
 
-df_filtered = df.copy()
-
-if df_filtered.empty:
-    st.info("⚠️ No data available for the selected filters.")
-
-# Only show this section if all 3 platforms are selected
-elif len(selected_platforms) == 3:   # assuming your filter variable is selected_agents
-    if len(selected_locations) > 1:
-        # Multiple locations → show only most used platform per location
-        most_used_platform = (
-            df_filtered.groupby('Location')['Agent Name']
-            .agg(lambda x: x.value_counts().idxmax())
-            .reset_index()
-        )
-        most_used_platform.columns = ['Location', 'Most Used Platform']
-
-        fig_sunburst = px.sunburst(
-            most_used_platform,
-            path=['Location', 'Most Used Platform'],
-            color='Most Used Platform',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        st.plotly_chart(fig_sunburst, use_container_width=True)
+def render_usage(table, chart):
+    # Most used platform per location, or every platform's share in a single location
+    st.plotly_chart(chart.spec, use_container_width=True)
 
-    else:
-        # Single location → show all platforms with percentages
-        location = selected_locations[0]
-        df_loc = df_filtered[df_filtered['Location'] == location]
-        platform_counts = df_loc['Agent Name'].value_counts().reset_index()
-        platform_counts.columns = ['Platform', 'Count']
-        platform_counts['Percentage'] = (platform_counts['Count'] / platform_counts['Count'].sum()) * 100
+renderers['usage'] = (render_usage, {
+    'empty': "⚠️ No data available for the selected filters.",
+    # Usage compares platforms, so it needs at least two of them selected
+    'platforms': "ℹ️ Platform usage chart is available when at least two platforms are selected."})
 
-        # Sunburst chart
-        fig_sunburst = px.sunburst(
-            platform_counts,
-            path=['Platform'],          # single level sunburst
-            values='Percentage',
-            title=f"Platform Usage in {location}",
-            color='Platform',
-            color_discrete_sequence=px.colors.qualitative.Set3,
-            hover_data={'Count': True, 'Percentage': ':.1f'}
-        )
 
-        # Add text inside slices
-        fig_sunburst.update_traces(
-            texttemplate='%{label}<br>%{value:.1f}%',
-            textinfo='label+value',
-            insidetextfont=dict(color='white', size=16)
-        )
+# ----------------------
+# Avg Customer Feedback Heatmap
+# ----------------------
+st.subheader("Average Customer Feedback per Platform & Location")
+slots['avg_feedback'] = st.container()
 
-        st.plotly_chart(fig_sunburst, use_container_width=True)
+def render_avg_feedback(avg_feedback, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
 
-else:
-    st.info("ℹ️ Platform usage chart is available only when all 3 platforms are selected.")
+renderers['avg_feedback'] = (render_avg_feedback, {
+    'empty': "⚠️ No data available to display Customer Feedback. Please adjust filters."})
+
+# ----------------------
+# Order Accuracy & Product Availability per Platform
+# ----------------------
+st.subheader("Order Accuracy & Product Availability per Platform")
+slots['order_product'] = st.container()
 
-    
+def render_order_product(order_product_melted, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
 
+renderers['order_product'] = (render_order_product, {
+    'empty': "⚠️ No data available to display Order Accuracy & Product Availability. Please adjust filters."})
 
 # ----------------------
-# Avg Customer Feedback Heatmap
+# Drill-down by review attribute
 # ----------------------
-st.subheader("Average Customer Feedback per Platform & Location")
-if df.empty:
-    st.info("⚠️ No data available to display Customer Feedback. Please adjust filters.")
-else:
-    avg_feedback = df.groupby(['Location','Agent Name'])['Customer Service Rating'].mean().reset_index()
-    fig_heatmap = px.density_heatmap(
-        avg_feedback,
-        x='Agent Name',
-        y='Location',
-        z='Customer Service Rating',
-        color_continuous_scale='RdYlGn',
-    )
-    fig_heatmap.update_layout(yaxis=dict(autorange="reversed"), height=600,coloraxis_colorbar_title="Avg Rating ⭐")
-    st.plotly_chart(fig_heatmap, use_container_width=True)
+if drill_columns:
+    st.subheader("Drill-down by Review Attribute")
+    drill_col1, drill_col2 = st.columns(2)
+    filters['Drill-down'] = drill_col1.selectbox("Break down by", drill_columns)
+    filters['Metric'] = drill_col2.selectbox("Metric", list(reviews.DRILL_DOWN_METRICS))
+    slots['breakdown'] = st.container()
+
+def render_breakdown(breakdown_table, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
+    st.dataframe(breakdown_table, use_container_width=True, hide_index=True)
+
+renderers['breakdown'] = (render_breakdown, {'empty': "⚠️ No data available for the selected filters."})
 
 # ----------------------
-# Order Accuracy & Product Availability per Platform
+# KPIs, then the sections computed concurrently and rendered as each one finishes
 # ----------------------
-st.subheader("Order Accuracy & Product Availability per Platform")
-if df.empty:
-    st.info("⚠️ No data available to display Order Accuracy & Product Availability. Please adjust filters.")
-else:
-    # Aggregate per platform and convert 0-1 to %
-    order_product = df.groupby('Agent Name')[['Order Accuracy','Product Availability']].mean().reset_index()
-    order_product['Order Accuracy'] = order_product['Order Accuracy'] * 100
-    order_product['Product Availability'] = order_product['Product Availability'] * 100
-
-    order_product_melted = order_product.melt(
-        id_vars='Agent Name', 
-        value_vars=['Order Accuracy','Product Availability'], 
-        var_name='Metric', 
-        value_name='Percentage'
-    )
-
-    fig_order = px.bar(
-        order_product_melted,
-        x='Agent Name',
-        y='Percentage',
-        color='Metric',
-        barmode='group',
-        text='Percentage',
-        color_discrete_sequence=px.colors.qualitative.Set2
-    )
-    fig_order.update_traces(texttemplate='%{text:.1f}%', textposition='inside', textfont_color='white')
-    st.plotly_chart(fig_order, use_container_width=True)
+# Filtered views and aggregates are shared across sessions through the filter
+# cache, keyed by data version + sorted selection (see analytics.views). Treat
+# results as read-only.
+filter_cache = fcache.shared_cache()
+view = views.reviews_view(DATA_PATH, filters, backend, profiler,
+                          options={'Platform': platforms, 'Location': locations, **drill_options})
+
+with slots['kpis']:
+    if view.kpis is None:
+        st.info("⚠️ Select a single agent to view Key Metrics.")
+    else:
+        render_kpis(selected_platforms[0], view.kpis())
 
+for name, reason in view.missing.items():
+    slots[name].info(renderers[name][1][reason])
 
+for name, result in parallel.run_sections(view.sections):
+    with slots[name], profiler.section(name, 'render'):
+        renderers[name][0](*result)
 
+# ----------------------
+# Export of the tables above and the filtered reviews (sidebar)
+# ----------------------
+export.sidebar_panel('reviews', view.filters)
 
+profiler.finish(filter_cache)
+if profiling.debug_enabled(st.query_params):
+    profiling.sidebar_panel(profiler, filter_cache)
@@ -0,0 +1,149 @@
+# pages/5_Combined_Analysis.py
+import streamlit as st
+
+from analytics import cache as fcache
+from analytics import backends, combined, figures, ingest, parallel, profiling, sources, views, warmup
+
+st.set_page_config(page_title="Combined Analysis", page_icon="🔗", layout="wide")
+st.title("🔗 Combined Analysis")
+st.subheader("""
+Put revenue and customer reviews side by side here.
+This analysis relates each platform's revenue per order to its service rating,
+delivery time and product availability, overall and per location.
+""")
+
+# Times every step of this run (see analytics.profiling); shown in the debug panel.
+profiler = profiling.Profiler('combined')
+
+
+# ----------------------
+# Load data
+# ----------------------
+# New source data is picked up by a background poller (see analytics.sources), started
+# here too in case this page is the first one opened.
+warmup.watch()
+
+try:
+    with profiler.section('data', 'load'), st.spinner("Loading data…"):
+        # Local CSVs of the configured sources' current snapshots (see analytics.sources)
+        REVENUE_PATH, REVIEWS_PATH = sources.path('revenue'), sources.path('reviews')
+        # Both digests make up the version: new data in either file means new cache entries.
+        data_version = (ingest.data_version(REVENUE_PATH), ingest.data_version(REVIEWS_PATH))
+        columns = set(backends.csv_columns(REVENUE_PATH))
+except FileNotFoundError as exc:
+    st.error(f"Data not found (`{exc.filename}`). Put `Revenue.csv` and `Reviews.csv` in the `Sales/` folder "
+             "or point `.streamlit/sources.toml` at your data.")
+    st.stop()
+
+if sources.is_refreshing('revenue') or sources.is_refreshing('reviews'):
+    st.sidebar.caption("🔄 Newer data is loading in the background; showing the current snapshot.")
+
+if not {'Platform', 'Order Value (INR)'}.issubset(columns):
+    st.error("`Revenue.csv` needs `Platform` and `Order Value (INR)` columns to be joined with the reviews.")
+    st.stop()
+
+filter_cache = fcache.shared_cache()
+
+def cached(name, compute, filters=None, stage='aggregate', label=None):
+    if filters is None:
+        filters = {'Platform': selected_platforms, 'Location': selected_locations}
+    return profiler.cached(filter_cache, fcache.make_key(data_version, name, filters), label or name, compute, stage)
+
+with profiler.section('backend', 'load'):
+    # One query backend per server process (DASHBOARD_QUERY_BACKEND), shared by all
+    # sessions and pages (analytics.views); the same revenue cube and review
+    # accumulators the other pages read.
+    backend = views.backend()
+    # Platform/location dimension tables and integer-keyed aggregates, built once per data version
+    index = cached('key_index', lambda: combined.build_index(
+        backend.revenue_cube(REVENUE_PATH, data_version[0]),
+        backend.review_stats(REVIEWS_PATH, data_version[1])), filters={}, stage='load')
+
+# ----------------------
+# Sidebar filters
+# ----------------------
+st.sidebar.header("Filters")
+platforms = index.platforms['Platform'].tolist()
+locations = index.locations['Location'].tolist()
+selected_platforms = st.sidebar.multiselect("Platform", platforms, default=platforms)
+
+selected_locations = st.sidebar.multiselect("Location", locations, default=locations)
+st.sidebar.caption("Revenue has no location: revenue per order is always the platform's overall figure.")
+
+def section(name, compute):
+    # Joined table plus its chart; both are reused while the selection is unchanged.
+    table = cached(name, compute)
+    return table, cached('figure.' + name, lambda: figures.build(name, table), stage='figure', label=name)
+
+joined = cached('joined', lambda: combined.join(index, selected_platforms, selected_locations), stage='filter')
+
+# Each section gets a slot in page order; the render loop at the end fills it in
+# as soon as that section's computation finishes.
+slots = {}
+sections = {}
+renderers = {}
+
+# ----------------------
+# Platforms: revenue per order vs review metrics
+# ----------------------
+st.subheader("Revenue per Order vs Customer Experience per Platform")
+slots['platform_comparison'] = st.container()
+
+if joined.empty:
+    slots['platform_comparison'].info("⚠️ No reviews match the selected platforms and locations. Please adjust filters.")
+else:
+    sections['platform_comparison'] = lambda: section('platform_comparison', lambda: combined.platform_summary(
+        index, selected_platforms, selected_locations))
+
+def render_platform_comparison(summary, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
+    st.dataframe(summary, use_container_width=True, hide_index=True)
+
+renderers['platform_comparison'] = render_platform_comparison
+
+# ----------------------
+# Platform & location: delivery time vs service rating
+# ----------------------
+st.subheader("Delivery Time vs Service Rating per Platform & Location")
+slots['location_metrics'] = st.container()
+
+if joined.empty:
+    slots['location_metrics'].info("⚠️ No data available for the selected filters.")
+else:
+    sections['location_metrics'] = lambda: section('location_metrics', lambda: joined)
+
+def render_location_metrics(table, chart):
+    st.plotly_chart(chart.spec, use_container_width=True)
+
+renderers['location_metrics'] = render_location_metrics
+
+# ----------------------
+# Correlations
+# ----------------------
+st.subheader("Correlation of Revenue per Order with Review Metrics")
+slots['correlations'] = st.container()
+
+if joined.empty:
+    slots['correlations'].info("⚠️ No data available for the selected filters.")
+else:
+    sections['correlations'] = lambda: (cached('correlations', lambda: combined.correlations(joined)),)
+
+def render_correlations(correlations):
+    if correlations.empty:
+        st.info("ℹ️ Correlations need at least two platforms with different revenue per order and three platform/location pairs.")
+    else:
+        st.dataframe(correlations, use_container_width=True, hide_index=True)
+        st.caption("Pearson correlation across the selected platform/location pairs.")
+
+renderers['correlations'] = render_correlations
+
+# ----------------------
+# Compute sections concurrently and render each one as it finishes
+# ----------------------
+for name, result in parallel.run_sections(sections):
+    with slots[name], profiler.section(name, 'render'):
+        renderers[name](*result)
+
+profiler.finish(filter_cache)
+if profiling.debug_enabled(st.query_params):
+    profiling.sidebar_panel(profiler, filter_cache)